@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Synthetic reference sections, to benchmark the extraction at scale.
+
+The references are built from real entries of the knowledge bases
+(journals, report numbers, books and collaborations), in one of the
+STYLES, with optional noise: OCR errors, broken URLs and long
+miscellaneous text.
+
+.. code-block:: console
+
+    $ python -m benchmarks.corpus generate --size 1000 --style bracketed \\
+          --ocr-errors 0.01 --output document.txt
+    $ python -m benchmarks.corpus scale --sizes 10,100,1000,10000
+
+``scale`` times parse_references and extract_references_from_fulltext on
+reference sections of increasing size and writes the results as JSON.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import io
+import json
+import random
+import re
+import sys
+import textwrap
+import time
+
+from refextract.references.config import CFG_REFEXTRACT_KBS
+from refextract.references.engine import parse_references
+from refextract.references.text import extract_references_from_fulltext
+
+STYLES = ('numbered', 'bracketed', 'unnumbered', 'year_symbol')
+
+SYMBOLS = (u'*', u'**', u'***', u'†', u'‡', u'\xa7')
+
+SURNAMES = (u'Weinberg', u'Higgs', u'Englert', u'Witten', u'Maldacena',
+            u'Salam', u'Glashow', u'Kibble', u'Guralnik', u'Hagen',
+            u'Politzer', u'Wilczek', u'Gross', u'Cabibbo', u'Kobayashi',
+            u'Maskawa', u'Nambu', u'Randall', u'Sundrum', u'Polchinski',
+            u'M\xfcller', u'Schr\xf6der', u'Nason', u'Frixione', u'Salvatore')
+
+TITLE_WORDS = (u'measurement', u'search', u'new', u'physics', u'symmetry',
+               u'boson', u'quark', u'gauge', u'theory', u'decays', u'lepton',
+               u'collisions', u'cross', u'section', u'precision', u'dark',
+               u'matter', u'neutrino', u'oscillations', u'supersymmetry')
+
+URLS = (u'http://www.slac.stanford.edu/spires/find/hep/www?eprint=hep-ph',
+        u'https://twiki.cern.ch/twiki/bin/view/LHCPhysics/CrossSections',
+        u'http://pdg.lbl.gov/2016/reviews/rpp2016-rev-higgs-boson.pdf')
+
+# Characters commonly mistaken by OCR
+OCR_CONFUSIONS = {
+    u'l': u'1', u'1': u'l', u'O': u'0', u'0': u'O', u'S': u'5',
+    u'5': u'S', u'B': u'8', u'e': u'c', u'rn': u'm', u'.': u',',
+}
+
+re_kb_mapping = re.compile(r'^\s*(.+?)\s*---\s*(.+?)\s*$', re.UNICODE)
+re_numeration = re.compile(r'^<(.+)>$', re.UNICODE)
+re_numeration_token = re.compile(
+    r'"[^"]*"|\[[^\]]*\]|yyyy|yy|mm|w\+|9\?|.', re.UNICODE)
+
+
+def read_kb_lines(path):
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def load_kb_entries(kbs_files=None, cache={}):  # noqa
+    """Return the entries of the knowledge bases used to build references.
+
+    @return: (dict) with the 'journals' (standardised titles),
+        'report_numbers' (list of (category, numeration pattern)), 'books'
+        (list of (author, title, year)) and 'collaborations'.
+    """
+    kbs_files = dict(CFG_REFEXTRACT_KBS, **(kbs_files or {}))
+    cache_key = tuple(sorted(kbs_files.items()))
+    if cache_key in cache:
+        return cache[cache_key]
+
+    journals = sorted(set(
+        re_kb_mapping.match(line).group(2)
+        for line in read_kb_lines(kbs_files['journals'])
+        if re_kb_mapping.match(line)))
+
+    report_numbers = []
+    categories, numerations = [], []
+    for line in list(read_kb_lines(kbs_files['report-numbers'])) + [u'*****']:
+        if line.startswith(u'*****'):
+            report_numbers.extend((category, numeration)
+                                  for category in categories
+                                  for numeration in numerations)
+            categories, numerations = [], []
+        elif re_numeration.match(line):
+            numerations.append(re_numeration.match(line).group(1))
+        elif re_kb_mapping.match(line):
+            categories.append(re_kb_mapping.match(line).group(2))
+
+    books = []
+    for line in read_kb_lines(kbs_files['books']):
+        parts = line.rstrip(u';').split(u'|')
+        if len(parts) == 3:
+            books.append(tuple(parts))
+
+    collaborations = [re_kb_mapping.match(line).group(2)
+                      for line in read_kb_lines(kbs_files['collaborations'])
+                      if re_kb_mapping.match(line)]
+
+    entries = cache[cache_key] = {
+        'journals': journals,
+        'report_numbers': report_numbers,
+        'books': books,
+        'collaborations': collaborations,
+    }
+    return entries
+
+
+def make_numeration(pattern, rand):
+    """Return a report numeration matching a pattern of the report-numbers
+    knowledge base (see kbs.institute_num_pattern_to_regex)."""
+    tokens = re_numeration_token.findall(pattern)
+    output = []
+    for index, token in enumerate(tokens):
+        if token.startswith(u'"'):
+            output.append(token.strip(u'"'))
+        elif token.startswith(u'['):
+            output.append(rand.choice(token.strip(u'[]').replace(u' ', u'')
+                                      or u'A'))
+        elif token == u'yyyy':
+            output.append(u'%d' % rand.randint(1970, 2018))
+        elif token == u'yy':
+            output.append(u'%02d' % rand.randint(0, 99))
+        elif token == u'mm':
+            output.append(u'%02d' % rand.randint(1, 12))
+        elif token in (u'9', u'9?'):
+            output.append(u'%d' % rand.randint(0, 9))
+        elif token == u'a':
+            output.append(rand.choice(u'ABCDEFGH'))
+        elif token == u'w+':
+            output.append(u'th')
+        elif token == u's':
+            neighbours = tokens[index - 1:index] + tokens[index + 1:index + 2]
+            output.append(u'' if u'/' in neighbours else u'-')
+        else:
+            output.append(token)
+    return u''.join(output)
+
+
+def make_authors(rand):
+    authors = [u'%s. %s' % (rand.choice(u'ABCDEFGHJKLMNPRSTW'),
+                            rand.choice(SURNAMES))
+               for dummy in range(rand.randint(1, 4))]
+    if len(authors) == 1:
+        return authors[0]
+    return u', '.join(authors[:-1]) + u' and ' + authors[-1]
+
+
+def make_title(rand):
+    words = [rand.choice(TITLE_WORDS) for dummy in range(rand.randint(3, 9))]
+    return u' '.join(words).capitalize()
+
+
+def make_arxiv(rand):
+    return u'arXiv:%02d%02d.%05d [hep-ph]' % (
+        rand.randint(15, 18), rand.randint(1, 12), rand.randint(0, 99999))
+
+
+def make_journal(entries, rand):
+    return u'%s %d (%d) %d' % (rand.choice(entries['journals']),
+                               rand.randint(1, 999), rand.randint(1950, 2018),
+                               rand.randint(1, 9999))
+
+
+def make_reference(entries, rand):
+    """Return the text of a reference, without marker."""
+    kind = rand.random()
+    if kind < 0.45:
+        parts = [make_authors(rand), make_title(rand),
+                 make_journal(entries, rand)]
+        if rand.random() < 0.5:
+            parts.append(make_arxiv(rand))
+    elif kind < 0.6:
+        parts = [rand.choice(entries['collaborations']), make_title(rand),
+                 make_journal(entries, rand)]
+    elif kind < 0.75:
+        category, numeration = rand.choice(entries['report_numbers'])
+        parts = [make_authors(rand), make_title(rand),
+                 category + make_numeration(numeration, rand)]
+    elif kind < 0.9:
+        author, title, year = rand.choice(entries['books'])
+        parts = [author, title, u'Publisher', year]
+    else:
+        parts = [make_authors(rand), make_title(rand), make_arxiv(rand)]
+    return u', '.join(parts) + u'.'
+
+
+def add_ocr_errors(text, rate, rand):
+    """Replace characters as an OCR would, at the given rate."""
+    output = []
+    index = 0
+    while index < len(text):
+        for length in (2, 1):
+            chunk = text[index:index + length]
+            if chunk in OCR_CONFUSIONS and rand.random() < rate:
+                output.append(OCR_CONFUSIONS[chunk])
+                index += length
+                break
+        else:
+            output.append(text[index])
+            index += 1
+    return u''.join(output)
+
+
+def break_url(url, rand):
+    """Break a URL as pdftotext does, with spaces around its punctuation."""
+    cut = rand.choice([i for i, char in enumerate(url) if char in u'/.=-']
+                      or [len(url) // 2])
+    return url[:cut] + rand.choice((u' ', u'\n')) + url[cut:]
+
+
+def add_noise(text, rand, ocr_errors=0.0, broken_urls=0.0, long_misc=0.0):
+    """Add noise to the text of a reference.
+
+    @param ocr_errors: (float) rate of the characters mistaken by OCR.
+    @param broken_urls: (float) probability of adding a broken URL.
+    @param long_misc: (float) probability of adding long miscellaneous text.
+    """
+    if rand.random() < broken_urls:
+        text += u' See ' + break_url(rand.choice(URLS), rand) + u'.'
+    if rand.random() < long_misc:
+        text += u' ' + u' '.join(rand.choice(TITLE_WORDS + SURNAMES)
+                                 for dummy in range(rand.randint(50, 300)))
+    if ocr_errors:
+        text = add_ocr_errors(text, ocr_errors, rand)
+    return text
+
+
+def add_marker(text, index, style, rand):
+    if style == 'numbered':
+        return u'%d. %s' % (index, text)
+    if style == 'bracketed':
+        return u'[%d] %s' % (index, text)
+    if style == 'year_symbol':
+        return u'%s %s' % (SYMBOLS[(index - 1) % len(SYMBOLS)], text)
+    return text
+
+
+def generate_reference_lines(size, style='bracketed', seed=0,
+                             kbs_files=None, **noise):
+    """Return a list of ``size`` reference lines.
+
+    @param style: (string) one of STYLES.
+    @param seed: (int) seed of the generator, for reproducible corpora.
+    @param noise: the noise arguments of add_noise.
+    """
+    if style not in STYLES:
+        raise ValueError('Unknown style: %s' % style)
+    rand = random.Random(seed)
+    entries = load_kb_entries(kbs_files)
+    return [add_marker(add_noise(make_reference(entries, rand), rand,
+                                 **noise),
+                       index, style, rand)
+            for index in range(1, size + 1)]
+
+
+def generate_document(size, style='bracketed', seed=0, width=80,
+                      kbs_files=None, **noise):
+    """Return the lines of a document ending with a reference section of
+    ``size`` references, wrapped at ``width`` characters as in the output
+    of pdftotext."""
+    rand = random.Random(seed)
+    lines = [u'Synthetic document of %d references\n' % size, u'\n']
+    for dummy in range(rand.randint(5, 20)):
+        lines.extend(line + u'\n' for line in textwrap.wrap(
+            u' '.join(rand.choice(TITLE_WORDS) for dummy in range(60)),
+            width))
+        lines.append(u'\n')
+
+    lines.extend([u'References\n', u'\n'])
+    for reference in generate_reference_lines(size, style, seed, kbs_files,
+                                              **noise):
+        for paragraph in reference.split(u'\n'):
+            lines.extend(line + u'\n' for line in textwrap.wrap(
+                paragraph, width, break_long_words=False,
+                break_on_hyphens=False))
+    return lines
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def scale(sizes, style='bracketed', seed=0, **noise):
+    """Time the extraction on reference sections of increasing size.
+
+    @return: (list) of dictionaries with the results for each size.
+    """
+    # Load the knowledge bases and compile the patterns before timing
+    parse_references(generate_reference_lines(1, style, seed))
+
+    results = []
+    for size in sizes:
+        reference_lines = generate_reference_lines(size, style, seed,
+                                                   **noise)
+        docbody = generate_document(size, style, seed, **noise)
+        (references, dummy), parse_seconds = time_call(parse_references,
+                                                       reference_lines)
+        (reflines, dummy, dummy), find_seconds = time_call(
+            extract_references_from_fulltext, docbody)
+        results.append({
+            'size': size,
+            'style': style,
+            'references': len(references),
+            'parse_references_seconds': parse_seconds,
+            'parse_references_lines_per_second': size / parse_seconds,
+            'fulltext_lines': len(docbody),
+            'fulltext_reference_lines': len(reflines),
+            'extract_references_from_fulltext_seconds': find_seconds,
+            'extract_references_from_fulltext_lines_per_second':
+                len(docbody) / find_seconds,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    generate = subparsers.add_parser('generate',
+                                     help='write a synthetic document')
+    generate.add_argument('--size', type=int, default=100)
+    generate.add_argument('--lines-only', action='store_true',
+                          help='only the reference lines, one per line')
+    generate.add_argument('-o', '--output', help='output file, else stdout')
+
+    scaling = subparsers.add_parser('scale', help='run the scaling benchmark')
+    scaling.add_argument('--sizes', default='10,100,1000',
+                         help='comma separated numbers of references')
+    scaling.add_argument('-o', '--output', help='write the results as JSON')
+
+    for subparser in (generate, scaling):
+        subparser.add_argument('--style', choices=STYLES,
+                               default='bracketed')
+        subparser.add_argument('--seed', type=int, default=0)
+        subparser.add_argument('--ocr-errors', type=float, default=0.0,
+                               help='rate of characters mistaken by OCR')
+        subparser.add_argument('--broken-urls', type=float, default=0.0,
+                               help='probability of a broken URL')
+        subparser.add_argument('--long-misc', type=float, default=0.0,
+                               help='probability of long misc text')
+    args = parser.parse_args(argv)
+
+    noise = {'ocr_errors': args.ocr_errors, 'broken_urls': args.broken_urls,
+             'long_misc': args.long_misc}
+
+    if args.command == 'generate':
+        if args.lines_only:
+            lines = [line.replace(u'\n', u' ') + u'\n'
+                     for line in generate_reference_lines(
+                         args.size, args.style, args.seed, **noise)]
+        else:
+            lines = generate_document(args.size, args.style, args.seed,
+                                      **noise)
+        output = io.open(args.output, 'w', encoding='utf-8') \
+            if args.output else sys.stdout
+        try:
+            output.writelines(lines)
+        finally:
+            if args.output:
+                output.close()
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = scale(sizes, args.style, args.seed, **noise)
+    for result in results:
+        print('%6d references: parse_references %8.2fs (%7.1f lines/s), '
+              'extract_references_from_fulltext %7.3fs (%9.1f lines/s)' % (
+                  result['size'], result['parse_references_seconds'],
+                  result['parse_references_lines_per_second'],
+                  result['extract_references_from_fulltext_seconds'],
+                  result['extract_references_from_fulltext_lines_per_second']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
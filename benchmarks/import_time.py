@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Benchmark of the time taken to import refextract.
+
+Each statement is timed in fresh interpreters, the median being compared to
+its budget:
+
+.. code-block:: console
+
+    $ python benchmarks/import_time.py --repeat 10
+
+The exit status is 1 when a statement is over its budget.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import subprocess
+import sys
+
+# Statement timed and its budget, in seconds
+STATEMENTS = (
+    ('import refextract', 0.05),
+    ('from refextract import extract_journal_reference', 0.15),
+    ('from refextract.references.api import extract_references_from_string',
+     0.5),
+)
+
+TIMER = '''
+import time
+start = time.perf_counter()
+%s
+print(time.perf_counter() - start)
+'''
+
+
+def time_statement(statement):
+    """Return the time taken by the statement in a new interpreter."""
+    output = subprocess.check_output([sys.executable, '-c',
+                                      TIMER % statement])
+    return float(output)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def run(repeat=5, budget_factor=1.0):
+    """Time the statements, returning a list of results."""
+    results = []
+    for statement, budget in STATEMENTS:
+        seconds = median([time_statement(statement)
+                          for dummy in range(repeat)])
+        results.append({
+            'statement': statement,
+            'seconds': seconds,
+            'budget': budget * budget_factor,
+            'over_budget': seconds > budget * budget_factor,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-factor', type=float, default=1.0,
+                        help='multiply the budgets, e.g. on slow machines')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.budget_factor)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print('%-72s %6.1fms (budget %.0fms)%s' % (
+                result['statement'], result['seconds'] * 1000,
+                result['budget'] * 1000,
+                ' OVER BUDGET' if result['over_budget'] else ''))
+    return 1 if any(result['over_budget'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Benchmark of the journal and report-number matching against the size of
+the knowledge bases.
+
+Synthetic journal and report-number knowledge bases of increasing size
+(the bundled entries plus generated ones) are built, and the lines of a
+synthetic corpus are tagged with identify_journals and
+identify_report_numbers:
+
+.. code-block:: console
+
+    $ python -m benchmarks.kb_scaling --sizes 1000,10000,100000,1000000
+
+For each size, the build time, the memory retained by the knowledge base,
+the peak memory of the build and the mean tagging time per line are
+reported, with the exponent of their growth since the previous size (1.0
+meaning linear growth).
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import io
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from refextract.documents.text import remove_and_record_multiple_spaces_in_line
+from refextract.references.config import CFG_REFEXTRACT_KBS
+from refextract.references.kbs import build_journals_kb, build_reportnum_kb
+from refextract.references.regexs import re_punctuation
+from refextract.references.tag import identify_journals, identify_report_numbers
+
+from .corpus import generate_reference_lines
+
+LETTERS = u'ABCDEFGHIJKLMNOPRSTUVWXYZ'
+
+NUMERATIONS = (u'<syys9?9?9>', u'<syyyys9?9?9>', u'<s9?9?9?9>')
+
+
+def read_journal_entries(path=CFG_REFEXTRACT_KBS['journals']):
+    with io.open(path, encoding='utf-8') as f:
+        return [tuple(line.rstrip(u'\n').split(u'---', 1)) for line in f
+                if u'---' in line and not line.startswith(u'#')]
+
+
+def make_word(rand, length):
+    return u''.join(rand.choice(LETTERS) for dummy in range(length))
+
+
+def generate_journal_kb(size, seed=0):
+    """Return ``size`` (seek, replacement) journal entries: the bundled
+    ones, completed with generated titles."""
+    rand = random.Random(seed)
+    entries = read_journal_entries()[:size]
+    while len(entries) < size:
+        words = [make_word(rand, rand.randint(3, 10))
+                 for dummy in range(rand.randint(2, 6))]
+        entries.append((u' '.join(words),
+                        u' '.join(word[:4].capitalize() + u'.'
+                                  for word in words)))
+    return entries
+
+
+def read_reportnum_kb(path=CFG_REFEXTRACT_KBS['report-numbers']):
+    with io.open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def generate_reportnum_kb(size, seed=0):
+    """Return the text of a report-number knowledge base of about ``size``
+    categories: the bundled ones, completed with generated institutes."""
+    rand = random.Random(seed)
+    lines = []
+    categories = 0
+    for line in read_reportnum_kb().splitlines():
+        if u'---' in line:
+            if categories >= size:
+                continue
+            categories += 1
+        lines.append(line)
+    institute = 0
+    while categories < size:
+        institute += 1
+        lines.extend([u'', u'*****Synthetic %d*****' % institute])
+        lines.extend(rand.sample(NUMERATIONS, 2))
+        lines.append(u'')
+        for dummy in range(min(100, size - categories)):
+            category = u'%s %s' % (make_word(rand, 3), make_word(rand, 4))
+            lines.append(u'%s---%s' % (category, category.replace(u' ', u'-')))
+            categories += 1
+    return u'\n'.join(lines) + u'\n'
+
+
+def prepare_line(line):
+    """Normalise a reference line as tag_reference_line does before
+    identifying the journals and report numbers."""
+    line = re_punctuation.sub(u' ', line.upper())
+    return remove_and_record_multiple_spaces_in_line(line)[1]
+
+
+def measure_build(builder, make_argument, trace_memory=True):
+    """Build a knowledge base, returning it with its build time, retained
+    memory and peak memory.
+
+    The memory is measured in a second build, as tracemalloc slows down
+    the build.
+    """
+    start = time.perf_counter()
+    kb = builder(make_argument())
+    seconds = time.perf_counter() - start
+    retained = peak = None
+    if trace_memory:
+        argument = make_argument()
+        tracemalloc.start()
+        try:
+            traced_kb = builder(argument)
+            retained, peak = tracemalloc.get_traced_memory()
+            del traced_kb
+        finally:
+            tracemalloc.stop()
+    return kb, seconds, retained, peak
+
+
+def measure_tagging(func, lines, kb):
+    """Return the mean time to tag a line."""
+    start = time.perf_counter()
+    for line in lines:
+        func(line, kb)
+    return (time.perf_counter() - start) / len(lines)
+
+
+def benchmark_size(size, lines, seed=0, trace_memory=True):
+    journal_entries = generate_journal_kb(size, seed)
+    journals_kb, journals_build, journals_retained, journals_peak = \
+        measure_build(build_journals_kb, lambda: journal_entries,
+                      trace_memory)
+    journals_line = measure_tagging(identify_journals, lines, journals_kb)
+    del journals_kb
+
+    reportnum_text = generate_reportnum_kb(size, seed)
+    reports_kb, reports_build, reports_retained, reports_peak = \
+        measure_build(build_reportnum_kb,
+                      lambda: io.StringIO(reportnum_text), trace_memory)
+    reports_line = measure_tagging(identify_report_numbers, lines,
+                                   reports_kb)
+
+    return {
+        'size': size,
+        'journals': {
+            'build_seconds': journals_build,
+            'retained_memory': journals_retained,
+            'peak_memory': journals_peak,
+            'seconds_per_line': journals_line,
+        },
+        'report_numbers': {
+            'build_seconds': reports_build,
+            'retained_memory': reports_retained,
+            'peak_memory': reports_peak,
+            'seconds_per_line': reports_line,
+        },
+    }
+
+
+def add_growth(results):
+    """Add the growth exponents of the metrics since the previous size:
+    log(metric ratio) / log(size ratio)."""
+    for previous, result in zip(results, results[1:]):
+        size_ratio = math.log(result['size'] / previous['size'])
+        for kb in ('journals', 'report_numbers'):
+            result[kb]['growth'] = dict(
+                (metric, math.log(value / previous[kb][metric]) / size_ratio
+                 if value and previous[kb][metric] else None)
+                for metric, value in result[kb].items()
+                if metric != 'growth')
+    return results
+
+
+def run(sizes, lines=20, seed=0, trace_memory=True):
+    """Run the benchmark on knowledge bases of the given sizes, tagging
+    ``lines`` synthetic reference lines."""
+    sample = [prepare_line(line)
+              for line in generate_reference_lines(lines, seed=seed)]
+    return add_growth([benchmark_size(size, sample, seed, trace_memory)
+                       for size in sorted(sizes)])
+
+
+def format_memory(value):
+    return '-' if value is None else '%.1f' % (value / 2 ** 20)
+
+
+def format_results(results):
+    lines = []
+    for kb in ('journals', 'report_numbers'):
+        lines.append('%s:' % kb)
+        lines.append('%10s %12s %14s %12s %14s' % (
+            'entries', 'build (s)', 'retained MiB', 'peak MiB',
+            'ms per line'))
+        for result in results:
+            record = result[kb]
+            line = '%10d %12.3f %14s %12s %14.3f' % (
+                result['size'], record['build_seconds'],
+                format_memory(record['retained_memory']),
+                format_memory(record['peak_memory']),
+                record['seconds_per_line'] * 1000)
+            growth = record.get('growth')
+            if growth:
+                line += '   growth: build %s, memory %s, line %s' % tuple(
+                    '%.2f' % growth[metric]
+                    if growth[metric] is not None else '-'
+                    for metric in ('build_seconds', 'retained_memory',
+                                   'seconds_per_line'))
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated numbers of entries')
+    parser.add_argument('--lines', type=int, default=20,
+                        help='number of reference lines tagged')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure the memory of the builds')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run([int(size) for size in args.sizes.split(',')], args.lines,
+                  args.seed, not args.no_memory)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Benchmark of the speed and accuracy of the extraction profiles.
+
+The text documents of the benchmarks and a synthetic reference section are
+extracted with each profile of CFG_REFEXTRACT_PROFILES:
+
+.. code-block:: console
+
+    $ python -m benchmarks.profiles --lines 400
+
+For each profile, the time per reference line and its speedup over the
+'full' profile are reported, with its agreement with the 'full' profile:
+the fraction of the fields (journal, DOI, report number...) found by the
+'full' profile which the profile finds too, overall and for the
+identifiers only.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import sys
+import time
+
+from collections import Counter
+
+from refextract.references.api import extract_references_from_string
+from refextract.references.config import CFG_REFEXTRACT_PROFILES
+from refextract.references.kbs import get_kbs
+
+from .corpus import generate_reference_lines
+from .suite import get_documents, read_text_document
+
+# Fields of the references compared between the profiles: the raw line and
+# the miscellaneous text are not, as they do not tell what was extracted
+IGNORED_FIELDS = ('raw_ref', 'misc')
+
+IDENTIFIER_FIELDS = ('doi', 'url', 'hdl', 'report_number', 'arxiv_eprint')
+
+
+def reference_fields(references):
+    """Return the Counter of the (field, value) pairs of the references."""
+    fields = Counter()
+    for reference in references:
+        for field, values in reference.items():
+            if field in IGNORED_FIELDS:
+                continue
+            for value in values:
+                fields[(field, value)] += 1
+    return fields
+
+
+def agreement(fields, full_fields, field_names=None):
+    """Return the fraction of the fields of the 'full' profile found in
+    ``fields``, or None if there is none."""
+    if field_names is not None:
+        full_fields = Counter(dict(
+            (key, count) for key, count in full_fields.items()
+            if key[0] in field_names))
+    total = sum(full_fields.values())
+    if not total:
+        return None
+    return sum((fields & full_fields).values()) / total
+
+
+def get_sources(lines, seed=0):
+    """Return the list of (name, text, is_only_references, line count) of
+    the sources to extract."""
+    sources = []
+    for name, path, dummy in get_documents(pdf_dir=None):
+        text = u''.join(read_text_document(path))
+        sources.append((name, text, False, None))
+    if lines:
+        reflines = generate_reference_lines(lines, seed=seed)
+        sources.append(('synthetic', u'\n'.join(reflines), True, lines))
+    return sources
+
+
+def run_profile(profile, text, is_only_references, repeat):
+    """Return the references of the text and the best time to extract
+    them."""
+    best = None
+    for dummy in range(repeat):
+        start = time.perf_counter()
+        references = extract_references_from_string(
+            text, is_only_references=is_only_references, profile=profile)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return references, best
+
+
+def run(lines=400, repeat=3, seed=0, profiles=None):
+    """Run every profile on the sources, returning the results of each
+    profile."""
+    get_kbs()
+    profiles = profiles or sorted(CFG_REFEXTRACT_PROFILES)
+    results = dict((profile, {'seconds': 0.0, 'fields': Counter()})
+                   for profile in profiles)
+    references_count = 0
+    for name, text, is_only_references, dummy in get_sources(lines, seed):
+        for profile in profiles:
+            references, seconds = run_profile(profile, text,
+                                              is_only_references, repeat)
+            results[profile]['seconds'] += seconds
+            results[profile]['fields'] += reference_fields(references)
+            if profile == profiles[0]:
+                references_count += len(references)
+
+    full_fields = results['full']['fields'] if 'full' in results \
+        else Counter()
+    summary = []
+    for profile in profiles:
+        result = results[profile]
+        summary.append({
+            'profile': profile,
+            'seconds_per_reference':
+                result['seconds'] / max(references_count, 1),
+            'speedup': results['full']['seconds'] / result['seconds']
+                if 'full' in results and result['seconds'] else None,
+            'agreement': agreement(result['fields'], full_fields),
+            'identifiers_agreement': agreement(result['fields'], full_fields,
+                                               IDENTIFIER_FIELDS),
+        })
+    return summary
+
+
+def format_ratio(value, pattern='%.1f%%', scale=100):
+    return '-' if value is None else pattern % (value * scale)
+
+
+def format_results(summary):
+    lines = ['%-12s %16s %9s %10s %12s' % (
+        'profile', 'ms per reference', 'speedup', 'agreement', 'identifiers')]
+    for result in summary:
+        lines.append('%-12s %16.3f %9s %10s %12s' % (
+            result['profile'], result['seconds_per_reference'] * 1000,
+            format_ratio(result['speedup'], '%.2fx', 1),
+            format_ratio(result['agreement']),
+            format_ratio(result['identifiers_agreement'])))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=400,
+                        help='number of synthetic reference lines, 0 for none')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profiles',
+                        help='comma separated profiles, all by default')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    profiles = args.profiles.split(',') if args.profiles else None
+    summary = run(args.lines, args.repeat, args.seed, profiles)
+    print(format_results(summary))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""End-to-end benchmark of the extraction, stage by stage.
+
+The PDFs of ``tests/data`` (if pdftotext is available) and the text
+documents of ``benchmarks/data`` go through each stage of the extraction;
+the wall time, lines per second and peak memory of each stage are written
+as JSON:
+
+.. code-block:: console
+
+    $ python -m benchmarks.suite --output results.json
+    $ python -m benchmarks.suite --baseline results.json
+
+With ``--baseline``, the time per line and the peak memory of each stage are
+compared with the ones of a previous run, and the exit status is 1 if one of
+them regressed by more than ``--threshold``.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from refextract.documents.pdf import convert_PDF_to_plaintext
+from refextract.documents.text import remove_page_boundary_lines
+from refextract.references.config import CFG_PATH_PDFTOTEXT
+from refextract.references.engine import tag_reference_elements
+from refextract.references.kbs import get_kbs
+from refextract.references.profiler import (
+    STAGES,
+    build_elements,
+    find_section,
+    get_section_lines,
+)
+from refextract.references.record import build_references
+from refextract.references.text import wash_and_repair_reference_line
+from refextract.version import __version__
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_DIR = os.path.join(ROOT, 'tests', 'data')
+TEXT_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+
+REFERENCE_FORMAT = u"{title} {volume} ({year}) {page}"
+
+
+class StageRecorder(object):
+    """Accumulates the time, lines and peak memory of each stage.
+
+    @param trace_memory: (bool) record the peak memory of the stages with
+        tracemalloc, which slows them down: the timings of such a run should
+        not be used.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = dict((stage, {'seconds': 0.0, 'lines': 0,
+                                    'peak_memory': 0})
+                           for stage in STAGES)
+
+    def run(self, stage, lines, func, *args, **kwargs):
+        """Run func(*args, **kwargs) as (part of) the stage, on the given
+        number of lines, and return its result."""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        record = self.stages[stage]
+        record['seconds'] += seconds
+        record['lines'] += lines
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            record['peak_memory'] = max(record['peak_memory'], peak)
+        return result
+
+
+def read_text_document(path):
+    with io.open(path, encoding='utf-8') as f:
+        return f.read().splitlines(True)
+
+
+def get_documents(pdf_dir=PDF_DIR, text_dir=TEXT_DIR):
+    """Return the list of (name, path, converter) of the documents."""
+    documents = []
+    if pdf_dir and CFG_PATH_PDFTOTEXT:
+        for filename in sorted(os.listdir(pdf_dir)):
+            if filename.endswith('.pdf'):
+                documents.append((filename, os.path.join(pdf_dir, filename),
+                                  convert_PDF_to_plaintext))
+    if text_dir:
+        for filename in sorted(os.listdir(text_dir)):
+            if filename.endswith('.txt'):
+                documents.append((filename, os.path.join(text_dir, filename),
+                                  read_text_document))
+    return documents
+
+
+def wash_lines(reflines):
+    return [wash_and_repair_reference_line(ref_line) for ref_line in reflines]
+
+
+def tag_lines(reflines, clean_lines, kbs):
+    lines = []
+    bad_titles_count = {}
+    for ref_line, clean_line in zip(reflines, clean_lines):
+        elements, line_marker, counts, bad_titles_count = \
+            tag_reference_elements(clean_line, kbs, bad_titles_count)
+        lines.append((ref_line, elements, line_marker))
+    return lines
+
+
+def build_lines_elements(tagged_lines, kbs):
+    return [{'elements': build_elements(elements, kbs),
+             'line_marker': line_marker,
+             'raw_ref': ref_line}
+            for ref_line, elements, line_marker in tagged_lines]
+
+
+def run_document(path, converter, kbs, recorder):
+    """Run a document through all the stages, returning its number of
+    references."""
+    docbody = recorder.run('conversion', 0, converter, path)
+    # The conversion is counted in lines of its output
+    recorder.stages['conversion']['lines'] += len(docbody)
+
+    docbody = recorder.run('remove_page_boundary_lines', len(docbody),
+                           remove_page_boundary_lines, docbody)
+    start, end = recorder.run('find_section', len(docbody), find_section,
+                              docbody)
+    if start is None or end is None:
+        return 0
+
+    reflines = recorder.run('rebuild_reference_lines',
+                            end - start['start_line'] + 1,
+                            get_section_lines, docbody, start, end)
+
+    clean_lines = recorder.run('wash', len(reflines), wash_lines, reflines)
+    tagged_lines = recorder.run('tagging', len(reflines), tag_lines,
+                                reflines, clean_lines, kbs)
+    citations = recorder.run('element_building', len(reflines),
+                             build_lines_elements, tagged_lines, kbs)
+    references = recorder.run('build_references', len(reflines),
+                              build_references, citations, REFERENCE_FORMAT)
+    return len(references)
+
+
+def summarize(stages):
+    summary = {}
+    for stage in STAGES:
+        record = dict(stages[stage])
+        record['lines_per_second'] = \
+            record['lines'] / record['seconds'] if record['seconds'] else None
+        summary[stage] = record
+    return summary
+
+
+def run(documents, repeat=3, trace_memory=True):
+    """Benchmark the documents, returning the results as a dictionary.
+
+    The time of each stage is the best of ``repeat`` runs; the memory is
+    measured in an additional run.
+    """
+    kbs = get_kbs()
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'refextract': str(__version__),
+            'pdftotext': CFG_PATH_PDFTOTEXT,
+        },
+        'documents': {},
+    }
+
+    best = None
+    for dummy in range(repeat):
+        recorder = StageRecorder()
+        for name, path, converter in documents:
+            results['documents'][name] = run_document(path, converter, kbs,
+                                                      recorder)
+        if best is None:
+            best = recorder.stages
+        else:
+            for stage in STAGES:
+                if recorder.stages[stage]['seconds'] < \
+                        best[stage]['seconds']:
+                    best[stage] = recorder.stages[stage]
+
+    if trace_memory:
+        recorder = StageRecorder(trace_memory=True)
+        tracemalloc.start()
+        try:
+            for name, path, converter in documents:
+                run_document(path, converter, kbs, recorder)
+        finally:
+            tracemalloc.stop()
+        for stage in STAGES:
+            best[stage]['peak_memory'] = \
+                recorder.stages[stage]['peak_memory']
+
+    results['stages'] = summarize(best)
+    results['total_seconds'] = sum(best[stage]['seconds']
+                                   for stage in STAGES)
+    return results
+
+
+def compare(baseline, results, threshold=0.1, min_seconds=0.01):
+    """Compare results with a baseline.
+
+    The times of the stages taking less than ``min_seconds`` are too noisy
+    to be compared.
+
+    @return: (list) of (stage, metric, baseline value, value) of the
+        metrics (seconds per line, peak memory) which increased by more than
+        the threshold.
+    """
+    regressions = []
+    for stage in STAGES:
+        old = baseline['stages'].get(stage)
+        new = results['stages'].get(stage)
+        if not old or not new or not old['lines'] or not new['lines']:
+            continue
+        metrics = [('peak_memory', old['peak_memory'], new['peak_memory'])]
+        if max(old['seconds'], new['seconds']) >= min_seconds:
+            metrics.insert(0, ('seconds_per_line',
+                               old['seconds'] / old['lines'],
+                               new['seconds'] / new['lines']))
+        for metric, old_value, new_value in metrics:
+            if old_value and new_value > old_value * (1 + threshold):
+                regressions.append((stage, metric, old_value, new_value))
+    return regressions
+
+
+def format_results(results):
+    lines = ['%-28s %10s %8s %12s %12s' % ('stage', 'seconds', 'lines',
+                                           'lines/s', 'peak KiB')]
+    for stage in STAGES:
+        record = results['stages'][stage]
+        lines.append('%-28s %10.4f %8d %12s %12.1f' % (
+            stage, record['seconds'], record['lines'],
+            '%.1f' % record['lines_per_second']
+            if record['lines_per_second'] else '-',
+            record['peak_memory'] / 1024))
+    lines.append('%-28s %10.4f' % ('total', results['total_seconds']))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pdf-dir', default=PDF_DIR,
+                        help='directory of PDFs, "" for none')
+    parser.add_argument('--text-dir', default=TEXT_DIR,
+                        help='directory of text documents, "" for none')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure the peak memory')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase reported as a regression')
+    args = parser.parse_args(argv)
+
+    documents = get_documents(args.pdf_dir, args.text_dir)
+    if not CFG_PATH_PDFTOTEXT and args.pdf_dir:
+        print('pdftotext not found: PDFs skipped', file=sys.stderr)
+    results = run(documents, args.repeat, not args.no_memory)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for stage, metric, old_value, new_value in regressions:
+            print('REGRESSION %s %s: %.6g -> %.6g (%+.0f%%)' % (
+                stage, metric, old_value, new_value,
+                100 * (new_value / old_value - 1)))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
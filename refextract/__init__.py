@@ -25,25 +25,83 @@
 
 from __future__ import absolute_import, division, print_function
 
-from .references.api import (
-    extract_journal_reference,
-    extract_references_from_file,
-    extract_references_from_string,
-    extract_references_from_url,
-)
-
-from .references.regexs import (
-    re_new_arxiv,
-    re_new_arxiv_5digits,
-    RE_OLD_ARXIV
-)
+import importlib
 
 from .version import __version__
 
+# The API is imported on first use, so that importing refextract is fast
+LAZY_ATTRIBUTES = {
+    "LinkerCache": ".references.linker",
+    "extract_journal_reference": ".references.api",
+    "extract_journal_references": ".references.api",
+    "extract_references_from_bytes": ".references.api",
+    "extract_references_from_file": ".references.api",
+    "extract_references_from_stream": ".references.api",
+    "extract_references_from_string": ".references.api",
+    "extract_references_from_url": ".references.api",
+    "iter_journal_references": ".references.api",
+    "iter_references_from_file": ".references.api",
+    "iter_references_from_string": ".references.api",
+    "install_hook": ".references.hooks",
+    "extract_identifiers": ".references.identifiers",
+    "iter_identifiers": ".references.identifiers",
+    "remove_hook": ".references.hooks",
+    "using_hook": ".references.hooks",
+    "enable_stage_metrics": ".references.metrics",
+    "render_prometheus": ".references.metrics",
+    "enable_slow_line_sampler": ".references.sampler",
+    "dump_slow_lines": ".references.sampler",
+    "get_slow_lines": ".references.sampler",
+    "re_new_arxiv": ".references.regexs",
+    "re_new_arxiv_5digits": ".references.regexs",
+    "RE_OLD_ARXIV": ".references.regexs",
+}
+
+# The patterns are compiled on first use in refextract, but exported
+# compiled (see refextract.references.regexs.LazyPattern)
+PATTERN_ATTRIBUTES = ("re_new_arxiv", "re_new_arxiv_5digits")
+
+
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    module = importlib.import_module(LAZY_ATTRIBUTES[name], __name__)
+    value = getattr(module, name)
+    if name in PATTERN_ATTRIBUTES:
+        value = value.compile()
+    elif name == "RE_OLD_ARXIV":
+        value = [(pattern.compile(), report_number)
+                 for pattern, report_number in value]
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_ATTRIBUTES))
+
+
 __all__ = (
     "__version__",
+    "LinkerCache",
     "extract_journal_reference",
+    "extract_journal_references",
+    "extract_references_from_bytes",
     "extract_references_from_file",
+    "extract_references_from_stream",
     "extract_references_from_string",
     "extract_references_from_url",
+    "iter_journal_references",
+    "iter_references_from_file",
+    "iter_references_from_string",
+    "install_hook",
+    "remove_hook",
+    "using_hook",
+    "extract_identifiers",
+    "iter_identifiers",
+    "enable_stage_metrics",
+    "render_prometheus",
+    "enable_slow_line_sampler",
+    "dump_slow_lines",
+    "get_slow_lines",
 )
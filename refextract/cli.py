@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Extraction of references from the command line.
+
+.. code-block:: console
+
+    $ refextract batch --workers 8 --output refs.jsonl papers/ --list urls.txt
+
+Each document gives one line of JSON in the output, with its ``source``
+(path or URL) and either its ``references`` and ``stats`` or its ``error``.
+The output file is also the checkpoint of the run: running the same command
+again skips the documents which already are in the output.
+
+.. code-block:: console
+
+    $ refextract profile --top 20 slow.pdf
+
+shows where the time goes when extracting the references of a document (see
+refextract.references.profiler).
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from .references.api import (
+    extract_references_from_file,
+    extract_references_from_url,
+)
+from .references.config import CFG_REFEXTRACT_PROFILES
+from .references.kbs import get_kbs
+from .references.profiler import format_profile, profile_file, profile_string
+
+DEFAULT_EXTENSIONS = ('.pdf', '.txt')
+
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def iter_sources(inputs, lists=(), extensions=DEFAULT_EXTENSIONS):
+    """Yield the documents to process: the files in (the directories of)
+    ``inputs``, then the paths and URLs listed in the files ``lists``
+    ("-" for the standard input), one per line."""
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith(tuple(extensions)):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+    for list_path in lists:
+        list_file = sys.stdin if list_path == '-' else open(list_path)
+        try:
+            for line in list_file:
+                source = line.strip()
+                if source and not source.startswith('#'):
+                    yield source
+        finally:
+            if list_file is not sys.stdin:
+                list_file.close()
+
+
+def load_checkpoint(output_path):
+    """Return the set of the sources already in the output.
+
+    A last line left incomplete by an interrupted run is removed.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'rb+') as output:
+        valid_length = 0
+        for line in output:
+            if not line.endswith(b'\n'):
+                break
+            done.add(json.loads(line.decode('utf-8'))['source'])
+            valid_length += len(line)
+        output.truncate(valid_length)
+    return done
+
+
+def init_worker():
+    """Load the knowledge bases once in each worker process."""
+    get_kbs()
+
+
+def process_source(source, options):
+    """Extract the references of a document, returning its output record."""
+    record = {'source': source}
+    stats = {}
+    try:
+        if is_url(source):
+            references = extract_references_from_url(source, stats=stats,
+                                                     **options)
+        else:
+            references = extract_references_from_file(source, stats=stats,
+                                                      **options)
+    except Exception as err:
+        record['error'] = str(err)
+        record['error_type'] = err.__class__.__name__
+    else:
+        record['references'] = references
+        record['stats'] = stats
+    return record
+
+
+class Counters(object):
+    """Throughput counters of a batch run."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.skipped = 0
+        self.documents = 0
+        self.errors = 0
+        self.references = 0
+
+    def add(self, record):
+        self.documents += 1
+        if 'error' in record:
+            self.errors += 1
+        else:
+            self.references += len(record['references'])
+
+    def report(self):
+        elapsed = max(time.time() - self.start, 1e-9)
+        return ('%d documents (%d errors, %d skipped), %d references in '
+                '%.1fs: %.2f documents/s, %.1f references/s' % (
+                    self.documents, self.errors, self.skipped,
+                    self.references, elapsed, self.documents / elapsed,
+                    self.references / elapsed))
+
+
+def run_batch(sources, output_path, workers=1, options=None,
+              progress_interval=10, progress_file=sys.stderr):
+    """Extract the references of the sources into the JSONL output file,
+    skipping the sources already in it.
+
+    @return: (Counters) the counters of the run.
+    """
+    options = options or {}
+    done = load_checkpoint(output_path)
+    counters = Counters()
+    last_report = [time.time()]
+
+    with open(output_path, 'a') as output, \
+            ProcessPoolExecutor(workers, initializer=init_worker) as executor:
+        pending = set()
+
+        def write_completed():
+            completed, dummy = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                record = future.result()
+                output.write(json.dumps(record) + '\n')
+                counters.add(record)
+            output.flush()
+            pending.difference_update(completed)
+
+            if progress_interval and \
+                    time.time() - last_report[0] >= progress_interval:
+                print(counters.report(), file=progress_file)
+                last_report[0] = time.time()
+
+        for source in sources:
+            if source in done:
+                counters.skipped += 1
+                continue
+            done.add(source)
+            # Bound the number of documents in flight
+            while len(pending) >= 2 * workers:
+                write_completed()
+            pending.add(executor.submit(process_source, source, options))
+
+        while pending:
+            write_completed()
+
+    if progress_interval:
+        print(counters.report(), file=progress_file)
+    return counters
+
+
+def run_profile(args):
+    if args.input == '-':
+        result = profile_string(sys.stdin.read(), args.top,
+                                not args.no_patterns)
+    else:
+        result = profile_file(args.input, args.top, not args.no_patterns)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_profile(result))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='refextract',
+        description='Extract references from documents.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    batch = subparsers.add_parser(
+        'batch', help='extract references from many documents to JSONL')
+    batch.add_argument('inputs', nargs='*',
+                       help='documents or directories of documents')
+    batch.add_argument('--list', action='append', default=[], dest='lists',
+                       help='file listing paths or URLs, "-" for stdin')
+    batch.add_argument('-o', '--output', required=True,
+                       help='JSONL output, also used to resume the run')
+    batch.add_argument('-w', '--workers', type=int, default=1)
+    batch.add_argument('--extensions', default=','.join(DEFAULT_EXTENSIONS),
+                       help='extensions of the files taken in directories')
+    batch.add_argument('--line-time', type=float,
+                       help='time budget of a reference line, in seconds')
+    batch.add_argument('--document-time', type=float,
+                       help='time budget of a document, in seconds')
+    batch.add_argument('--profile', choices=sorted(CFG_REFEXTRACT_PROFILES),
+                       help='speed/accuracy profile of the extraction')
+    batch.add_argument('--progress-interval', type=float, default=10,
+                       help='seconds between throughput reports, 0 for none')
+
+    profile = subparsers.add_parser(
+        'profile', help='show where the time goes for one document')
+    profile.add_argument('input', help='PDF or text file, "-" for stdin')
+    profile.add_argument('--top', type=int, default=10,
+                         help='number of slowest lines and patterns shown')
+    profile.add_argument('--no-patterns', action='store_true',
+                         help='do not time the patterns')
+    profile.add_argument('--json', action='store_true',
+                         help='print the profile as JSON')
+
+    args = parser.parse_args(argv)
+    if args.command == 'profile':
+        return run_profile(args)
+
+    extensions = [extension if extension.startswith('.') else '.' + extension
+                  for extension in args.extensions.split(',')]
+    options = {'budgets': {'line_time': args.line_time,
+                           'document_time': args.document_time},
+               'profile': args.profile}
+    sources = iter_sources(args.inputs, args.lists, extensions)
+    run_batch(sources, args.output, args.workers, options,
+              args.progress_interval)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Thin client of the extraction daemon.
+
+It only imports the standard library, and falls back to extracting in the
+current process when no daemon is running:
+
+.. code-block:: console
+
+    $ refextract-client file paper.pdf | jq '.references[].raw_ref'
+    $ echo 'J.Phys.,A39,13445' | refextract-client journal -
+
+The address of the daemon is taken from ``--address`` or from the
+``REFEXTRACT_DAEMON`` environment variable: ``host:port``, or the path of a
+Unix socket.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+from http.client import HTTPConnection
+
+DEFAULT_ADDRESS = '127.0.0.1:8754'
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, path, timeout=None):
+        HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonError(Exception):
+    """Raised when the daemon answers a request with an error."""
+
+    def __init__(self, status, message):
+        super(DaemonError, self).__init__(message)
+        self.status = status
+
+
+def get_connection(address=None, timeout=None):
+    address = address or os.environ.get('REFEXTRACT_DAEMON', DEFAULT_ADDRESS)
+    if os.sep in address:
+        return UnixHTTPConnection(address, timeout=timeout)
+    host, port = address.rsplit(':', 1)
+    return HTTPConnection(host, int(port), timeout=timeout)
+
+
+def request(kind, arguments=None, address=None, timeout=None):
+    """Send a request to the daemon, returning its decoded answer.
+
+    ``kind`` is 'health', 'file', 'string' or 'journal'. It raises
+    socket.error (OSError) if the daemon is not reachable and DaemonError if
+    the request failed.
+    """
+    connection = get_connection(address, timeout)
+    try:
+        if kind == 'health':
+            connection.request('GET', '/health')
+        else:
+            connection.request('POST', '/' + kind,
+                               json.dumps(arguments).encode('utf-8'),
+                               {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        content = json.loads(response.read().decode('utf-8'))
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise DaemonError(response.status, content.get('error'))
+    return content
+
+
+def extract(kind, arguments, address=None, timeout=None, fallback=True):
+    """Run a request on the daemon, or in this process if it is not
+    running and ``fallback`` is True."""
+    try:
+        return request(kind, arguments, address, timeout)
+    except (OSError, socket.error):
+        if not fallback:
+            raise
+    from .daemon import handle_request
+    return handle_request(kind, arguments)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Extract references through the refextract daemon.')
+    parser.add_argument('--address', help='host:port or Unix socket path')
+    parser.add_argument('--timeout', type=float)
+    parser.add_argument('--no-fallback', action='store_true',
+                        help='fail if the daemon is not running')
+    parser.add_argument('kind', choices=('health', 'file', 'string',
+                                         'journal'))
+    parser.add_argument('input', nargs='?', default='-',
+                        help='path of the file, or text ("-" for stdin)')
+    args = parser.parse_args(argv)
+
+    if args.kind == 'health':
+        result = request('health', address=args.address, timeout=args.timeout)
+    else:
+        text = args.input
+        if text == '-':
+            text = sys.stdin.read()
+        if args.kind == 'file':
+            arguments = {'path': os.path.abspath(text.strip())}
+        elif args.kind == 'string':
+            arguments = {'source': text}
+        else:
+            arguments = {'line': text.strip()}
+        try:
+            result = extract(args.kind, arguments, args.address,
+                             args.timeout, not args.no_fallback)
+        except DaemonError as err:
+            print('Error %s: %s' % (err.status, err), file=sys.stderr)
+            return 1
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Long-running extraction daemon.
+
+The daemon keeps a pool of worker processes with the knowledge bases loaded
+and serves the extraction API over HTTP, on a TCP or a Unix socket:
+
+.. code-block:: console
+
+    $ refextract-daemon --workers 4 --socket /tmp/refextract.sock
+
+It answers to ``GET /health`` and to ``POST`` requests with a JSON object of
+arguments on ``/file`` (``path``), ``/string`` (``source``) and ``/journal``
+(``line``). Requests beyond the capacity of the pool are rejected with a
+503 status. See refextract.client for the client.
+
+As ``/file`` reads the file the client names, it is refused with a 403
+status when the daemon listens on a non-loopback address, unless the files
+are restricted to a directory with ``--files-root``.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import ipaddress
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .references.api import (
+    extract_journal_reference,
+    extract_references_from_file,
+    extract_references_from_string,
+)
+from .references.config import (
+    CFG_REFEXTRACT_DAEMON_HOST,
+    CFG_REFEXTRACT_DAEMON_PORT,
+    CFG_REFEXTRACT_DAEMON_QUEUE_SIZE,
+    CFG_REFEXTRACT_DAEMON_WORKERS,
+)
+from .references.errors import (
+    FullTextNotAvailableError,
+    UnknownDocumentTypeError,
+)
+from .references.kbs import get_kbs
+from .references.regexs import compile_lazy_patterns
+
+LOGGER = logging.getLogger(__name__)
+
+# Arguments accepted by each kind of request, the first one being required.
+# The knowledge bases are given to the daemon when it starts, not by the
+# requests, as they are paths read by the daemon.
+REQUEST_ARGUMENTS = {
+    'file': ('path', 'recid', 'reference_format', 'reference_search_mode',
+             'budgets', 'profile'),
+    'string': ('source', 'is_only_references', 'recid', 'reference_format',
+               'budgets', 'profile'),
+    'journal': ('line',),
+}
+
+ERROR_STATUSES = (
+    (FullTextNotAvailableError, 404),
+    (UnknownDocumentTypeError, 415),
+    (ValueError, 400),
+)
+
+
+def check_request(kind, arguments):
+    """Check the arguments of a request, raising ValueError if invalid."""
+    if kind not in REQUEST_ARGUMENTS:
+        raise ValueError('Unknown request: %s' % kind)
+    if not isinstance(arguments, dict):
+        raise ValueError('The arguments must be a JSON object')
+    required = REQUEST_ARGUMENTS[kind][0]
+    if required not in arguments:
+        raise ValueError('Missing argument: %s' % required)
+    unknown = set(arguments) - set(REQUEST_ARGUMENTS[kind])
+    if unknown:
+        raise ValueError('Unknown arguments: %s' % ', '.join(sorted(unknown)))
+
+
+def handle_request(kind, arguments):
+    """Run a request, returning its JSON serialisable result.
+
+    This is run in the worker processes of the daemon, and in the client
+    when no daemon is running.
+    """
+    check_request(kind, arguments)
+    arguments = dict(arguments)
+    if kind == 'journal':
+        return {'reference': extract_journal_reference(**arguments)}
+
+    stats = {}
+    if kind == 'file':
+        references = extract_references_from_file(arguments.pop('path'),
+                                                  stats=stats, **arguments)
+    else:
+        references = extract_references_from_string(arguments.pop('source'),
+                                                    stats=stats, **arguments)
+    return {'references': references, 'stats': stats}
+
+
+def warm_up(override_kbs_files=None):
+    """Load the knowledge bases and compile the patterns in a worker
+    process."""
+    get_kbs(custom_kbs_files=override_kbs_files)
+    compile_lazy_patterns()
+
+
+class ForbiddenError(Exception):
+    """Raised when a request is not allowed."""
+
+
+def is_loopback(host):
+    """Check if the daemon listening on ``host`` is only reachable from the
+    local machine."""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # A host name
+        try:
+            return all(ipaddress.ip_address(address[4][0]).is_loopback
+                       for address in socket.getaddrinfo(host, None))
+        except socket.gaierror:
+            return False
+
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+    """Handler of the requests to the daemon."""
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        LOGGER.info("%s - %s", self.address_string(), format % args)
+
+    def send_json(self, status, content, headers=None):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_json(404, {'error': 'Not found: %s' % self.path})
+            return
+        self.send_json(200, self.server.health())
+
+    def do_POST(self):
+        kind = self.path.strip('/')
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            arguments = json.loads(self.rfile.read(length).decode('utf-8'))
+            check_request(kind, arguments)
+        except ValueError as err:
+            self.send_json(400, {'error': str(err)})
+            return
+
+        if kind == 'file':
+            try:
+                arguments['path'] = self.server.check_file(arguments['path'])
+            except ForbiddenError as err:
+                self.send_json(403, {'error': str(err),
+                                     'type': err.__class__.__name__})
+                return
+
+        if not self.server.acquire_slot():
+            self.send_json(503, {'error': 'Too many requests'},
+                           {'Retry-After': '1'})
+            return
+        try:
+            result = self.server.executor.submit(
+                handle_request, kind, arguments).result()
+        except Exception as err:
+            status = 500
+            for error_class, error_status in ERROR_STATUSES:
+                if isinstance(err, error_class):
+                    status = error_status
+                    break
+            self.send_json(status, {'error': str(err),
+                                    'type': err.__class__.__name__})
+            return
+        finally:
+            self.server.release_slot()
+        self.send_json(200, result)
+
+
+class ExtractionServerMixin(socketserver.ThreadingMixIn):
+    """Server running the requests in a pool of warm worker processes.
+
+    At most ``workers`` requests are run at the same time, and
+    ``queue_size`` more wait for a worker; further requests are rejected.
+
+    The files of the ``/file`` requests must be in ``files_root`` if given;
+    otherwise they are only allowed if ``local`` (the daemon is only
+    reachable from the local machine).
+    """
+
+    daemon_threads = True
+
+    def setup_pool(self, workers, queue_size, override_kbs_files=None,
+                   files_root=None, local=True):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+        self.files_root = files_root and os.path.realpath(files_root)
+        self.local = local
+        self.executor = ProcessPoolExecutor(workers, initializer=warm_up,
+                                            initargs=(override_kbs_files,))
+        # Start the workers before the first request
+        for future in [self.executor.submit(warm_up, override_kbs_files)
+                       for dummy in range(workers)]:
+            future.result()
+
+    def acquire_slot(self):
+        """Count a request in flight, returning False if the daemon is at
+        capacity."""
+        with self.in_flight_lock:
+            if self.in_flight >= self.capacity:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_slot(self):
+        with self.in_flight_lock:
+            self.in_flight -= 1
+
+    def check_file(self, path):
+        """Return the real path of the file of a /file request, raising
+        ForbiddenError if the daemon may not read it."""
+        if self.files_root is None:
+            if not self.local:
+                raise ForbiddenError('Files are only served to local clients '
+                                     'without --files-root')
+            return path
+        real_path = os.path.realpath(path)
+        if os.path.commonpath([self.files_root, real_path]) != self.files_root:
+            raise ForbiddenError('Not in the files root: %s' % path)
+        return real_path
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'capacity': self.capacity,
+        }
+
+    def server_close(self):
+        super(ExtractionServerMixin, self).server_close()
+        self.executor.shutdown()
+
+
+class ExtractionHTTPServer(ExtractionServerMixin, HTTPServer):
+    """Extraction daemon listening on a TCP socket."""
+
+
+class ExtractionUnixServer(ExtractionServerMixin,
+                           socketserver.UnixStreamServer):
+    """Extraction daemon listening on a Unix socket."""
+
+
+def make_server(host=CFG_REFEXTRACT_DAEMON_HOST,
+                port=CFG_REFEXTRACT_DAEMON_PORT,
+                socket_path=None,
+                workers=CFG_REFEXTRACT_DAEMON_WORKERS,
+                queue_size=CFG_REFEXTRACT_DAEMON_QUEUE_SIZE,
+                override_kbs_files=None,
+                files_root=None):
+    """Create the daemon, listening on the Unix socket ``socket_path`` if
+    given, else on ``host`` and ``port``.
+
+    The ``/file`` requests can only read the files in ``files_root`` if
+    given; otherwise they are refused unless the daemon listens on a Unix
+    socket or a loopback address.
+
+    An existing ``socket_path`` is replaced only if it is a socket.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise ValueError('Not a socket: %s' % socket_path)
+            os.remove(socket_path)
+        server = ExtractionUnixServer(socket_path, ExtractionRequestHandler)
+        local = True
+    else:
+        server = ExtractionHTTPServer((host, port), ExtractionRequestHandler)
+        local = is_loopback(host)
+    server.setup_pool(workers, queue_size, override_kbs_files, files_root,
+                      local)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve the refextract API with warm worker processes.')
+    parser.add_argument('--host', default=CFG_REFEXTRACT_DAEMON_HOST)
+    parser.add_argument('--port', type=int,
+                        default=CFG_REFEXTRACT_DAEMON_PORT)
+    parser.add_argument('--socket', help='listen on this Unix socket instead')
+    parser.add_argument('--workers', type=int,
+                        default=CFG_REFEXTRACT_DAEMON_WORKERS)
+    parser.add_argument('--queue-size', type=int,
+                        default=CFG_REFEXTRACT_DAEMON_QUEUE_SIZE)
+    parser.add_argument('--files-root',
+                        help='only serve the /file requests of the files in '
+                             'this directory')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        server = make_server(args.host, args.port, args.socket, args.workers,
+                             args.queue_size, files_root=args.files_root)
+    except ValueError as err:
+        parser.error(str(err))
+    LOGGER.info("Listening on %s", args.socket or
+                '%s:%s' % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
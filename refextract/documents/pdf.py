@@ -41,9 +41,12 @@ import os
 import re
 import subprocess
 
+from io import BytesIO
+
 from six import iteritems
 
 from ..references.config import CFG_PATH_PDFTOTEXT
+from ..references.hooks import get_file_size, traced
 
 LOGGER = logging.getLogger(__name__)
 
@@ -449,14 +452,11 @@ def replace_undesirable_characters(line):
     return line
 
 
-def convert_PDF_to_plaintext(fpath, keep_layout=False):
-    """ Convert PDF to txt using pdftotext
+def get_pdftotext_command(fpath, keep_layout=False):
+    """Build the pdftotext command converting a PDF file to plain text.
 
-    Take the path to a PDF file and run pdftotext for this file, capturing
-    the output.
-    @param fpath: (string) path to the PDF file
-    @return: (list) of unicode strings (contents of the PDF file translated
-    into plaintext; each string is a line in the document.)
+    @param fpath: (string) path to the PDF file, or "-" for the standard input
+    @return: (list) the command and its arguments
     """
     if not os.path.isfile(CFG_PATH_PDFTOTEXT):
         raise IOError('Missing pdftotext executable')
@@ -465,35 +465,84 @@ def convert_PDF_to_plaintext(fpath, keep_layout=False):
         layout_option = "-layout"
     else:
         layout_option = "-raw"
-    doclines = []
-    # Pattern to check for lines with a leading page-break character.
-    # If this pattern is matched, we want to split the page-break into
-    # its own line because we rely upon this for trying to strip headers
-    # and footers, and for some other pattern matching.
-    p_break_in_line = re.compile(r'^\s*\f(.+)$', re.UNICODE)
-    # build pdftotext command:
-    cmd_pdftotext = [CFG_PATH_PDFTOTEXT, layout_option, "-q",
-                     "-enc", "UTF-8", fpath, "-"]
+    return [CFG_PATH_PDFTOTEXT, layout_option, "-q",
+            "-enc", "UTF-8", fpath, "-"]
 
-    LOGGER.debug(u"%s", ' '.join(cmd_pdftotext))
-    # open pipe to pdftotext:
-    pipe_pdftotext = subprocess.Popen(cmd_pdftotext, stdout=subprocess.PIPE)
 
-    # read back results:
-    for docline in pipe_pdftotext.stdout:
+# Pattern to check for lines with a leading page-break character.
+re_break_in_line = re.compile(r'^\s*\f(.+)$', re.UNICODE)
+
+
+def split_page_breaks(doclines):
+    """Decode the lines output by pdftotext, splitting the page-breaks
+    into their own lines.
+
+    @param doclines: (iterable) of lines of bytes
+    @return: (list) of unicode strings
+    """
+    unicodelines = []
+    for docline in doclines:
         unicodeline = docline.decode("utf-8")
         # Check for a page-break in this line:
-        m_break_in_line = p_break_in_line.match(unicodeline)
+        m_break_in_line = re_break_in_line.match(unicodeline)
         if m_break_in_line is None:
             # There was no page-break in this line. Just add the line:
-            doclines.append(unicodeline)
+            unicodelines.append(unicodeline)
         else:
             # If there was a page-break character in the same line as some
             # text, split it out into its own line so that we can later
             # try to find headers and footers:
-            doclines.append(u"\f")
-            doclines.append(m_break_in_line.group(1))
+            unicodelines.append(u"\f")
+            unicodelines.append(m_break_in_line.group(1))
+    return unicodelines
+
+
+@traced(input_size=get_file_size)
+def convert_PDF_to_plaintext(fpath, keep_layout=False):
+    """ Convert PDF to txt using pdftotext
+
+    Take the path to a PDF file and run pdftotext for this file, capturing
+    the output.
+    @param fpath: (string) path to the PDF file
+    @return: (list) of unicode strings (contents of the PDF file translated
+    into plaintext; each string is a line in the document.)
+    """
+    # build pdftotext command:
+    cmd_pdftotext = get_pdftotext_command(fpath, keep_layout)
+
+    LOGGER.debug(u"%s", ' '.join(cmd_pdftotext))
+    # open pipe to pdftotext:
+    pipe_pdftotext = subprocess.Popen(cmd_pdftotext, stdout=subprocess.PIPE)
+
+    # read back results, splitting the page-breaks in their own lines as
+    # we rely upon this for trying to strip headers and footers, and for
+    # some other pattern matching:
+    doclines = split_page_breaks(pipe_pdftotext.stdout)
 
     LOGGER.debug(u"convert_PDF_to_plaintext found: %s lines of text", len(doclines))
 
     return doclines
+
+
+def convert_PDF_bytes_to_plaintext(data, keep_layout=False):
+    """ Convert PDF to txt using pdftotext, from the content of the PDF
+
+    Same as convert_PDF_to_plaintext, the PDF being piped to the standard
+    input of pdftotext instead of being read from a file.
+    @param data: (bytes) the content of the PDF file
+    @return: (list) of unicode strings (contents of the PDF file translated
+    into plaintext; each string is a line in the document.)
+    """
+    cmd_pdftotext = get_pdftotext_command("-", keep_layout)
+
+    LOGGER.debug(u"%s", ' '.join(cmd_pdftotext))
+    pipe_pdftotext = subprocess.Popen(cmd_pdftotext, stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE)
+    output, dummy = pipe_pdftotext.communicate(data)
+
+    # Split on the newlines only, as when reading the pipe
+    doclines = split_page_breaks(BytesIO(output).readlines())
+
+    LOGGER.debug(u"convert_PDF_bytes_to_plaintext found: %s lines of text", len(doclines))
+
+    return doclines
@@ -28,18 +28,21 @@ from __future__ import absolute_import, division, print_function
 import re
 from six.moves import xrange
 
-re_space_comma = re.compile(r'\s,', re.UNICODE)
-re_space_semicolon = re.compile(r'\s;', re.UNICODE)
-re_space_period = re.compile(r'\s\.', re.UNICODE)
-re_colon_space_colon = re.compile(r':\s:', re.UNICODE)
-re_comma_space_colon = re.compile(r',\s:', re.UNICODE)
-re_space_closing_square_bracket = re.compile(r'\s\]', re.UNICODE)
-re_opening_square_bracket_space = re.compile(r'\[\s', re.UNICODE)
-re_hyphens = re.compile(
+from ..references.hooks import traced
+from ..references.regexs import lazy_compile
+
+re_space_comma = lazy_compile(r'\s,', re.UNICODE)
+re_space_semicolon = lazy_compile(r'\s;', re.UNICODE)
+re_space_period = lazy_compile(r'\s\.', re.UNICODE)
+re_colon_space_colon = lazy_compile(r':\s:', re.UNICODE)
+re_comma_space_colon = lazy_compile(r',\s:', re.UNICODE)
+re_space_closing_square_bracket = lazy_compile(r'\s\]', re.UNICODE)
+re_opening_square_bracket_space = lazy_compile(r'\[\s', re.UNICODE)
+re_hyphens = lazy_compile(
     r'(\\255|\u02D7|\u0335|\u0336|\u2212|\u002D|\uFE63|\uFF0D)', re.UNICODE)
-re_multiple_space = re.compile(r'\s{2,}', re.UNICODE)
+re_multiple_space = lazy_compile(r'\s{2,}', re.UNICODE)
 
-re_group_captured_multiple_space = re.compile(r'(\s{2,})', re.UNICODE)
+re_group_captured_multiple_space = lazy_compile(r'(\s{2,})', re.UNICODE)
 
 
 def get_url_repair_patterns():
@@ -78,16 +81,16 @@ def get_url_repair_patterns():
         r'((http|ftp):\/\/([\w\d\_\.\-])+\/(([\w\d\_\s\.\-])+?\/)+)',
         r'((http|ftp):\/\/([\w\d\_\.\-])+\/(([\w\d\_\s\.\-])+?\/)*([\w\d\_\s\-]+\.\s?[\w\d]+))',
     ]
-    pattern_list = [re.compile(p, re.I | re.UNICODE) for p in pattern_list]
+    pattern_list = [lazy_compile(p, re.I | re.UNICODE) for p in pattern_list]
 
     # some possible endings for URLs:
     p = r'((http|ftp):\/\/([\w\d\_\.\-])+\/(([\w\d\_\.\-])+?\/)*([\w\d\_\-]+\.%s))'
     for extension in file_types_list:
-        p_url = re.compile(p % extension, re.I | re.UNICODE)
+        p_url = lazy_compile(p % extension, re.I | re.UNICODE)
         pattern_list.append(p_url)
 
     # if url last thing in line, and only 10 letters max, concat them
-    p_url = re.compile(
+    p_url = lazy_compile(
         r'((http|ftp):\/\/([\w\d\_\.\-])+\/(([\w\d\_\.\-])+?\/)*\s*?([\w\d\_\.\-]\s?){1,10}\s*)$',
         re.I | re.UNICODE)
     pattern_list.append(p_url)
@@ -183,6 +186,7 @@ def wash_line(line):
     return line
 
 
+@traced
 def remove_page_boundary_lines(docbody):
     """Try to locate page breaks, headers and footers within a document body,
        and remove the array cells at which they are found.
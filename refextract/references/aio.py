@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Asyncio counterparts of the API calls to extract references.
+
+PDF documents are converted to text by pdftotext in an asyncio subprocess.
+The CPU-bound steps (finding the reference section, parsing the references)
+and the blocking file operations are run in an executor, which can be given
+to each call (e.g. a ``concurrent.futures.ProcessPoolExecutor``, in which
+case the callbacks must be picklable). Downloads use ``aiohttp``, which must
+be installed (``pip install refextract[async]``):
+
+>>> async with aiohttp.ClientSession() as session:
+...     references = await extract_references_from_url_async(url, session=session)
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import functools
+import os
+import time
+
+from io import BytesIO
+from tempfile import mkstemp
+
+import magic
+
+from .api import add_section_report, add_texkeys
+from .config import (
+    CFG_REFEXTRACT_ASYNC_CONNECTION_LIMIT,
+    CFG_REFEXTRACT_ASYNC_WRITE_SIZE,
+    CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+)
+from .engine import (
+    get_budgets,
+    get_plaintext_document_body,
+    get_profile,
+    parse_references,
+)
+from .errors import FullTextNotAvailableError
+from .metrics import LAYOUT_FALLBACKS, REFERENCE_SECTION_SEARCHES
+from .pdf import extract_texkeys_from_pdf
+from .text import extract_references_from_fulltext
+from ..documents.pdf import get_pdftotext_command, split_page_breaks
+
+
+def run_in_executor(executor, func, *args, **kwargs):
+    """Run func(*args, **kwargs) in the executor (None for the default one
+    of the event loop)."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor,
+                                functools.partial(func, *args, **kwargs))
+
+
+async def convert_PDF_to_plaintext_async(fpath, keep_layout=False):
+    """Asyncio version of convert_PDF_to_plaintext, running pdftotext in a
+    subprocess."""
+    process = await asyncio.create_subprocess_exec(
+        *get_pdftotext_command(fpath, keep_layout),
+        stdout=asyncio.subprocess.PIPE)
+    output, dummy = await process.communicate()
+    # Split on the newlines only, as when reading the pipe
+    return split_page_breaks(BytesIO(output).readlines())
+
+
+def search_reference_section(docbody, reference_search_mode):
+    """Extract the reference lines of a document body, returning them with
+    the report of the search for the reference section."""
+    section_report = {}
+    reflines, dummy, dummy = extract_references_from_fulltext(
+        docbody, reference_search_mode=reference_search_mode,
+        report=section_report)
+    return reflines, section_report
+
+
+async def get_reference_lines_from_file_async(path,
+                                              reference_search_mode="standard",
+                                              budgets=None,
+                                              profile=None,
+                                              executor=None):
+    """Asyncio version of get_reference_lines_from_file.
+
+    It returns a tuple (reference lines, budgets, report, mime type).
+    """
+    if not await run_in_executor(executor, os.path.isfile, path):
+        raise FullTextNotAvailableError("File not found: '{0}'".format(path))
+    mime_type = await run_in_executor(executor, magic.from_file, path,
+                                      mime=True)
+
+    async def get_document_body(keep_layout=False):
+        if mime_type == "application/pdf":
+            return await convert_PDF_to_plaintext_async(path, keep_layout)
+        return await run_in_executor(executor, get_plaintext_document_body,
+                                     path, keep_layout)
+
+    async def search_reference_lines(docbody, reference_search_mode,
+                                     layout=False):
+        reflines, section_report = await run_in_executor(
+            executor, search_reference_section, docbody,
+            reference_search_mode)
+        add_section_report(report, section_report, layout)
+        return reflines
+
+    budgets = get_budgets(budgets)
+    profile = get_profile(profile)
+    start = time.time()
+    report = {'strategy': None, 'confidence': None, 'seconds': 0.0,
+              'tried': []}
+
+    def within_budget():
+        return budgets['document_time'] is None or \
+            time.time() - start < budgets['document_time']
+
+    docbody = await get_document_body()
+    REFERENCE_SECTION_SEARCHES.inc()
+    reflines = await search_reference_lines(docbody, reference_search_mode)
+    if not reflines and profile['layout_fallback'] and within_budget():
+        LAYOUT_FALLBACKS.inc()
+        reflines = await search_reference_lines(
+            await get_document_body(keep_layout=True), reference_search_mode,
+            layout=True)
+    if not reflines and reference_search_mode == 'standard' and \
+            profile['year_n_symbols_fallback'] and within_budget():
+        reflines = await search_reference_lines(docbody, 'year_n_symbols')
+
+    if budgets['document_time'] is not None:
+        budgets['document_time'] = max(
+            budgets['document_time'] - (time.time() - start), 0)
+
+    return reflines, budgets, report, mime_type
+
+
+async def extract_references_from_file_async(path,
+                                             recid=None,
+                                             reference_format=u"{title} {volume} ({year}) {page}",
+                                             linker_callback=None,
+                                             override_kbs_files=None,
+                                             reference_search_mode="standard",
+                                             budgets=None,
+                                             stats=None,
+                                             bulk_linker_callback=None,
+                                             executor=None,
+                                             profile=None):
+    """Asyncio version of extract_references_from_file.
+
+    The CPU-bound steps are run in the given ``executor``, or in the default
+    executor of the event loop.
+    """
+    profile = get_profile(profile)
+    reflines, budgets, section_report, mime_type = \
+        await get_reference_lines_from_file_async(
+            path, reference_search_mode, budgets, profile, executor)
+
+    parsed_refs, parse_stats = await run_in_executor(
+        executor,
+        parse_references,
+        reflines,
+        recid=recid,
+        reference_format=reference_format,
+        linker_callback=linker_callback,
+        override_kbs_files=override_kbs_files,
+        budgets=budgets,
+        bulk_linker_callback=bulk_linker_callback,
+        profile=profile,
+    )
+    if stats is not None:
+        stats.update(parse_stats, reference_section=section_report)
+
+    if profile['texkeys'] and mime_type == "application/pdf":
+        texkeys = await run_in_executor(executor, extract_texkeys_from_pdf,
+                                        path)
+        parsed_refs = add_texkeys(parsed_refs, texkeys)
+
+    return parsed_refs
+
+
+async def extract_references_from_url_async(url, headers=None,
+                                            chunk_size=CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+                                            session=None, **kwargs):
+    """Asyncio version of extract_references_from_url.
+
+    Pass an ``aiohttp.ClientSession`` as ``session`` to share its connection
+    pool between the calls; otherwise a session is opened for this call.
+    The other arguments are the ones of extract_references_from_file_async.
+    """
+    import aiohttp
+
+    if session is None:
+        connector = aiohttp.TCPConnector(
+            limit=CFG_REFEXTRACT_ASYNC_CONNECTION_LIMIT)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await extract_references_from_url_async(
+                url, headers=headers, chunk_size=chunk_size, session=session,
+                **kwargs)
+
+    # Get temporary filepath to download to
+    filename, filepath = mkstemp(
+        suffix=u"_{0}".format(os.path.basename(url)),
+    )
+    os.close(filename)
+
+    try:
+        async with session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            f = await run_in_executor(None, open, filepath, 'wb')
+            try:
+                # Write the chunks in batches, to hop less to the executor
+                batch = []
+                batch_size = 0
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    batch.append(chunk)
+                    batch_size += len(chunk)
+                    if batch_size >= CFG_REFEXTRACT_ASYNC_WRITE_SIZE:
+                        await run_in_executor(None, f.writelines, batch)
+                        batch = []
+                        batch_size = 0
+                await run_in_executor(None, f.writelines, batch)
+            finally:
+                await run_in_executor(None, f.close)
+        references = await extract_references_from_file_async(filepath,
+                                                              **kwargs)
+    except aiohttp.ClientResponseError:
+        raise FullTextNotAvailableError("URL not found: '{0}'".format(url))
+    finally:
+        await run_in_executor(None, os.remove, filepath)
+    return references
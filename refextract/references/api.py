@@ -30,28 +30,46 @@ from a raw string.
 
 from __future__ import absolute_import, division, print_function
 
+import functools
 import os
 import sys
-import requests
-import magic
+import time
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import islice
 from tempfile import mkstemp
 #from itertools import izip
 
+from .config import (
+    CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+    CFG_REFEXTRACT_DOWNLOAD_CONCURRENCY,
+    CFG_REFEXTRACT_DOWNLOAD_WINDOW,
+)
+
 from .engine import (
+    get_budgets,
     get_kbs,
     get_plaintext_document_body,
-    parse_reference_line,
+    get_plaintext_document_body_from_bytes,
+    get_profile,
+    iter_references,
+    parse_journal_reference,
     parse_references,
 )
 from .errors import FullTextNotAvailableError
+from .metrics import LAYOUT_FALLBACKS, REFERENCE_SECTION_SEARCHES
 from .find import (find_numeration_in_body,
                    get_reference_section_beginning)
-from .pdf import extract_texkeys_from_pdf
+from .pdf import extract_texkeys_from_pdf, extract_texkeys_from_pdf_stream
+from .sampler import sampled_document
 from .text import extract_references_from_fulltext, rebuild_reference_lines
 
 
-def extract_references_from_url(url, headers=None, chunk_size=1024, **kwargs):
+def extract_references_from_url(url, headers=None,
+                                chunk_size=CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+                                session=None, **kwargs):
     """Extract references from the pdf specified in the url.
 
     The first parameter is the URL of the file.
@@ -68,13 +86,125 @@ def extract_references_from_url(url, headers=None, chunk_size=1024, **kwargs):
 
     If you want to also link each reference to some other resource (like a record),
     you can provide a linker_callback function to be executed for every reference
-    element found.
+    element found, or a bulk_linker_callback function to be executed once with
+    the list of all the linkable elements, returning the list of their recids.
 
     To override KBs for journal names etc., use ``override_kbs_files``:
 
     >>> extract_references_from_url(path, override_kbs_files={'journals': 'my/path/to.kb'})
 
+    The download goes through a shared, connection-pooled session unless
+    a ``requests.Session`` is given as ``session``.
+
+    """
+    filepath = download_url(url, headers, chunk_size, session)
+    try:
+        with sampled_document(kwargs.get('recid') or url):
+            references = extract_references_from_file(filepath, **kwargs)
+    finally:
+        os.remove(filepath)
+    return references
+
+
+def extract_references_from_urls(urls, headers=None,
+                                 chunk_size=CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+                                 concurrency=CFG_REFEXTRACT_DOWNLOAD_CONCURRENCY,
+                                 return_exceptions=False,
+                                 session=None, **kwargs):
+    """Extract references from the pdfs specified in a list of urls.
+
+    It returns the list of the parsed references of each URL, in the same
+    order as the URLs.
+
+    Up to ``concurrency`` documents are downloaded at the same time through
+    a shared, connection-pooled session (or the given ``session``), while
+    the references of the documents already downloaded are extracted. The
+    downloads run at most ``CFG_REFEXTRACT_DOWNLOAD_WINDOW`` times
+    ``concurrency`` documents ahead of the extraction, which bounds the
+    temporary files kept on disk.
+
+    If ``return_exceptions`` is True, the exception raised for a URL (e.g.
+    FullTextNotAvailableError) is returned in its place instead of being
+    raised.
+
+    The other arguments are the ones of ``extract_references_from_file``:
+
+    >>> extract_references_from_urls(urls, reference_format="{title},{volume},{page}")
+
     """
+    if session is None:
+        session = get_session(max(concurrency, CFG_REFEXTRACT_DOWNLOAD_CONCURRENCY))
+
+    urls = iter(urls)
+    window = CFG_REFEXTRACT_DOWNLOAD_WINDOW * concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    # The URLs and downloads not extracted yet, in the order of the URLs
+    downloads = deque()
+    results = []
+    try:
+        while True:
+            for url in islice(urls, window - len(downloads)):
+                downloads.append((url, executor.submit(
+                    download_url, url, headers, chunk_size, session)))
+            if not downloads:
+                break
+            url, download = downloads[0]
+            try:
+                filepath = download.result()
+                try:
+                    with sampled_document(kwargs.get('recid') or url):
+                        results.append(
+                            extract_references_from_file(filepath, **kwargs))
+                finally:
+                    os.remove(filepath)
+            except Exception as err:
+                if not return_exceptions:
+                    raise
+                results.append(err)
+            downloads.popleft()
+    finally:
+        # Clean up the downloads which will not be extracted, on any error
+        # or interruption
+        for url, download in downloads:
+            download.cancel()
+        executor.shutdown(wait=True)
+        for url, download in downloads:
+            if not download.cancelled() and download.exception() is None \
+                    and os.path.exists(download.result()):
+                os.remove(download.result())
+
+    return results
+
+
+def get_session(pool_maxsize=CFG_REFEXTRACT_DOWNLOAD_CONCURRENCY, cache={}):  # noqa
+    """Return a requests session shared by the downloads, keeping up to
+    ``pool_maxsize`` connections alive per host.
+
+    This function stores the sessions into the cache variable.
+    """
+    if pool_maxsize not in cache:
+        import requests
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        cache[pool_maxsize] = session
+    return cache[pool_maxsize]
+
+
+def download_url(url, headers=None,
+                 chunk_size=CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE, session=None):
+    """Download the document at the url in a temporary file.
+
+    It returns the path to the file, which must be removed by the caller.
+    It raises FullTextNotAvailableError if the URL gives a 404.
+    """
+    import requests
+
+    if session is None:
+        session = get_session()
+
     # Get temporary filepath to download to
     filename, filepath = mkstemp(
         suffix=u"_{0}".format(os.path.basename(url)),
@@ -82,21 +212,18 @@ def extract_references_from_url(url, headers=None, chunk_size=1024, **kwargs):
     os.close(filename)
 
     try:
-        req = requests.get(
-            url=url,
-            headers=headers,
-            stream=True
-        )
-        req.raise_for_status()
-        with open(filepath, 'wb') as f:
-            for chunk in req.iter_content(chunk_size):
-                f.write(chunk)
-        references = extract_references_from_file(filepath, **kwargs)
+        with session.get(url=url, headers=headers, stream=True) as req:
+            req.raise_for_status()
+            with open(filepath, 'wb') as f:
+                for chunk in req.iter_content(chunk_size):
+                    f.write(chunk)
     except requests.exceptions.HTTPError:
+        os.remove(filepath)
         raise FullTextNotAvailableError("URL not found: '{0}'".format(url))#, None, sys.exc_info()[2]
-    finally:
+    except Exception:
         os.remove(filepath)
-    return references
+        raise
+    return filepath
 
 
 def extract_references_from_file(path,
@@ -104,7 +231,12 @@ def extract_references_from_file(path,
                                  reference_format=u"{title} {volume} ({year}) {page}",
                                  linker_callback=None,
                                  override_kbs_files=None,
-                                 reference_search_mode="standard"):
+                                 reference_search_mode="standard",
+                                 budgets=None,
+                                 stats=None,
+                                 processes=None,
+                                 bulk_linker_callback=None,
+                                 profile=None):
     """Extract references from a local pdf file.
 
     The first parameter is the path to the file.
@@ -120,38 +252,265 @@ def extract_references_from_file(path,
 
     If you want to also link each reference to some other resource (like a record),
     you can provide a linker_callback function to be executed for every reference
-    element found.
+    element found, or a bulk_linker_callback function to be executed once with
+    the list of all the linkable elements, returning the list of their recids.
 
     To override KBs for journal names etc., use ``override_kbs_files``:
 
     >>> extract_references_from_file(path, override_kbs_files={'journals': 'my/path/to.kb'})
 
+    To bound the time spent on pathological documents, pass ``budgets``
+    (see ``CFG_REFEXTRACT_BUDGETS``). The document time budget includes the
+    conversion of the file to text:
+
+    >>> extract_references_from_file(path, budgets={'line_time': 1, 'document_time': 30})
+
+    If ``stats`` is a dictionary, it is updated with the extraction stats,
+    including the ``reference_section`` report of the search for the
+    reference section (see ``get_reference_lines``).
+
+    Large reference sections can be parsed by a pool of ``processes``
+    (see ``parse_references``).
+
+    To trade accuracy for speed, pass the name of a ``profile`` of
+    ``CFG_REFEXTRACT_PROFILES``: 'fast' skips the costliest heuristics,
+    'identifiers' only looks for DOIs, URLs, handles and report numbers:
+
+    >>> extract_references_from_file(path, profile='identifiers')
+
     """
-    if not os.path.isfile(path):
-        raise FullTextNotAvailableError("File not found: '{0}'".format(path))
+    profile = get_profile(profile)
+    reflines, budgets, section_report = get_reference_lines_from_file(
+        path, reference_search_mode, budgets, profile)
+
+    with sampled_document(recid or path):
+        parsed_refs, parse_stats = parse_references(
+            reflines,
+            recid=recid,
+            reference_format=reference_format,
+            linker_callback=linker_callback,
+            override_kbs_files=override_kbs_files,
+            budgets=budgets,
+            bulk_linker_callback=bulk_linker_callback,
+            processes=processes,
+            profile=profile,
+        )
+    if stats is not None:
+        stats.update(parse_stats, reference_section=section_report)
 
-    print("search mode", reference_search_mode)
-    docbody = get_plaintext_document_body(path)
-    reflines, dummy, dummy = extract_references_from_fulltext(docbody, reference_search_mode=reference_search_mode)
-    if not reflines:
-        docbody = get_plaintext_document_body(path, keep_layout=True)
-        reflines, dummy, dummy = extract_references_from_fulltext(docbody, reference_search_mode=reference_search_mode)
-
-    
-    parsed_refs, stats = parse_references(
+    import magic
+
+    if profile['texkeys'] and \
+            magic.from_file(path, mime=True) == "application/pdf":
+        texkeys = extract_texkeys_from_pdf(path)
+        parsed_refs = add_texkeys(parsed_refs, texkeys)
+
+    return parsed_refs
+
+
+def extract_references_from_bytes(data,
+                                  recid=None,
+                                  reference_format=u"{title} {volume} ({year}) {page}",
+                                  linker_callback=None,
+                                  override_kbs_files=None,
+                                  reference_search_mode="standard",
+                                  budgets=None,
+                                  stats=None,
+                                  processes=None,
+                                  bulk_linker_callback=None,
+                                  profile=None):
+    """Extract references from the content of a pdf file.
+
+    Same as ``extract_references_from_file``, for a document which is
+    already in memory: the first parameter is the content of the PDF or
+    plain text file (bytes). No temporary file is written, the content
+    being piped to pdftotext.
+
+    It raises UnknownDocumentTypeError if it is not a PDF or plain text.
+
+    >>> extract_references_from_bytes(response.content)
+
+    """
+    profile = get_profile(profile)
+    reflines, budgets, section_report = get_reference_lines(
+        functools.partial(get_plaintext_document_body_from_bytes, data),
+        reference_search_mode, budgets, profile)
+
+    with sampled_document(recid or u'<bytes>'):
+        parsed_refs, parse_stats = parse_references(
+            reflines,
+            recid=recid,
+            reference_format=reference_format,
+            linker_callback=linker_callback,
+            override_kbs_files=override_kbs_files,
+            budgets=budgets,
+            bulk_linker_callback=bulk_linker_callback,
+            processes=processes,
+            profile=profile,
+        )
+    if stats is not None:
+        stats.update(parse_stats, reference_section=section_report)
+
+    import magic
+
+    if profile['texkeys'] and \
+            magic.from_buffer(data, mime=True) == "application/pdf":
+        texkeys = extract_texkeys_from_pdf_stream(BytesIO(data))
+        parsed_refs = add_texkeys(parsed_refs, texkeys)
+
+    return parsed_refs
+
+
+def extract_references_from_stream(stream, **kwargs):
+    """Extract references from a binary file-like object of a pdf file.
+
+    The stream is read entirely in memory, see
+    ``extract_references_from_bytes`` for the other arguments.
+    """
+    return extract_references_from_bytes(stream.read(), **kwargs)
+
+
+def add_texkeys(parsed_refs, texkeys):
+    """Add the texkeys to the references if they match one to one."""
+    if len(texkeys) == len(parsed_refs):
+        parsed_refs = [dict(ref, texkey=[key]) for ref, key in zip(parsed_refs, texkeys)]
+    return parsed_refs
+
+
+def iter_references_from_file(path,
+                              recid=None,
+                              reference_format=u"{title} {volume} ({year}) {page}",
+                              linker_callback=None,
+                              override_kbs_files=None,
+                              reference_search_mode="standard",
+                              budgets=None,
+                              stats=None,
+                              bulk_linker_callback=None,
+                              profile=None):
+    """Extract references from a local pdf file, one at a time.
+
+    Generator version of ``extract_references_from_file``: each parsed
+    reference is yielded as soon as its line has been processed. If
+    ``stats`` is a dictionary, it is updated with the extraction stats once
+    all the references have been yielded.
+
+    As the references are not known in advance, the texkeys of the PDF are
+    not added to them.
+
+    >>> for reference in iter_references_from_file(path):
+    ...     index(reference)
+
+    """
+    profile = get_profile(profile)
+    reflines, budgets, section_report = get_reference_lines_from_file(
+        path, reference_search_mode, budgets, profile)
+
+    references = iter_references(
         reflines,
         recid=recid,
         reference_format=reference_format,
         linker_callback=linker_callback,
         override_kbs_files=override_kbs_files,
+        budgets=budgets,
+        bulk_linker_callback=bulk_linker_callback,
+        stats=stats,
+        profile=profile,
     )
+    if stats is None:
+        return references
 
-    if magic.from_file(path, mime=True) == "application/pdf":
-        texkeys = extract_texkeys_from_pdf(path)
-        if len(texkeys) == len(parsed_refs):
-            parsed_refs = [dict(ref, texkey=[key]) for ref, key in zip(parsed_refs, texkeys)]
+    def iter_reported_references():
+        for reference in references:
+            yield reference
+        stats['reference_section'] = section_report
 
-    return parsed_refs
+    return iter_reported_references()
+
+
+def get_reference_lines_from_file(path, reference_search_mode="standard",
+                                  budgets=None, profile=None):
+    """Get the reference lines of a local pdf or text file.
+
+    See ``get_reference_lines`` for the result.
+    """
+    if not os.path.isfile(path):
+        raise FullTextNotAvailableError("File not found: '{0}'".format(path))
+
+    return get_reference_lines(
+        functools.partial(get_plaintext_document_body, path),
+        reference_search_mode, budgets, profile)
+
+
+def get_reference_lines(get_document_body, reference_search_mode="standard",
+                        budgets=None, profile=None):
+    """Get the reference lines of a document.
+
+    ``get_document_body`` is called to convert the document to text, with
+    keep_layout=True if no reference could be found in the first conversion
+    and the ``profile`` allows it. In the standard search mode, the
+    reference lines of a document in which neither conversion has a
+    reference section are then searched by their years and symbols, if the
+    ``profile`` allows it.
+
+    It returns a tuple (reference lines, budgets, report), the document time
+    budget being reduced by the time spent on the conversion of the
+    document. The report of the search for the reference section is a
+    dictionary of the 'strategy' which found the reference lines, its
+    'confidence', and the 'seconds' spent by the strategies 'tried' (see
+    ``locate_reference_section``), each of them telling if it was tried on
+    the 'layout' conversion.
+    """
+    budgets = get_budgets(budgets)
+    profile = get_profile(profile)
+    start = time.time()
+    report = {'strategy': None, 'confidence': None, 'seconds': 0.0,
+              'tried': []}
+
+    def within_budget():
+        return budgets['document_time'] is None or \
+            time.time() - start < budgets['document_time']
+
+    print("search mode", reference_search_mode)
+    docbody = get_document_body()
+    REFERENCE_SECTION_SEARCHES.inc()
+    reflines = search_reference_lines(docbody, reference_search_mode, report)
+    if not reflines and profile['layout_fallback'] and within_budget():
+        LAYOUT_FALLBACKS.inc()
+        reflines = search_reference_lines(get_document_body(keep_layout=True),
+                                          reference_search_mode, report,
+                                          layout=True)
+    if not reflines and reference_search_mode == 'standard' and \
+            profile['year_n_symbols_fallback'] and within_budget():
+        reflines = search_reference_lines(docbody, 'year_n_symbols', report)
+
+    if budgets['document_time'] is not None:
+        budgets['document_time'] = max(
+            budgets['document_time'] - (time.time() - start), 0)
+
+    return reflines, budgets, report
+
+
+def search_reference_lines(docbody, reference_search_mode, report,
+                           layout=False):
+    """Extract the reference lines of a document body, adding the search for
+    its reference section to the report (see get_reference_lines)."""
+    section_report = {}
+    reflines, dummy, dummy = extract_references_from_fulltext(
+        docbody, reference_search_mode=reference_search_mode,
+        report=section_report)
+    add_section_report(report, section_report, layout)
+    return reflines
+
+
+def add_section_report(report, section_report, layout=False):
+    """Add the report of ``locate_reference_section`` to the report of
+    get_reference_lines."""
+    for attempt in section_report['tried']:
+        attempt['layout'] = layout
+    report['tried'].extend(section_report['tried'])
+    report['seconds'] += section_report['seconds']
+    report['strategy'] = section_report['strategy']
+    report['confidence'] = section_report['confidence']
 
 
 def extract_references_from_string(source,
@@ -159,7 +518,12 @@ def extract_references_from_string(source,
                                    recid=None,
                                    reference_format="{title} {volume} ({year}) {page}",
                                    linker_callback=None,
-                                   override_kbs_files=None):
+                                   override_kbs_files=None,
+                                   budgets=None,
+                                   stats=None,
+                                   processes=None,
+                                   bulk_linker_callback=None,
+                                   profile=None):
     """Extract references from a raw string.
 
     The first parameter is the path to the file.
@@ -176,12 +540,74 @@ def extract_references_from_string(source,
 
     If you want to also link each reference to some other resource (like a record),
     you can provide a linker_callback function to be executed for every reference
-    element found.
+    element found, or a bulk_linker_callback function to be executed once with
+    the list of all the linkable elements, returning the list of their recids.
 
     To override KBs for journal names etc., use ``override_kbs_files``:
 
     >>> extract_references_from_string(path, override_kbs_files={'journals': 'my/path/to.kb'})
+
+    To bound the time spent on pathological input, pass ``budgets``
+    (see ``CFG_REFEXTRACT_BUDGETS``):
+
+    >>> extract_references_from_string(path, budgets={'line_length': 2000})
+
+    If ``stats`` is a dictionary, it is updated with the extraction stats.
+
+    Large reference sections can be parsed by a pool of ``processes``
+    (see ``parse_references``), and the ``profile`` trades accuracy for
+    speed (see ``extract_references_from_file``).
     """
+    reflines = get_reference_lines_from_string(source, is_only_references)
+    parsed_refs, parse_stats = parse_references(
+        reflines,
+        recid=recid,
+        reference_format=reference_format,
+        linker_callback=linker_callback,
+        override_kbs_files=override_kbs_files,
+        budgets=budgets,
+        bulk_linker_callback=bulk_linker_callback,
+        processes=processes,
+        profile=profile,
+    )
+    if stats is not None:
+        stats.update(parse_stats)
+    return parsed_refs
+
+
+def iter_references_from_string(source,
+                                is_only_references=True,
+                                recid=None,
+                                reference_format="{title} {volume} ({year}) {page}",
+                                linker_callback=None,
+                                override_kbs_files=None,
+                                budgets=None,
+                                stats=None,
+                                bulk_linker_callback=None,
+                                profile=None):
+    """Extract references from a raw string, one at a time.
+
+    Generator version of ``extract_references_from_string``: each parsed
+    reference is yielded as soon as its line has been processed. If
+    ``stats`` is a dictionary, it is updated with the extraction stats once
+    all the references have been yielded.
+    """
+    reflines = get_reference_lines_from_string(source, is_only_references)
+    return iter_references(
+        reflines,
+        recid=recid,
+        reference_format=reference_format,
+        linker_callback=linker_callback,
+        override_kbs_files=override_kbs_files,
+        budgets=budgets,
+        bulk_linker_callback=bulk_linker_callback,
+        stats=stats,
+        profile=profile,
+    )
+
+
+def get_reference_lines_from_string(source, is_only_references=True):
+    """Get the reference lines of a raw string."""
     docbody = source.split('\n')
     if not is_only_references:
         reflines, dummy, dummy = extract_references_from_fulltext(docbody)
@@ -194,26 +620,46 @@ def extract_references_from_string(source,
 
         reflines = rebuild_reference_lines(
             docbody, refs_info['marker_pattern'])
-    parsed_refs, stats = parse_references(
-        reflines,
-        recid=recid,
-        reference_format=reference_format,
-        linker_callback=linker_callback,
-        override_kbs_files=override_kbs_files,
-    )
-    return parsed_refs
+    return reflines
 
 
 def extract_journal_reference(line, override_kbs_files=None):
     """Extract the journal reference from string.
 
     Extracts the journal reference from string and parses for specific
-    journal information.
+    journal information. Only the journal titles and their numeration are
+    looked for (see ``parse_journal_reference``): the text of the report
+    numbers, DOIs and URLs is left in the ``misc_txt``.
     """
     kbs = get_kbs(custom_kbs_files=override_kbs_files)
-    references, dummy_m, dummy_c, dummy_co = parse_reference_line(line, kbs)
+    el = parse_journal_reference(line, kbs)
+    if el is not None:
+        return el.to_dict()
+
+
+def iter_journal_references(lines, override_kbs_files=None):
+    """Extract the journal references from strings, one at a time.
+
+    This is the batch version of ``extract_journal_reference``: the
+    knowledge bases are loaded once for all the ``lines``, which can be any
+    iterable, e.g. a file of publication notes.
 
-    for elements in references:
-        for el in elements:
-            if el['type'] == 'JOURNAL':
-                return el
+    >>> with open('pubnotes.txt') as f:
+    ...     for reference in iter_journal_references(f):
+    ...         print(reference and reference['title'])
+
+    It yields the journal reference of each line, or None.
+    """
+    kbs = get_kbs(custom_kbs_files=override_kbs_files)
+    for line in lines:
+        el = parse_journal_reference(line, kbs)
+        yield el.to_dict() if el is not None else None
+
+
+def extract_journal_references(lines, override_kbs_files=None):
+    """Extract the journal references from strings.
+
+    It returns the list of the journal references of the ``lines`` (None
+    for the lines without one), see ``iter_journal_references``.
+    """
+    return list(iter_journal_references(lines, override_kbs_files))
@@ -33,13 +33,11 @@ except ImportError:
     # CPython <3.3
     from distutils.spawn import find_executable as which
 
-import pkg_resources
-
 # Version number:
 CFG_PATH_PDFTOTEXT = os.environ.get('CFG_PATH_PDFTOTEXT', which('pdftotext'))
 
 # Module config directory
-CFG_KBS_DIR = pkg_resources.resource_filename('refextract.references', 'kbs')
+CFG_KBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kbs')
 
 CFG_REFEXTRACT_KBS = {
     'journals': "%s/journal-titles.kb" % CFG_KBS_DIR,
@@ -121,3 +119,117 @@ CGF_REFEXTRACT_ADJACENT_AUTH_MISC_SEPARATION = 10
 
 # Maximum number of lines for a citation before it is considered invalid
 CFG_REFEXTRACT_MAX_LINES = 25
+
+# Confidence of a reference section ending the search for the section (see
+# refextract.references.find.locate_reference_section): the first section
+# found with this confidence is kept, even if a costlier strategy could find
+# one of a higher confidence.
+CFG_REFEXTRACT_SECTION_CONFIDENCE_THRESHOLD = 1.0
+
+# Budgets bounding the work spent on the reference lines of a document.
+# A line exceeding one of its budgets is degraded to a cheaper parse which
+# only looks for identifiers (DOIs, URLs, arXiv report numbers); once the
+# document budget is exhausted the remaining lines are kept as raw misc text.
+# A value of None disables the corresponding budget.
+CFG_REFEXTRACT_BUDGETS = {
+    # Maximum number of characters of a single reference line
+    'line_length': None,
+    # Maximum number of seconds spent parsing a single reference line
+    'line_time': None,
+    # Maximum number of characters of reference lines per document
+    'document_length': None,
+    # Maximum number of seconds spent parsing a document
+    'document_time': None,
+}
+
+# Named speed/accuracy profiles of the extraction, selected with the
+# ``profile`` argument of the API. Each one enables or disables the
+# expensive stages of the pipeline (see the "Profiles" section of the README
+# for their measured speed and accuracy).
+CFG_REFEXTRACT_PROFILES = {
+    'full': {
+        # Parse the reference lines fully, else only look for identifiers
+        # (DOIs, URLs, handles, arXiv and report numbers)
+        'parse_lines': True,
+        # Look for authors again in the line stripped of its accents
+        'unidecode_authors': True,
+        # Tag the collaborations
+        'collaborations': True,
+        # Look for the titles of known books in the quoted titles and the
+        # misc text
+        'books': True,
+        # Convert a PDF again with -layout if no reference section is found
+        'layout_fallback': True,
+        # Search the reference lines by their years and symbols if no
+        # reference section is found, even with -layout; off by default as
+        # it finds junk lines in the documents without references
+        'year_n_symbols_fallback': False,
+        # Add the texkeys of the PDF to the references
+        'texkeys': True,
+    },
+    'fast': {
+        'parse_lines': True,
+        'unidecode_authors': False,
+        'collaborations': True,
+        'books': False,
+        'layout_fallback': False,
+        'year_n_symbols_fallback': False,
+        'texkeys': False,
+    },
+    'identifiers': {
+        'parse_lines': False,
+        'unidecode_authors': False,
+        'collaborations': False,
+        'books': False,
+        'layout_fallback': False,
+        'year_n_symbols_fallback': False,
+        'texkeys': False,
+    },
+}
+
+CFG_REFEXTRACT_DEFAULT_PROFILE = 'full'
+
+# Minimum number of reference lines for a document to be parsed in parallel
+# when a number of processes is given to parse_references; smaller documents
+# are parsed serially as the pool overhead would outweigh the gain.
+CFG_REFEXTRACT_PARALLEL_THRESHOLD = 500
+
+# Number of chunks per process the reference lines are split into when
+# parsing in parallel, to balance the load between processes.
+CFG_REFEXTRACT_PARALLEL_CHUNKS_PER_PROCESS = 4
+
+# Types of the citation elements which are given to the linker callbacks
+CFG_REFEXTRACT_LINKABLE_ELEMENTS = ('JOURNAL', 'REPORTNUMBER', 'DOI', 'BOOK')
+
+# Maximum number of reference lines whose elements are given together to a
+# bulk linker callback
+CFG_REFEXTRACT_BULK_LINKER_BATCH_SIZE = 1000
+
+# Size in bytes of the chunks in which documents are downloaded
+CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Number of documents downloaded simultaneously by
+# extract_references_from_urls, which is also the size of the connection
+# pool of the shared download session
+CFG_REFEXTRACT_DOWNLOAD_CONCURRENCY = 8
+
+# Number of documents per download thread which extract_references_from_urls
+# downloads ahead of the extraction
+CFG_REFEXTRACT_DOWNLOAD_WINDOW = 2
+
+# Maximum number of simultaneous connections of the sessions opened by the
+# asyncio API
+CFG_REFEXTRACT_ASYNC_CONNECTION_LIMIT = 100
+
+# Size in bytes of the batches of downloaded chunks which the asyncio API
+# writes at once to the file
+CFG_REFEXTRACT_ASYNC_WRITE_SIZE = 1024 * 1024
+
+# Default address of the extraction daemon (see refextract.daemon)
+CFG_REFEXTRACT_DAEMON_HOST = '127.0.0.1'
+CFG_REFEXTRACT_DAEMON_PORT = 8754
+
+# Number of worker processes of the extraction daemon, and number of
+# requests which can wait for a worker before new ones are rejected
+CFG_REFEXTRACT_DAEMON_WORKERS = 2
+CFG_REFEXTRACT_DAEMON_QUEUE_SIZE = 16
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Compact citation elements.
+
+The citation elements of the reference lines are objects with __slots__,
+one class per type of element, which behave like the dictionaries they
+replace (``el['title']``, ``el.get('recid')``, ``'volume' in el``,
+``del el['url_desc']``...) while taking a fraction of their memory:
+
+>>> el = new_element('JOURNAL', misc_txt=u'', title=u'Phys.Rev.',
+...                  volume=u'D12', year=u'1975', page=u'22')
+>>> el['volume'], el.get('recid')
+('D12', None)
+
+The keys which are not fields of their class (e.g. the ``report_num`` of
+a URL turned into a report number) are kept in a dictionary of extra keys.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+class CitationElement(MutableMapping):
+    """Citation element of a reference line, usable as a dictionary.
+
+    The keys kept in the slots of a class are its ``fields`` (and
+    ``field_set``), see set_fields.
+    """
+
+    __slots__ = ('type', 'misc_txt', 'recid', '_extra')
+
+    def __init__(self, type, **values):
+        self._extra = None
+        self.type = type
+        for key, value in values.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in self.field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.field_set:
+            setattr(self, key, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        if key in self.field_set:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in self.field_set:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __iter__(self):
+        for key in self.fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for dummy in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        return new_element(**self)
+
+    def to_dict(self):
+        """Return the element as a dictionary, the elements in its lists
+        (e.g. the extra_ibids of a journal) included."""
+        return dict(
+            (key, [item.to_dict() if isinstance(item, CitationElement)
+                   else item for item in value]
+             if isinstance(value, list) else value)
+            for key, value in self.items())
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self._extra = None
+        for key, value in state.items():
+            self[key] = value
+
+
+class JournalElement(CitationElement):
+    __slots__ = ('title', 'volume', 'year', 'page', 'page_end', 'is_ibid',
+                 'extra_ibids')
+
+
+class ReportNumberElement(CitationElement):
+    __slots__ = ('report_num',)
+
+
+class UrlElement(CitationElement):
+    # URLs can be turned into report numbers and handles (see
+    # engine.arxiv_urls_to_report_numbers and engine.look_for_hdl_urls)
+    __slots__ = ('url_string', 'url_desc', 'report_num', 'hdl_id')
+
+
+class DoiElement(CitationElement):
+    __slots__ = ('doi_string',)
+
+
+class HdlElement(CitationElement):
+    __slots__ = ('hdl_id',)
+
+
+class AuthorElement(CitationElement):
+    __slots__ = ('auth_txt', 'auth_type')
+
+
+class BookElement(CitationElement):
+    __slots__ = ('authors', 'title', 'year')
+
+
+class QuotedElement(CitationElement):
+    __slots__ = ('title',)
+
+
+class IsbnElement(CitationElement):
+    __slots__ = ('ISBN',)
+
+
+class PublisherElement(CitationElement):
+    __slots__ = ('publisher',)
+
+
+class CollaborationElement(CitationElement):
+    __slots__ = ('collaboration',)
+
+
+class YearElement(CitationElement):
+    __slots__ = ('year',)
+
+
+ELEMENT_CLASSES = {
+    'JOURNAL': JournalElement,
+    'REPORTNUMBER': ReportNumberElement,
+    'URL': UrlElement,
+    'DOI': DoiElement,
+    'HDL': HdlElement,
+    'AUTH': AuthorElement,
+    'BOOK': BookElement,
+    'QUOTED': QuotedElement,
+    'ISBN': IsbnElement,
+    'PUBLISHER': PublisherElement,
+    'COLLABORATION': CollaborationElement,
+    'YEAR': YearElement,
+}
+
+
+def set_fields(cls):
+    """Set the keys stored in the slots of an element class."""
+    cls.fields = tuple(key for klass in reversed(cls.__mro__)
+                       for key in getattr(klass, '__slots__', ())
+                       if key != '_extra')
+    cls.field_set = frozenset(cls.fields)
+
+
+set_fields(CitationElement)
+for cls in ELEMENT_CLASSES.values():
+    set_fields(cls)
+
+
+def new_element(type, **values):
+    """Create a citation element of the given type, e.g.
+    new_element('DOI', misc_txt=u'', doi_string=u'10.1103/...')."""
+    return ELEMENT_CLASSES.get(type, CitationElement)(type, **values)
@@ -26,13 +26,14 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+import multiprocessing
 import re
+import time
 
 from datetime import datetime
+from io import BytesIO
 from itertools import chain
 
-import magic
-
 from .config import (
     CFG_REFEXTRACT_MARKER_CLOSING_REPORT_NUM,
     CFG_REFEXTRACT_MARKER_CLOSING_AUTHOR_INCL,
@@ -44,9 +45,25 @@ from .config import (
     CFG_REFEXTRACT_MARKER_CLOSING_AUTHOR_ETAL,
     CFG_REFEXTRACT_MARKER_CLOSING_TITLE,
     CFG_REFEXTRACT_MARKER_CLOSING_SERIES,
+    CFG_REFEXTRACT_BUDGETS,
+    CFG_REFEXTRACT_PARALLEL_THRESHOLD,
+    CFG_REFEXTRACT_PARALLEL_CHUNKS_PER_PROCESS,
+    CFG_REFEXTRACT_LINKABLE_ELEMENTS,
+    CFG_REFEXTRACT_BULK_LINKER_BATCH_SIZE,
+    CFG_REFEXTRACT_DEFAULT_PROFILE,
+    CFG_REFEXTRACT_PROFILES,
 )
 
-from .errors import UnknownDocumentTypeError
+from .elements import new_element
+from .errors import BudgetExceededError, UnknownDocumentTypeError
+from .hooks import traced
+from .metrics import record_document
+from .sampler import (
+    new_timings,
+    record_line,
+    run_timed,
+    sampled_document,
+)
 
 from .tag import (
     tag_reference_line,
@@ -54,22 +71,33 @@ from .tag import (
     identify_and_tag_DOI,
     identify_and_tag_URLs,
     find_numeration,
-    extract_series_from_volume
+    extract_series_from_volume,
+    check_deadline,
+    tag_arxiv,
+    tag_arxiv_more,
+    tag_journal_line,
+)
+from .text import wash_and_repair_reference_line, wash_reference_line
+from .record import build_references, build_reference_fields
+from ..documents.pdf import (
+    convert_PDF_bytes_to_plaintext,
+    convert_PDF_to_plaintext,
 )
-from .text import wash_and_repair_reference_line
-from .record import build_references
-from ..documents.pdf import convert_PDF_to_plaintext
 from .kbs import get_kbs
 from .regexs import (
     get_reference_line_numeration_marker_patterns,
     regex_match_list,
     re_tagged_citation,
     re_numeration_no_ibid_txt,
-    re_roman_numbers,
     re_recognised_numeration_for_title_plus_series,
     remove_year,
     re_year_in_misc_txt,
-    re_hdl)
+    re_hdl,
+    re_report_number_without_dash,
+    re_roman_volume,
+    re_short_volume,
+    re_volume_number_then_letter,
+    re_year_as_page)
 from ..version import __version__ as version
 
 LOGGER = logging.getLogger(__name__)
@@ -130,86 +158,73 @@ def roman2arabic(num):
 
 
 # Transformations
+#
+# The transforms of a single citation element are called as
+# transform(el, kbs) on the elements of the types they are registered for
+# (see ELEMENT_TRANSFORMS below).
 
-def format_volume(citation_elements):
+def format_volume(el, kbs):
     """format volume number (roman numbers to arabic)
 
     When the volume number is expressed in roman numbers (CXXII),
     they are converted to their equivalent in arabic numbers (42)
     """
-    re_roman = re.compile(re_roman_numbers + u'$', re.UNICODE)
-    for el in citation_elements:
-        if el['type'] == 'JOURNAL' and re_roman.match(el['volume']):
-            el['volume'] = str(roman2arabic(el['volume'].upper()))
-    return citation_elements
+    if re_roman_volume.match(el['volume']):
+        el['volume'] = str(roman2arabic(el['volume'].upper()))
 
 
-def handle_special_journals(citation_elements, kbs):
+def handle_special_journals(el, kbs):
     """format special journals (like JHEP) volume number
 
     JHEP needs the volume number prefixed with the year
     e.g. JHEP 0301 instead of JHEP 01
     """
-    for el in citation_elements:
-        if el['type'] == 'JOURNAL' and el['title'] in kbs['special_journals']:
-            if re.match(r'\d{1,2}$', el['volume']):
-                # Sometimes the page is omitted and the year is written in its place
-                # We can never be sure but it's very likely that page > 1900 is
-                # actually a year, so we skip this reference
-                if el['year'] == '' and re.match(r'(19|20)\d{2}$', el['page']):
-                    el['type'] = 'MISC'
-                    el['misc_txt'] = "%s,%s,%s" \
-                        % (el['title'], el['volume'], el['page'])
-                el['volume'] = el['year'][-2:] + '%02d' % int(el['volume'])
-            if el['page'].isdigit():
-                # JHEP and JCAP have always pages 3 digits long
-                el['page'] = '%03d' % int(el['page'])
-
-    return citation_elements
-
-
-def format_report_number(citation_elements):
+    if el['title'] in kbs['special_journals']:
+        if re_short_volume.match(el['volume']):
+            # Sometimes the page is omitted and the year is written in its place
+            # We can never be sure but it's very likely that page > 1900 is
+            # actually a year, so we skip this reference
+            if el['year'] == '' and re_year_as_page.match(el['page']):
+                el['type'] = 'MISC'
+                el['misc_txt'] = "%s,%s,%s" \
+                    % (el['title'], el['volume'], el['page'])
+            el['volume'] = el['year'][-2:] + '%02d' % int(el['volume'])
+        if el['page'].isdigit():
+            # JHEP and JCAP have always pages 3 digits long
+            el['page'] = '%03d' % int(el['page'])
+
+
+def format_report_number(el, kbs):
     """Format report numbers that are missing a dash
 
     e.g. CERN-LCHH2003-01 to CERN-LHCC-2003-01
     """
-    re_report = re.compile(r'^(?P<name>[A-Z-]+)(?P<nums>[\d-]+)$', re.UNICODE)
-    for el in citation_elements:
-        if el['type'] == 'REPORTNUMBER':
-            m = re_report.match(el['report_num'])
-            if m:
-                name = m.group('name')
-                if not name.endswith('-'):
-                    el['report_num'] = m.group('name') + '-' + m.group('nums')
-    return citation_elements
+    m = re_report_number_without_dash.match(el['report_num'])
+    if m:
+        name = m.group('name')
+        if not name.endswith('-'):
+            el['report_num'] = m.group('name') + '-' + m.group('nums')
 
 
-def format_hep(citation_elements):
+def format_hep(el, kbs, prefixes=('astro-ph-', 'hep-th-', 'hep-ph-',
+                                  'hep-ex-', 'hep-lat-', 'math-ph-')):
     """Format hep-th report numbers with a dash
 
     e.g. replaces hep-th-9711200 with hep-th/9711200
     """
-    prefixes = ('astro-ph-', 'hep-th-', 'hep-ph-', 'hep-ex-', 'hep-lat-',
-                'math-ph-')
-    for el in citation_elements:
-        if el['type'] == 'REPORTNUMBER':
-            for p in prefixes:
-                if el['report_num'].startswith(p):
-                    el['report_num'] = el['report_num'][:len(p) - 1] + '/' + \
-                        el['report_num'][len(p):]
-    return citation_elements
+    for p in prefixes:
+        if el['report_num'].startswith(p):
+            el['report_num'] = el['report_num'][:len(p) - 1] + '/' + \
+                el['report_num'][len(p):]
 
 
-def format_author_ed(citation_elements):
+def format_author_ed(el, kbs):
     """Standardise to (ed.) and (eds.)
 
     e.g. Remove extra space in (ed. )
     """
-    for el in citation_elements:
-        if el['type'] == 'AUTH':
-            el['auth_txt'] = el['auth_txt'].replace('(ed. )', '(ed.)')
-            el['auth_txt'] = el['auth_txt'].replace('(eds. )', '(eds.)')
-    return citation_elements
+    el['auth_txt'] = el['auth_txt'].replace('(ed. )', '(ed.)')
+    el['auth_txt'] = el['auth_txt'].replace('(eds. )', '(eds.)')
 
 
 def look_for_books(citation_elements, kbs):
@@ -228,58 +243,49 @@ def look_for_books(citation_elements, kbs):
         normalized_title = title['title'].upper()
         if normalized_title in kbs['books']:
             line = kbs['books'][normalized_title]
-            el = {'type': 'BOOK',
-                  'misc_txt': '',
-                  'authors': line[0],
-                  'title': line[1],
-                  'year': line[2].strip(';')}
+            el = new_element('BOOK',
+                             misc_txt='',
+                             authors=line[0],
+                             title=line[1],
+                             year=line[2].strip(';'))
             citation_elements.append(el)
             citation_elements.remove(title)
 
     return citation_elements
 
 
-def split_volume_from_journal(citation_elements):
+def split_volume_from_journal(el, kbs):
     """Split volume from journal title
 
     We need this because sometimes the volume is attached to the journal title
     instead of the volume. In those cases we move it here from the title to the
     volume
     """
-    for el in citation_elements:
-        if el['type'] == 'JOURNAL' and ';' in el['title']:
-            el['title'], series = el['title'].rsplit(';', 1)
-            el['volume'] = series + el['volume']
-    return citation_elements
+    if ';' in el['title']:
+        el['title'], series = el['title'].rsplit(';', 1)
+        el['volume'] = series + el['volume']
 
 
-def remove_b_for_nucl_phys(citation_elements):
+def remove_b_for_nucl_phys(el, kbs):
     """Removes b from the volume of some journals
 
     Removes the B from the volume for Nucl.Phys.Proc.Suppl. because in INSPIRE
     that journal is handled differently.
     """
-    for el in citation_elements:
-        if el['type'] == 'JOURNAL' and el['title'] == 'Nucl.Phys.Proc.Suppl.' \
-                and 'volume' in el \
-                and (el['volume'].startswith('b') or el['volume'].startswith('B')):
-            el['volume'] = el['volume'][1:]
-    return citation_elements
+    if el['title'] == 'Nucl.Phys.Proc.Suppl.' \
+            and 'volume' in el \
+            and (el['volume'].startswith('b') or el['volume'].startswith('B')):
+        el['volume'] = el['volume'][1:]
 
 
-def mangle_volume(citation_elements):
+def mangle_volume(el, kbs):
     """Make sure the volume letter is before the volume number
 
     e.g. transforms 100B to B100
     """
-    volume_re = re.compile(r"(\d+)([A-Z])", re.U | re.I)
-    for el in citation_elements:
-        if el['type'] == 'JOURNAL':
-            matches = volume_re.match(el['volume'])
-            if matches:
-                el['volume'] = matches.group(2) + matches.group(1)
-
-    return citation_elements
+    matches = re_volume_number_then_letter.match(el['volume'])
+    if matches:
+        el['volume'] = matches.group(2) + matches.group(1)
 
 
 def balance_authors(splitted_citations, new_elements):
@@ -296,14 +302,38 @@ def balance_authors(splitted_citations, new_elements):
 
 
 def associate_recids(citation_elements, linker_callback):
+    """Link each element with the linker, which is given the element as a
+    plain dictionary."""
     for el in citation_elements:
         try:
-            el['recid'] = linker_callback(el)
+            el['recid'] = linker_callback(el.to_dict())
         except (IndexError, KeyError):
             el['recid'] = None
     return citation_elements
 
 
+def bulk_associate_recids(citation_elements, bulk_linker_callback):
+    """Link all the linkable elements with a single call to the linker
+
+    The bulk linker is given the list of the JOURNAL, REPORTNUMBER, DOI and
+    BOOK elements, as plain dictionaries, and returns the list of their
+    recids (or None).
+    """
+    linkable_elements = [el for el in citation_elements
+                         if el['type'] in CFG_REFEXTRACT_LINKABLE_ELEMENTS]
+    if not linkable_elements:
+        return citation_elements
+
+    recids = bulk_linker_callback([el.to_dict() for el in linkable_elements])
+    if len(recids) != len(linkable_elements):
+        raise ValueError('The bulk linker returned %d recids for %d elements'
+                         % (len(recids), len(linkable_elements)))
+    for el, recid in zip(linkable_elements, recids):
+        el['recid'] = recid
+    return citation_elements
+
+
+@traced
 def split_citations(citation_elements):
     """Split a citation line in multiple citations
 
@@ -355,8 +385,7 @@ def split_citations(citation_elements):
         elif ';' in el['misc_txt']:
             misc_txt, el['misc_txt'] = el['misc_txt'].split(';', 1)
             if misc_txt:
-                new_elements.append({'type': 'MISC',
-                                     'misc_txt': misc_txt})
+                new_elements.append(new_element('MISC', misc_txt=misc_txt))
             start_new_citation()
             # In case el['recid'] is None, we want to reset it
             # because we are starting a new reference
@@ -364,8 +393,8 @@ def split_citations(citation_elements):
             while ';' in el['misc_txt']:
                 misc_txt, el['misc_txt'] = el['misc_txt'].split(';', 1)
                 if misc_txt:
-                    new_elements.append({'type': 'MISC',
-                                         'misc_txt': misc_txt})
+                    new_elements.append(new_element('MISC',
+                                                    misc_txt=misc_txt))
                     start_new_citation()
                     current_recid = None
 
@@ -462,6 +491,7 @@ def merge_invalid_references(splitted_citations):
             if valid_citation(citation)]
 
 
+@traced
 def add_year_elements(splitted_citations):
     for citation in splitted_citations:
         for el in citation:
@@ -482,10 +512,7 @@ def add_year_elements(splitted_citations):
                     year = m.group(0)
 
         if year:
-            citation.append({'type': 'YEAR',
-                             'year': year,
-                             'misc_txt': '',
-                             })
+            citation.append(new_element('YEAR', year=year, misc_txt=''))
             for el in citation:
                 if year in el['misc_txt']:
                     el['misc_txt'] = remove_year(el['misc_txt'], year)
@@ -493,6 +520,7 @@ def add_year_elements(splitted_citations):
     return splitted_citations
 
 
+@traced
 def look_for_implied_ibids(splitted_citations):
     def look_for_journal(els):
         for el in els:
@@ -515,15 +543,16 @@ def look_for_implied_ibids(splitted_citations):
                                 'series'] + numeration['volume']
                         else:
                             volume = numeration['volume']
-                        ibid_el = {'type': 'JOURNAL',
-                                   'misc_txt': '',
-                                   'title': current_journal['title'],
-                                   'volume': volume,
-                                   'year': numeration['year'],
-                                   'page': numeration['page'] or numeration['jinst_page'],
-                                   'page_end': numeration['page_end'],
-                                   'is_ibid': True,
-                                   'extra_ibids': []}
+                        ibid_el = new_element(
+                            'JOURNAL',
+                            misc_txt='',
+                            title=current_journal['title'],
+                            volume=volume,
+                            year=numeration['year'],
+                            page=numeration['page'] or numeration['jinst_page'],
+                            page_end=numeration['page_end'],
+                            is_ibid=True,
+                            extra_ibids=[])
                         citation.append(ibid_el)
                         el['misc_txt'] = el['misc_txt'][numeration['len']:]
 
@@ -535,6 +564,7 @@ def look_for_implied_ibids(splitted_citations):
     return splitted_citations
 
 
+@traced
 def remove_duplicated_authors(splitted_citations):
     for citation in splitted_citations:
         found_author = False
@@ -549,6 +579,7 @@ def remove_duplicated_authors(splitted_citations):
     return splitted_citations
 
 
+@traced
 def remove_duplicated_dois(splitted_citations):
     for citation in splitted_citations:
         found_doi = False
@@ -562,6 +593,7 @@ def remove_duplicated_dois(splitted_citations):
     return splitted_citations
 
 
+@traced
 def remove_duplicated_collaborations(splitted_citations):
     for citation in splitted_citations:
         collabs = []
@@ -575,25 +607,25 @@ def remove_duplicated_collaborations(splitted_citations):
     return splitted_citations
 
 
+@traced
 def add_recid_elements(splitted_citations):
     for citation in splitted_citations:
         for el in citation:
             if el.get('recid', None):
-                citation.append({'type': 'RECID',
-                                 'recid': el['recid'],
-                                 'misc_txt': ''})
+                citation.append(new_element('RECID',
+                                            recid=el['recid'],
+                                            misc_txt=''))
                 break
 
 
-def arxiv_urls_to_report_numbers(citation_elements):
-    arxiv_url_prefix = 'http://arxiv.org/abs/'
-    for el in citation_elements:
-        if el['type'] == 'URL' and el['url_string'].startswith(arxiv_url_prefix):
-            el['type'] = 'REPORTNUMBER'
-            el['report_num'] = el['url_string'].replace(arxiv_url_prefix, 'arXiv:')
+def arxiv_urls_to_report_numbers(el, kbs,
+                                 arxiv_url_prefix='http://arxiv.org/abs/'):
+    if el['url_string'].startswith(arxiv_url_prefix):
+        el['type'] = 'REPORTNUMBER'
+        el['report_num'] = el['url_string'].replace(arxiv_url_prefix, 'arXiv:')
 
 
-def look_for_hdl(citation_elements):
+def look_for_hdl(citation_elements, kbs):
     """Looks for handle identifiers in the misc txt of the citation elements
 
        When finding an hdl, creates a new HDL element.
@@ -602,27 +634,217 @@ def look_for_hdl(citation_elements):
     for el in list(citation_elements):
         matched_hdl = re_hdl.finditer(el['misc_txt'])
         for match in reversed(list(matched_hdl)):
-            hdl_el = {'type': 'HDL',
-                      'hdl_id': match.group('hdl_id'),
-                      'misc_txt': el['misc_txt'][match.end():]}
+            hdl_el = new_element('HDL',
+                                 hdl_id=match.group('hdl_id'),
+                                 misc_txt=el['misc_txt'][match.end():])
             el['misc_txt'] = el['misc_txt'][0:match.start()]
             citation_elements.insert(citation_elements.index(el) + 1, hdl_el)
 
 
-def look_for_hdl_urls(citation_elements):
+def look_for_hdl_urls(el, kbs):
     """Looks for handle identifiers that have already been identified as urls
 
-       When finding an hdl, creates a new HDL element.
-       @param citation_elements: (list) elements to process
+       When finding an hdl, turns the element into an HDL element.
     """
-    for el in citation_elements:
-        if el['type'] == 'URL':
-            match = re_hdl.match(el['url_string'])
-            if match:
-                el['type'] = 'HDL'
-                el['hdl_id'] = match.group('hdl_id')
-                del el['url_desc']
-                del el['url_string']
+    match = re_hdl.match(el['url_string'])
+    if match:
+        el['type'] = 'HDL'
+        el['hdl_id'] = match.group('hdl_id')
+        del el['url_desc']
+        del el['url_string']
+
+
+class ElementTransform(object):
+    """A registered transform of the citation elements.
+
+    @param name: (string) name of the transform.
+    @param func: (callable) called as func(el, kbs) on each element of one
+        of the ``types``, or as func(citation_elements, kbs) on the list of
+        elements of the line if ``types`` is None.
+    @param types: (tuple) types of the elements transformed, or None.
+    @param enabled: (bool) whether the transform is run.
+    """
+
+    def __init__(self, name, func, types=None, enabled=True):
+        self.name = name
+        self.func = func
+        self.types = tuple(types) if types is not None else None
+        self.enabled = enabled
+
+    def __repr__(self):
+        return 'ElementTransform(%r, types=%r, enabled=%r)' % (
+            self.name, self.types, self.enabled)
+
+
+# Transforms of the citation elements, in order. The transforms of single
+# elements only read and change the element they are called on, so that
+# they are all run in one pass over the elements, each element going
+# through them in this order. The transforms of the whole list are run
+# between the passes. Moving look_for_books and look_for_hdl after the
+# single element transforms does not change the output: these never
+# touch the QUOTED and BOOK elements, nor the misc text of the elements.
+# The tuple is replaced, never modified (see register_element_transform).
+ELEMENT_TRANSFORMS = (
+    ElementTransform('split_volume_from_journal', split_volume_from_journal,
+                     ('JOURNAL',)),
+    ElementTransform('format_volume', format_volume, ('JOURNAL',)),
+    ElementTransform('handle_special_journals', handle_special_journals,
+                     ('JOURNAL',)),
+    ElementTransform('format_report_number', format_report_number,
+                     ('REPORTNUMBER',)),
+    ElementTransform('format_author_ed', format_author_ed, ('AUTH',)),
+    ElementTransform('format_hep', format_hep, ('REPORTNUMBER',)),
+    ElementTransform('remove_b_for_nucl_phys', remove_b_for_nucl_phys,
+                     ('JOURNAL',)),
+    ElementTransform('mangle_volume', mangle_volume, ('JOURNAL',)),
+    ElementTransform('arxiv_urls_to_report_numbers',
+                     arxiv_urls_to_report_numbers, ('URL',)),
+    ElementTransform('look_for_hdl_urls', look_for_hdl_urls, ('URL',)),
+    ElementTransform('look_for_books', look_for_books),
+    ElementTransform('look_for_hdl', look_for_hdl),
+)
+
+# Transforms run on the lines only searched for identifiers, without kbs
+IDENTIFIER_TRANSFORMS = ('arxiv_urls_to_report_numbers', 'look_for_hdl',
+                         'look_for_hdl_urls')
+
+# Transforms skipped by the profiles which do not look for books
+BOOK_TRANSFORMS = ('look_for_books',)
+
+# Transforms run on the lines only searched for journals
+JOURNAL_TRANSFORMS = ('split_volume_from_journal', 'format_volume',
+                      'handle_special_journals', 'remove_b_for_nucl_phys',
+                      'mangle_volume')
+
+
+def get_element_transform(name):
+    for transform in ELEMENT_TRANSFORMS:
+        if transform.name == name:
+            return transform
+    raise ValueError('Unknown element transform: %s' % name)
+
+
+def register_element_transform(name, func, types=None, before=None):
+    """Register a transform of the citation elements (see ElementTransform),
+    run after the registered ones, or before the transform named ``before``.
+
+    A transform registered again under the same name is replaced.
+    """
+    global ELEMENT_TRANSFORMS
+    transforms = [transform for transform in ELEMENT_TRANSFORMS
+                  if transform.name != name]
+    position = len(transforms)
+    if before is not None:
+        position = transforms.index(get_element_transform(before))
+    transforms.insert(position, ElementTransform(name, func, types))
+    ELEMENT_TRANSFORMS = tuple(transforms)
+    return func
+
+
+def set_element_transform_enabled(name, enabled):
+    """Enable or disable the registered transform ``name``."""
+    global ELEMENT_TRANSFORMS
+    transform = get_element_transform(name)
+    ELEMENT_TRANSFORMS = tuple(
+        ElementTransform(t.name, t.func, t.types, enabled)
+        if t is transform else t
+        for t in ELEMENT_TRANSFORMS)
+
+
+def disable_element_transform(name):
+    set_element_transform_enabled(name, False)
+
+
+def enable_element_transform(name):
+    set_element_transform_enabled(name, True)
+
+
+def select_element_transforms(names, exclude=False, cache={}):
+    """Return the registered transforms among ``names`` (or not among them
+    if ``exclude``), in order."""
+    key = (ELEMENT_TRANSFORMS, names, exclude)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    if len(cache) > 16:
+        # Forget the selections of the previous registries
+        cache.clear()
+    cache[key] = tuple(transform for transform in ELEMENT_TRANSFORMS
+                       if (transform.name in names) != exclude)
+    return cache[key]
+
+
+def get_transform_passes(transforms, cache={}):
+    """Group the enabled transforms in passes over the elements.
+
+    @return: (list) of tuples (chains, None) for the passes running the
+        transforms of single elements, chains being a dictionary of the
+        element types to the list of (position, func) of their transforms,
+        and (None, func) for the transforms of the whole list.
+    """
+    try:
+        return cache[transforms]
+    except KeyError:
+        pass
+    passes = []
+    chains = None
+    for position, transform in enumerate(transforms):
+        if not transform.enabled:
+            continue
+        if transform.types is None:
+            passes.append((None, transform.func))
+            chains = None
+            continue
+        if chains is None:
+            chains = {}
+            passes.append((chains, None))
+        for element_type in transform.types:
+            chains.setdefault(element_type, []).append(
+                (position, transform.func))
+    if len(cache) > 16:
+        # Forget the passes of the previous registries
+        cache.clear()
+    cache[transforms] = passes
+    return passes
+
+
+def transform_element(el, kbs, chains):
+    """Run the transforms of a pass on an element, in order, going on with
+    the transforms of its new type when a transform changes it."""
+    element_type = el['type']
+    position = 0
+    while True:
+        for transform_position, func in chains.get(element_type, ()):
+            if transform_position < position:
+                continue
+            func(el, kbs)
+            if el['type'] != element_type:
+                element_type = el['type']
+                position = transform_position + 1
+                break
+        else:
+            return
+
+
+@traced
+def transform_citation_elements(citation_elements, kbs, transforms=None):
+    """Run the registered transforms on the citation elements of a line.
+
+    @param citation_elements: (list) elements to transform, in place.
+    @param transforms: (tuple) of ElementTransform, the registered ones by
+        default.
+    @return: (list) the citation elements.
+    """
+    if transforms is None:
+        transforms = ELEMENT_TRANSFORMS
+    for chains, func in get_transform_passes(transforms):
+        if chains is None:
+            func(citation_elements, kbs)
+            continue
+        for el in citation_elements:
+            transform_element(el, kbs, chains)
+    return citation_elements
 
 
 # End of elements transformations
@@ -636,22 +858,72 @@ def print_citations(splitted_citations, line_marker):
             LOGGER.debug('%s %s', el['type'], repr(el))
 
 
-def parse_reference_line(ref_line, kbs, bad_titles_count={}, linker_callback=None):
+def parse_reference_line(ref_line, kbs, bad_titles_count={}, linker_callback=None,
+                         deadline=None, profile=None):
     """Parse one reference line
 
     @input a string representing a single reference bullet
+    @param deadline: (float) time (as returned by time.time()) after which
+        parsing is abandoned by raising BudgetExceededError, or None.
+    @param profile: (string or dict) the profile of the parsing, see
+        get_profile.
     @output parsed references (a list of elements objects)
     """
+    profile = get_profile(profile)
+    if not profile['parse_lines']:
+        splitted_citations, line_marker, counts = \
+            parse_reference_line_identifiers(ref_line, linker_callback)
+        return splitted_citations, line_marker, counts, bad_titles_count
+
+    timings = new_timings()
+    citation_elements, line_marker, counts, bad_titles_count = \
+        run_timed(timings, 'tagging', tag_reference_elements, ref_line, kbs,
+                  bad_titles_count, deadline, profile)
+
+    # Link references if desired
+    if linker_callback:
+        run_timed(timings, 'linking', associate_recids, citation_elements,
+                  linker_callback)
+
+    splitted_citations = run_timed(timings, 'splitting',
+                                   split_reference_elements,
+                                   citation_elements, kbs, deadline, profile)
+
+    if linker_callback:
+        # Link references with the newly added ibids/books information
+        for citations in splitted_citations:
+            run_timed(timings, 'linking', associate_recids, citations,
+                      linker_callback)
+
+    run_timed(timings, 'finalizing', finalize_citations, splitted_citations)
+    record_line(ref_line, timings)
+
+    # For debugging purposes
+    print_citations(splitted_citations, line_marker)
+
+    return splitted_citations, line_marker, counts, bad_titles_count
+
+
+def tag_reference_elements(ref_line, kbs, bad_titles_count={}, deadline=None,
+                           profile=None):
+    """First phase of parse_reference_line: tag the line and build its
+    citation elements, before they are linked and split.
+
+    @output (citation elements, line marker, counts, bad titles count)
+    """
+    profile = get_profile(profile)
     # Strip the 'marker' (e.g. [1]) from this reference line:
     line_marker, ref_line = remove_reference_line_marker(ref_line)
     # Find DOI sections in citation
     ref_line, identified_dois = identify_and_tag_DOI(ref_line)
     # Identify and replace URLs in the line:
     ref_line, identified_urls = identify_and_tag_URLs(ref_line)
+    check_deadline(deadline)
     # Tag <cds.JOURNAL>, etc.
-    tagged_line, bad_titles_count = tag_reference_line(ref_line,
-                                                       kbs,
-                                                       bad_titles_count)
+    tagged_line, bad_titles_count = tag_reference_line(
+        ref_line, kbs, bad_titles_count, deadline=deadline,
+        unidecode_authors=profile['unidecode_authors'],
+        collaborations=profile['collaborations'])
 
     # Debug print tagging (authors, titles, volumes, etc.)
     LOGGER.debug("tags %r", tagged_line)
@@ -667,23 +939,23 @@ def parse_reference_line(ref_line, kbs, bad_titles_count={}, linker_callback=Non
                                     identified_urls)
 
     # Transformations on elements
-    split_volume_from_journal(citation_elements)
-    format_volume(citation_elements)
-    handle_special_journals(citation_elements, kbs)
-    format_report_number(citation_elements)
-    format_author_ed(citation_elements)
-    look_for_books(citation_elements, kbs)
-    format_hep(citation_elements)
-    remove_b_for_nucl_phys(citation_elements)
-    mangle_volume(citation_elements)
-    arxiv_urls_to_report_numbers(citation_elements)
-    look_for_hdl(citation_elements)
-    look_for_hdl_urls(citation_elements)
+    transform_citation_elements(
+        citation_elements, kbs,
+        None if profile['books'] else
+        select_element_transforms(BOOK_TRANSFORMS, exclude=True))
+    check_deadline(deadline)
 
-    # Link references if desired
-    if linker_callback:
-        associate_recids(citation_elements, linker_callback)
+    return citation_elements, line_marker, counts, bad_titles_count
+
+
+def split_reference_elements(citation_elements, kbs, deadline=None,
+                             profile=None):
+    """Second phase of parse_reference_line: split the (linked) citation
+    elements in multiple references and complete them with implied ibids,
+    years and books.
 
+    @output parsed references (a list of elements objects)
+    """
     # Split the reference in multiple ones if needed
     splitted_citations = split_citations(citation_elements)
 
@@ -691,14 +963,18 @@ def parse_reference_line(ref_line, kbs, bad_titles_count={}, linker_callback=Non
     look_for_implied_ibids(splitted_citations)
     # Find year
     add_year_elements(splitted_citations)
-    # Look for books in misc field
-    look_for_undetected_books(splitted_citations, kbs)
+    check_deadline(deadline)
+    if get_profile(profile)['books']:
+        # Look for books in misc field
+        look_for_undetected_books(splitted_citations, kbs)
+        check_deadline(deadline)
 
-    if linker_callback:
-        # Link references with the newly added ibids/books information
-        for citations in splitted_citations:
-            associate_recids(citations, linker_callback)
+    return splitted_citations
 
+
+def finalize_citations(splitted_citations):
+    """Last phase of parse_reference_line: clean up the (linked) references.
+    """
     # FIXME: Needed?
     # Remove references with only misc text
     # splitted_citations = remove_invalid_references(splitted_citations)
@@ -710,10 +986,142 @@ def parse_reference_line(ref_line, kbs, bad_titles_count={}, linker_callback=Non
     remove_duplicated_collaborations(splitted_citations)
     add_recid_elements(splitted_citations)
 
-    # For debugging purposes
-    print_citations(splitted_citations, line_marker)
 
-    return splitted_citations, line_marker, counts, bad_titles_count
+def parse_reference_line_identifiers(ref_line, linker_callback=None):
+    """Parse one reference line looking only for identifiers
+
+    This is the degraded version of parse_reference_line, used when a line
+    does not fit in its budget: only DOIs, URLs, handles and arXiv report
+    numbers are recognised, everything else is kept as misc text.
+
+    @input a string representing a single reference bullet
+    @output parsed references (a list of elements objects)
+    """
+    citation_elements, line_marker, counts = \
+        tag_reference_identifiers(ref_line)
+
+    if linker_callback:
+        associate_recids(citation_elements, linker_callback)
+
+    splitted_citations = [citation_elements]
+    finalize_citations(splitted_citations)
+
+    return splitted_citations, line_marker, counts
+
+
+def tag_reference_identifiers(ref_line):
+    """First phase of parse_reference_line_identifiers: build the citation
+    elements of the identifiers of the line.
+
+    @output (citation elements, line marker, counts)
+    """
+    line_marker, ref_line = remove_reference_line_marker(ref_line)
+    ref_line, identified_dois = identify_and_tag_DOI(ref_line)
+    ref_line, identified_urls = identify_and_tag_URLs(ref_line)
+    tagged_line = tag_arxiv_more(tag_arxiv(ref_line))
+
+    citation_elements, line_marker, counts = \
+        parse_tagged_reference_line(line_marker,
+                                    tagged_line,
+                                    identified_dois,
+                                    identified_urls)
+
+    transform_citation_elements(
+        citation_elements, None,
+        select_element_transforms(IDENTIFIER_TRANSFORMS))
+
+    return citation_elements, line_marker, counts
+
+
+def parse_journal_reference(ref_line, kbs):
+    """Parse the journal reference of a line, e.g. a publication note
+
+    This is the journal-only version of parse_reference_line: only the
+    journal titles and their numeration are looked for (see
+    tag_journal_line), and only the transforms of the journals are run.
+
+    @input a string representing a single reference bullet
+    @output the first JOURNAL element of the line, or None
+    """
+    line_marker, ref_line = remove_reference_line_marker(ref_line)
+    tagged_line = tag_journal_line(ref_line, kbs)
+    citation_elements, dummy, dummy = \
+        parse_tagged_reference_line(line_marker, tagged_line, [], [])
+    transform_citation_elements(
+        citation_elements, kbs, select_element_transforms(JOURNAL_TRANSFORMS))
+
+    for el in citation_elements:
+        if el['type'] == 'JOURNAL':
+            return el
+    return None
+
+
+def parse_reference_line_misc(ref_line):
+    """Keep one reference line as misc text, without parsing it
+
+    This is used once the budget of the whole document has been exhausted.
+
+    @input a string representing a single reference bullet
+    @output parsed references (a list of elements objects)
+    """
+    line_marker, ref_line = remove_reference_line_marker(ref_line)
+    ref_line = ref_line.strip()
+    counts = new_counts()
+    del counts['degraded']
+    citation_elements = []
+    if ref_line:
+        counts['misc'] += 1
+        citation_elements.append(new_element('MISC', misc_txt=ref_line))
+
+    return [citation_elements], line_marker, counts
+
+
+def get_budgets(budgets=None):
+    """Return the parsing budgets, overriding the defaults with the given ones.
+
+    @param budgets: (dict) budgets overriding CFG_REFEXTRACT_BUDGETS, or None.
+    @return: (dict) the budgets to use.
+    """
+    merged_budgets = dict(CFG_REFEXTRACT_BUDGETS)
+    if budgets:
+        unknown = set(budgets) - set(CFG_REFEXTRACT_BUDGETS)
+        if unknown:
+            raise ValueError('Unknown budgets: %s' % ', '.join(sorted(unknown)))
+        merged_budgets.update(budgets)
+    return merged_budgets
+
+
+def get_profile(profile=None):
+    """Return the options of a profile of the extraction.
+
+    @param profile: (string) the name of a profile of
+        CFG_REFEXTRACT_PROFILES, (dict) options overriding the ones of the
+        default profile, or None for the default profile.
+    @return: (dict) the options of the profile.
+    """
+    options = dict(CFG_REFEXTRACT_PROFILES[CFG_REFEXTRACT_DEFAULT_PROFILE])
+    if isinstance(profile, dict):
+        unknown = set(profile) - set(options)
+        if unknown:
+            raise ValueError('Unknown profile options: %s' %
+                             ', '.join(sorted(unknown)))
+        options.update(profile)
+    elif profile is not None:
+        if profile not in CFG_REFEXTRACT_PROFILES:
+            raise ValueError('Unknown profile: %s' % profile)
+        options = dict(CFG_REFEXTRACT_PROFILES[profile])
+    return options
+
+
+def over_budget(value, budget):
+    """Check if value exceeds budget (a budget of None is unlimited)."""
+    return budget is not None and value > budget
+
+
+def past_deadline(deadline):
+    """Check if the deadline (a time.time() value, or None for no deadline)
+    has been reached, i.e. if no time is left in its budget."""
+    return deadline is not None and time.time() >= deadline
 
 
 def year_from_citation(citation):
@@ -727,6 +1135,7 @@ def year_from_citation(citation):
     return citation_year
 
 
+@traced
 def look_for_undetected_books(splitted_citations, kbs):
     for citation in splitted_citations:
         if is_unknown_citation(citation):
@@ -763,11 +1172,11 @@ def search_for_book_in_misc(citation, kbs):
 
                     if book_found:
                         LOGGER.debug(u"Book found: %s", title)
-                        book_element = {'type': 'BOOK',
-                                        'misc_txt': '',
-                                        'authors': book_authors,
-                                        'title': line[1],
-                                        'year': book_year}
+                        book_element = new_element('BOOK',
+                                                   misc_txt='',
+                                                   authors=book_authors,
+                                                   title=line[1],
+                                                   year=book_year)
                         citation.append(book_element)
                         citation_element['misc_txt'] = cut_substring_with_special_chars(citation_element['misc_txt'], title, startIndex)
                         # Remove year from misc txt
@@ -836,11 +1245,24 @@ def is_unknown_citation(citation):
     return True
 
 
-def parse_references_elements(ref_sect, kbs, linker_callback=None):
+def parse_references_elements(ref_sect, kbs, linker_callback=None,
+                              budgets=None, bulk_linker_callback=None,
+                              profile=None):
     """Passed a complete reference section, process each line and attempt to
        ## identify and standardise individual citations within the line.
        @param ref_sect: (list) of strings - each string in the list is a
         reference line.
+       @param budgets: (dict) time and length budgets overriding
+        CFG_REFEXTRACT_BUDGETS. Lines over budget are only searched for
+        identifiers, and are kept as misc text once the document budget has
+        been exhausted. The number of such lines is counted as 'degraded'.
+       @param bulk_linker_callback: (callable) alternative to linker_callback,
+        called with the list of all the linkable elements (journals, report
+        numbers, DOIs, books) of the reference lines and returning the list of
+        their recids. It is called twice, before and after the references are
+        split, the second time only with the elements added by the split.
+       @param profile: (string or dict) the profile of the parsing, see
+        get_profile.
        @param preprint_repnum_search_kb: (dictionary) - keyed by a tuple
         containing the line-number of the pattern in the KB and the non-standard
         category string.  E.g.: (3, 'ASTRO PH'). Value is regexp pattern used to
@@ -871,45 +1293,325 @@ def parse_references_elements(ref_sect, kbs, linker_callback=None):
                          section.
          )
     """
-    # a list to contain the processed reference lines:
-    citations = []
     # counters for extraction stats:
-    counts = {
+    counts = new_counts()
+    # A dictionary to contain the total count of each 'bad title' found
+    # in the entire reference section:
+    bad_titles_count = {}
+
+    # a list to contain the processed reference lines:
+    citations = list(iter_references_elements(ref_sect, kbs, counts,
+                                              bad_titles_count,
+                                              linker_callback, budgets,
+                                              bulk_linker_callback, profile))
+
+    # Return the list of processed reference lines:
+    return citations, counts, bad_titles_count
+
+
+def new_counts():
+    """Return the counters for extraction stats, all set to zero."""
+    return {
         'misc': 0,
         'title': 0,
         'reportnum': 0,
         'url': 0,
         'doi': 0,
         'auth_group': 0,
+        'degraded': 0,
     }
-    # A dictionary to contain the total count of each 'bad title' found
-    # in the entire reference section:
-    bad_titles_count = {}
 
-    # Cleanup the reference lines
 
-    # process references line-by-line:
+def iter_references_elements(ref_sect, kbs, counts, bad_titles_count,
+                             linker_callback=None, budgets=None,
+                             bulk_linker_callback=None, profile=None):
+    """Generator version of parse_references_elements, yielding each
+       processed reference line as soon as it has been parsed.
+       @param ref_sect: (iterable) of strings - each string is a reference
+        line.
+       @param counts: (dictionary) counters for extraction stats (see
+        new_counts), updated in place.
+       @param bad_titles_count: (dictionary) the totals for each 'bad title'
+        found, updated in place.
+       @param budgets: (dict) as for parse_references_elements.
+       @param bulk_linker_callback: (callable) as for
+        parse_references_elements. The lines are then processed in batches
+        of CFG_REFEXTRACT_BULK_LINKER_BATCH_SIZE.
+       @param profile: (string or dict) as for parse_references_elements.
+       @return: (generator) of dictionaries with the 'elements',
+        'line_marker' and 'raw_ref' of each reference line.
+    """
+    budgets = get_budgets(budgets)
+    profile = get_profile(profile)
+    document_deadline = None
+    if budgets['document_time'] is not None:
+        document_deadline = time.time() + budgets['document_time']
+    document_length = 0
+
+    if bulk_linker_callback:
+        batch_size = CFG_REFEXTRACT_BULK_LINKER_BATCH_SIZE
+    else:
+        batch_size = 1
+
+    # process references in batches of lines, each batch going through
+    # the parsing phases together so that it can be linked at once:
+    batch = []
     for ref_line in ref_sect:
-        clean_line = wash_and_repair_reference_line(ref_line)
+        document_length += len(ref_line)
+        batch.append(tag_reference_line_in_budget(
+            ref_line, kbs, bad_titles_count, budgets, document_deadline,
+            over_budget(document_length, budgets['document_length']),
+            profile))
+        if len(batch) >= batch_size:
+            for citation in finish_reference_lines(batch, kbs, counts,
+                                                   linker_callback,
+                                                   bulk_linker_callback,
+                                                   budgets,
+                                                   document_deadline,
+                                                   profile):
+                yield citation
+            batch = []
+
+    for citation in finish_reference_lines(batch, kbs, counts,
+                                           linker_callback,
+                                           bulk_linker_callback,
+                                           budgets,
+                                           document_deadline,
+                                           profile):
+        yield citation
+
+
+def get_line_deadline(budgets, document_deadline):
+    """Return the deadline of a reference line parsed from now on."""
+    deadline = document_deadline
+    if budgets['line_time'] is not None:
+        deadline = min(deadline or float('inf'),
+                       time.time() + budgets['line_time'])
+    return deadline
+
+
+def tag_reference_line_in_budget(ref_line, kbs, bad_titles_count, budgets,
+                                 document_deadline, over_document_length,
+                                 profile=None):
+    """First parsing phase of a reference line of a document, the line
+       being degraded to a cheaper parse if it is over budget.
+       @return: (dictionary) the state of the line in the parsing phases.
+    """
+    profile = get_profile(profile)
+    # The parse asked by the profile
+    profile_mode = 'full' if profile['parse_lines'] else 'identifiers'
+    if past_deadline(document_deadline):
+        mode = 'misc'
+    elif over_budget(len(ref_line), budgets['line_length']) or \
+            over_document_length:
+        mode = 'identifiers'
+    else:
+        mode = profile_mode
+
+    # Time the phases of the line for the slow line sampler
+    timings = new_timings()
+    line = {'raw_ref': ref_line, 'timings': timings}
+    if mode == 'full':
+        line['deadline'] = get_line_deadline(budgets, document_deadline)
+        # Cleanup the reference line
+        clean_line = run_timed(timings, 'washing',
+                               wash_and_repair_reference_line, ref_line)
+        try:
+            line['elements'], line['line_marker'], line['counts'], \
+                line_bad_titles_count = run_timed(
+                    timings, 'tagging', tag_reference_elements,
+                    clean_line, kbs, bad_titles_count, line['deadline'],
+                    profile)
+            bad_titles_count.update(line_bad_titles_count)
+        except BudgetExceededError:
+            mode = 'identifiers'
+
+    if mode == 'identifiers':
+        line['elements'], line['line_marker'], line['counts'] = run_timed(
+            timings, 'identifiers', tag_reference_identifiers,
+            wash_reference_line(ref_line))
+    elif mode == 'misc':
+        line['citations'], line['line_marker'], line['counts'] = run_timed(
+            timings, 'misc', parse_reference_line_misc,
+            wash_reference_line(ref_line))
+
+    line['mode'] = mode
+    line['degraded'] = mode != profile_mode
+    return line
+
+
+def run_bulk_timed(lines, func, *args):
+    """Run func(*args) for a batch of lines, sharing its duration evenly
+    between their 'linking' timings."""
+    if not lines or lines[0]['timings'] is None:
+        return func(*args)
+    timings = {}
+    try:
+        return run_timed(timings, 'linking', func, *args)
+    finally:
+        share = timings['linking'] / len(lines)
+        for line in lines:
+            line['timings']['linking'] = \
+                line['timings'].get('linking', 0.0) + share
+
+
+def finish_reference_lines(lines, kbs, counts, linker_callback=None,
+                           bulk_linker_callback=None, budgets=None,
+                           document_deadline=None, profile=None):
+    """Link, split and clean up a batch of reference lines tagged by
+       tag_reference_line_in_budget.
+       @return: (generator) of the processed reference lines, as yielded by
+        iter_references_elements.
+    """
+    linked_lines = [line for line in lines if line['mode'] != 'misc']
 
-        citation_elements, line_marker, this_counts, bad_titles_count = \
-            parse_reference_line(
-                clean_line, kbs, bad_titles_count, linker_callback)
+    # Link references if desired
+    if bulk_linker_callback:
+        run_bulk_timed(linked_lines, bulk_associate_recids,
+                       [el for line in linked_lines for el in line['elements']],
+                       bulk_linker_callback)
+    elif linker_callback:
+        for line in linked_lines:
+            run_timed(line['timings'], 'linking', associate_recids,
+                      line['elements'], linker_callback)
+
+    for line in linked_lines:
+        if line['mode'] == 'full':
+            if bulk_linker_callback:
+                # The batch has been waiting for the linker
+                line['deadline'] = get_line_deadline(budgets,
+                                                     document_deadline)
+            try:
+                line['citations'] = run_timed(
+                    line['timings'], 'splitting', split_reference_elements,
+                    line['elements'], kbs, line['deadline'], profile)
+            except BudgetExceededError:
+                line['mode'] = 'fallback'
+                line['degraded'] = True
+                line['elements'], line['line_marker'], line['counts'] = \
+                    run_timed(line['timings'], 'identifiers',
+                              tag_reference_identifiers,
+                              wash_reference_line(line['raw_ref']))
+        if line['mode'] != 'full':
+            line['citations'] = [line['elements']]
+
+    # Link references with the newly added ibids/books information
+    if bulk_linker_callback:
+        run_bulk_timed(linked_lines, bulk_associate_recids,
+                       [el for line in linked_lines
+                        for citation in line['citations']
+                        for el in citation if 'recid' not in el],
+                       bulk_linker_callback)
+    elif linker_callback:
+        for line in linked_lines:
+            if line['mode'] != 'identifiers':
+                for citation in line['citations']:
+                    run_timed(line['timings'], 'linking', associate_recids,
+                              citation, linker_callback)
+
+    for line in lines:
+        if line['mode'] != 'misc':
+            run_timed(line['timings'], 'finalizing', finalize_citations,
+                      line['citations'])
+            print_citations(line['citations'], line['line_marker'])
+        record_line(line['raw_ref'], line['timings'])
+
+        if line['degraded']:
+            LOGGER.debug(u"over budget, parsed as %s: %r",
+                         line['mode'], line['raw_ref'])
+            counts['degraded'] += 1
 
         # Accumulate stats
-        counts = sum_2_dictionaries(counts, this_counts)
+        counts.update(sum_2_dictionaries(counts, line['counts']))
 
-        citations.append({'elements': citation_elements,
-                          'line_marker': line_marker,
-                          'raw_ref': ref_line})
-        if("Norman" in ref_line):
-            print(ref_line)
+        if("Norman" in line['raw_ref']):
+            print(line['raw_ref'])
 
+        yield {'elements': line['citations'],
+               'line_marker': line['line_marker'],
+               'raw_ref': line['raw_ref']}
+
+
+def _init_parse_worker(override_kbs_files):
+    """Load the knowledge bases once in each worker process."""
+    get_kbs(custom_kbs_files=override_kbs_files)
+
+
+def _parse_references_chunk(args):
+    """Parse a chunk of reference lines in a worker process."""
+    ref_sect, override_kbs_files, linker_callback, budgets, \
+        document_deadline, bulk_linker_callback, profile = args
+    if document_deadline is not None:
+        budgets = dict(budgets, document_time=document_deadline - time.time())
+    kbs = get_kbs(custom_kbs_files=override_kbs_files)
+    return parse_references_elements(ref_sect, kbs, linker_callback, budgets,
+                                     bulk_linker_callback, profile)
+
+
+def parse_references_elements_parallel(ref_sect, processes,
+                                       override_kbs_files=None,
+                                       linker_callback=None,
+                                       budgets=None,
+                                       bulk_linker_callback=None,
+                                       profile=None):
+    """Same as parse_references_elements, but the reference lines are split
+       in contiguous chunks parsed by a pool of processes.
+       The results of the chunks are merged in the original order, so the
+       output is the same as the one of parse_references_elements.
+       @param ref_sect: (list) of strings - each string in the list is a
+        reference line.
+       @param processes: (int) number of worker processes.
+       @param override_kbs_files: (dict) custom kbs files, as for get_kbs.
+       @param linker_callback: (callable) must be picklable (e.g. a module
+        level function) to be sent to the workers, as bulk_linker_callback.
+       @param budgets: (dict) budgets overriding CFG_REFEXTRACT_BUDGETS.
+       @return: (tuple) as parse_references_elements.
+    """
+    budgets = get_budgets(budgets)
+    document_deadline = None
+    if budgets['document_time'] is not None:
+        document_deadline = time.time() + budgets['document_time']
+
+    nb_chunks = processes * CFG_REFEXTRACT_PARALLEL_CHUNKS_PER_PROCESS
+    chunk_size = -(-len(ref_sect) // nb_chunks)
+    chunks = []
+    preceding_length = 0
+    for i in range(0, len(ref_sect), chunk_size):
+        chunk = ref_sect[i:i + chunk_size]
+        chunk_budgets = dict(budgets)
+        if budgets['document_length'] is not None:
+            # The lines of the previous chunks count towards the budget
+            chunk_budgets['document_length'] -= preceding_length
+        preceding_length += sum(len(line) for line in chunk)
+        chunks.append((chunk, override_kbs_files, linker_callback,
+                       chunk_budgets, document_deadline,
+                       bulk_linker_callback, profile))
+
+    pool = multiprocessing.Pool(processes,
+                                initializer=_init_parse_worker,
+                                initargs=(override_kbs_files,))
+    try:
+        results = pool.map(_parse_references_chunk, chunks)
+    finally:
+        pool.close()
+        pool.join()
+
+    citations = []
+    counts = {}
+    bad_titles_count = {}
+    degraded = 0
+    for chunk_citations, chunk_counts, chunk_bad_titles_count in results:
+        citations.extend(chunk_citations)
+        degraded += chunk_counts['degraded']
+        counts = sum_2_dictionaries(counts, chunk_counts)
+        bad_titles_count = sum_2_dictionaries(bad_titles_count,
+                                              chunk_bad_titles_count)
+    counts['degraded'] = degraded
 
-    # Return the list of processed reference lines:
     return citations, counts, bad_titles_count
 
 
+@traced(input_arg=1)
 def parse_tagged_reference_line(line_marker,
                                 line,
                                 identified_dois,
@@ -1013,15 +1715,15 @@ def parse_tagged_reference_line(line_marker,
                     # come directly after this title
                     # i.e., they are recognised using title numeration instead
                     # of ibid notation
-                    identified_citation_element = {'type': "JOURNAL",
-                                                   'misc_txt': cur_misc_txt,
-                                                   'title': title_text,
-                                                   'volume': reference_volume,
-                                                   'year': reference_year,
-                                                   'page': reference_page,
-                                                   'is_ibid': is_ibid,
-                                                   'extra_ibids': []
-                                                   }
+                    identified_citation_element = new_element(
+                        "JOURNAL",
+                        misc_txt=cur_misc_txt,
+                        title=title_text,
+                        volume=reference_volume,
+                        year=reference_year,
+                        page=reference_page,
+                        is_ibid=is_ibid,
+                        extra_ibids=[])
                     count_title += 1
                     cur_misc_txt = u""
 
@@ -1047,13 +1749,12 @@ def parse_tagged_reference_line(line_marker,
 
                         # Takes the just found title text
                         identified_citation_element['extra_ibids'].append(
-                            {'type': "JOURNAL",
-                             'misc_txt': "",
-                             'title': title_text,
-                             'volume': reference_volume,
-                             'year': reference_year,
-                             'page': reference_page,
-                             })
+                            new_element("JOURNAL",
+                                        misc_txt="",
+                                        title=title_text,
+                                        volume=reference_volume,
+                                        year=reference_year,
+                                        page=reference_page))
                         # Increment the stats counters:
                         count_title += 1
 
@@ -1091,9 +1792,10 @@ def parse_tagged_reference_line(line_marker,
                     + len(CFG_REFEXTRACT_MARKER_CLOSING_REPORT_NUM)
                 processed_line = processed_line[ending_tag_pos:]
 
-                identified_citation_element = {'type': "REPORTNUMBER",
-                                               'misc_txt': cur_misc_txt,
-                                               'report_num': report_num}
+                identified_citation_element = new_element(
+                    "REPORTNUMBER",
+                    misc_txt=cur_misc_txt,
+                    report_num=report_num)
                 count_reportnum += 1
                 cur_misc_txt = u""
 
@@ -1113,12 +1815,11 @@ def parse_tagged_reference_line(line_marker,
             identified_urls[0:1] = []
 
             # Save the current misc text
-            identified_citation_element = {
-                'type': "URL",
-                'misc_txt': "%s" % cur_misc_txt,
-                'url_string': "%s" % url_string,
-                'url_desc': "%s" % url_desc
-            }
+            identified_citation_element = new_element(
+                "URL",
+                misc_txt="%s" % cur_misc_txt,
+                url_string="%s" % url_string,
+                url_desc="%s" % url_desc)
 
             count_url += 1
             cur_misc_txt = u""
@@ -1137,11 +1838,10 @@ def parse_tagged_reference_line(line_marker,
             identified_dois[0:1] = []
 
             # SAVE the current misc text
-            identified_citation_element = {
-                'type': "DOI",
-                'misc_txt': "%s" % cur_misc_txt,
-                'doi_string': "%s" % doi_string
-            }
+            identified_citation_element = new_element(
+                "DOI",
+                misc_txt="%s" % cur_misc_txt,
+                doi_string="%s" % doi_string)
 
             # Increment the stats counters:
             count_doi += 1
@@ -1177,12 +1877,11 @@ def parse_tagged_reference_line(line_marker,
                 processed_line = processed_line[
                     idx_closing_tag_nearest + len("</cds.AUTHxxxx>"):]
                 # SAVE the current misc text
-                identified_citation_element = {
-                    'type': "AUTH",
-                    'misc_txt': "%s" % cur_misc_txt,
-                    'auth_txt': "%s" % auth_txt,
-                    'auth_type': "%s" % auth_type
-                }
+                identified_citation_element = new_element(
+                    "AUTH",
+                    misc_txt="%s" % cur_misc_txt,
+                    auth_txt="%s" % auth_txt,
+                    auth_type="%s" % auth_type)
 
                 # Increment the stats counters:
                 count_auth_group += 1
@@ -1276,10 +1975,8 @@ def parse_tagged_reference_line(line_marker,
     if len(cur_misc_txt.strip(" .;,")) > 0:
         # Increment the stats counters:
         count_misc += 1
-        identified_citation_element = {
-            'type': "MISC",
-            'misc_txt': cur_misc_txt,
-        }
+        identified_citation_element = new_element("MISC",
+                                                  misc_txt=cur_misc_txt)
         citation_elements.append(identified_citation_element)
 
     return (citation_elements, line_marker, {
@@ -1305,9 +2002,9 @@ def map_tag_to_subfield(tag_type, line, cur_misc_txt, dest):
         line = line[len('<cds.%s>' % tag_type):]
     else:
         tag_content = line[:idx_closing_tag]
-        identified_citation_element = {'type': tag_type,
-                                       'misc_txt': cur_misc_txt,
-                                       dest: tag_content}
+        identified_citation_element = new_element(tag_type,
+                                                  misc_txt=cur_misc_txt,
+                                                  **{dest: tag_content})
         ending_tag_pos = idx_closing_tag + len(closing_tag)
         line = line[ending_tag_pos:]
         cur_misc_txt = u""
@@ -1395,11 +2092,13 @@ def get_plaintext_document_body(fpath, keep_layout=False):
        @param fpath: (string) - the path to the fulltext file
        @return: (list) of strings - each string being a line in the document.
     """
+    import magic
+
     textbody = []
     mime_type = magic.from_file(fpath, mime=True)
 
     if mime_type == "text/plain":
-        with open(fpath, "r") as f:
+        with open(fpath, "rb") as f:
             textbody = [line.decode("utf-8") for line in f.readlines()]
 
     elif mime_type == "application/pdf":
@@ -1411,24 +2110,115 @@ def get_plaintext_document_body(fpath, keep_layout=False):
     return textbody
 
 
+def get_plaintext_document_body_from_bytes(data, keep_layout=False):
+    """Same as get_plaintext_document_body, for the content of a fulltext.
+       @param data: (bytes) - the content of the fulltext file
+       @return: (list) of strings - each string being a line in the document.
+    """
+    import magic
+
+    mime_type = magic.from_buffer(data, mime=True)
+
+    if mime_type == "text/plain":
+        # Split on the newlines only, as when reading the file
+        return [line.decode("utf-8") for line in BytesIO(data).readlines()]
+
+    elif mime_type == "application/pdf":
+        return convert_PDF_bytes_to_plaintext(data, keep_layout)
+
+    raise UnknownDocumentTypeError(mime_type)
+
+
 def parse_references(reference_lines,
                      recid=None,
                      override_kbs_files=None,
                      reference_format=u"{title} {volume} ({year}) {page}",
-                     linker_callback=None):
+                     linker_callback=None,
+                     budgets=None,
+                     processes=None,
+                     bulk_linker_callback=None,
+                     profile=None):
     """Parse a list of references
 
     Given a list of raw reference lines (list of strings),
     output a list of dictionaries containing the parsed references
+
+    The optional ``budgets`` dictionary overrides CFG_REFEXTRACT_BUDGETS.
+
+    If ``processes`` is greater than 1, documents of at least
+    CFG_REFEXTRACT_PARALLEL_THRESHOLD lines are parsed by a pool of that
+    many processes. The ``linker_callback`` must then be picklable.
+
+    Instead of a ``linker_callback`` called for each element, a
+    ``bulk_linker_callback`` can be given: it is called with the list of the
+    linkable elements of the document and returns the list of their recids
+    (see parse_references_elements).
+
+    The ``profile`` (a name of CFG_REFEXTRACT_PROFILES, by default 'full')
+    selects the stages of the parsing, trading accuracy for speed.
     """
-    # RefExtract knowledge bases
+    # RefExtract knowledge bases, loaded before any worker is started
     kbs = get_kbs(custom_kbs_files=override_kbs_files)
     # Identify journal titles, report numbers, URLs, DOIs, and authors...
-    processed_references, counts, dummy_bad_titles_count = \
-        parse_references_elements(reference_lines, kbs, linker_callback)
-
-    return (build_references(processed_references, reference_format),
-            build_stats(counts))
+    if processes and processes > 1 and \
+            len(reference_lines) >= CFG_REFEXTRACT_PARALLEL_THRESHOLD:
+        processed_references, counts, dummy_bad_titles_count = \
+            parse_references_elements_parallel(reference_lines,
+                                               processes,
+                                               override_kbs_files,
+                                               linker_callback,
+                                               budgets,
+                                               bulk_linker_callback,
+                                               profile)
+    else:
+        with sampled_document(recid):
+            processed_references, counts, dummy_bad_titles_count = \
+                parse_references_elements(reference_lines, kbs,
+                                          linker_callback, budgets,
+                                          bulk_linker_callback, profile)
+
+    stats = build_stats(counts)
+    record_document(stats, len(reference_lines))
+    return build_references(processed_references, reference_format), stats
+
+
+def iter_references(reference_lines,
+                    recid=None,
+                    override_kbs_files=None,
+                    reference_format=u"{title} {volume} ({year}) {page}",
+                    linker_callback=None,
+                    budgets=None,
+                    stats=None,
+                    bulk_linker_callback=None,
+                    profile=None):
+    """Parse a list of references, one at a time
+
+    Generator version of parse_references: each parsed reference is yielded
+    as soon as its line has been processed, so that ``reference_lines`` may
+    itself be a generator.
+    If ``stats`` is a dictionary, it is updated with the stats once all the
+    references have been yielded.
+    """
+    kbs = get_kbs(custom_kbs_files=override_kbs_files)
+    counts = new_counts()
+    bad_titles_count = {}
+    lines = 0
+    for citation in iter_references_elements(reference_lines, kbs, counts,
+                                             bad_titles_count,
+                                             linker_callback, budgets,
+                                             bulk_linker_callback, profile):
+        lines += 1
+        for elements in citation['elements']:
+            for reference in build_reference_fields(elements,
+                                                    citation['line_marker'],
+                                                    citation['raw_ref'],
+                                                    reference_format):
+                yield reference
+
+    document_stats = build_stats(counts)
+    record_document(document_stats, lines)
+    if stats is not None:
+        stats.update(document_stats)
 
 
 def build_stats(counts):
@@ -1441,6 +2231,7 @@ def build_stats(counts):
         'url': counts['url'],
         'doi': counts['doi'],
         'misc': counts['misc'],
+        'degraded': counts.get('degraded', 0),
     }
     stats_str = "%(status)s-%(reportnum)s-%(title)s-%(author)s-%(url)s-%(doi)s-%(misc)s" % stats
     stats["old_stats_str"] = stats_str
@@ -34,3 +34,8 @@ class FullTextNotAvailableError(Exception):
 class UnknownDocumentTypeError(Exception):
 
     """Raised when we don't know how to handle the document's MIME type."""
+
+
+class BudgetExceededError(Exception):
+
+    """Raised when parsing a reference line runs out of its time budget."""
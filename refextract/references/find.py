@@ -25,28 +25,188 @@
 
 from __future__ import absolute_import, division, print_function
 
+import bisect
 import logging
 import re
-import Levenshtein
+import time
 
+from array import array
+
+from .config import CFG_REFEXTRACT_SECTION_CONFIDENCE_THRESHOLD
+from .hooks import traced
+from .metrics import REFERENCE_SECTION_STRATEGIES
 from .regexs import \
+    combine_patterns, \
     get_reference_section_title_patterns, \
     get_reference_line_numeration_marker_patterns, \
     regex_match_list, \
-    get_post_reference_section_title_patterns, \
-    get_post_reference_section_keyword_patterns, \
     re_reference_line_bracket_markers, \
     re_reference_line_dot_markers, \
     re_reference_line_number_markers, \
     re_num, \
-    re_year_num
+    re_post_reference_section_title, \
+    re_reference_section_title
 
 from .tag import identifiy_journals_re, identify_journals, tag_reference_line
 
 LOGGER = logging.getLogger(__name__)
 
+# Kinds of the reference line markers of the lines
+NO_MARKER = 0
+NUMBERED_MARKER = 1
+# The marker pattern has no marknum group
+UNNUMBERED_MARKER = 2
+# The marknum of the marker is not an integer
+INVALID_MARKER = 3
+
+# Digit classes of the lines
+OTHER_LINE = 0
+DIGITS_LINE = 1
+BLANK_LINE = 2
+# Characters of the axis scales of graphs, besides the digits
+DIGIT_TEST_DELETIONS = dict.fromkeys(map(ord, u" .-+\u00D7\u2212"))
+re_letter = re.compile(r'[a-zA-Z]')
+
+
+def get_combined_pattern(patterns, cache={}):
+    """Return the pattern matching where the first of the patterns matching
+    does (see combine_patterns), the pattern itself if there is one."""
+    key = tuple((pattern.pattern, pattern.flags) for pattern in patterns)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    if len(patterns) == 1:
+        cache[key] = patterns[0]
+    else:
+        cache[key] = combine_patterns(patterns)
+    return cache[key]
+
+
+def match_first(line, patterns, combined):
+    """Same as regex_match_list(line, patterns), matching the combined
+    pattern of the patterns first."""
+    match = combined.match(line)
+    if match and len(patterns) > 1:
+        match = patterns[int(match.lastgroup[1:])].match(line)
+    return match
+
+
+def get_digit_class(line):
+    """Tell whether the line only has digits (like the axis scale of a graph
+    in a figure), is blank or is another line."""
+    if re_letter.search(line):
+        return OTHER_LINE
+    digit_test_str = line.translate(DIGIT_TEST_DELETIONS).strip()
+    if len(digit_test_str) > 10 and digit_test_str.isdigit():
+        return DIGITS_LINE
+    if not digit_test_str:
+        return BLANK_LINE
+    return OTHER_LINE
+
+
+class MarkerFeatures(object):
+    """The reference line markers of the lines of a document for a list of
+    marker patterns, as regex_match_list(line.strip(), patterns) finds them.
+
+    @ivar kinds: (array) the kind of marker of each line (NO_MARKER,
+        NUMBERED_MARKER...).
+    @ivar numbers: (list) the number of the marker of each line, or None.
+    @ivar firsts: (list) the indexes of the lines marked '1'.
+    @ivar seconds: (list) the indexes of the lines marked '2'.
+    """
 
-def find_reference_section(docbody):
+    def __init__(self, lines, patterns):
+        combined = get_combined_pattern(patterns)
+        self.kinds = array('b', [NO_MARKER]) * len(lines)
+        self.numbers = [None] * len(lines)
+        self.firsts = []
+        self.seconds = []
+        # Indexes of the lines which may continue a reference section (their
+        # marker is not only digits), by number of their marker
+        self.continuations = {}
+        self.unnumbered = []
+        for index, line in enumerate(lines):
+            match = match_first(line, patterns, combined)
+            if not match:
+                continue
+            try:
+                marknum = match.group('marknum')
+            except IndexError:
+                self.kinds[index] = UNNUMBERED_MARKER
+                if not match.group(0).isdigit():
+                    self.unnumbered.append(index)
+                continue
+            if marknum == '1':
+                self.firsts.append(index)
+            elif marknum == '2':
+                self.seconds.append(index)
+            try:
+                number = int(marknum)
+            except (TypeError, ValueError):
+                self.kinds[index] = INVALID_MARKER
+                continue
+            self.kinds[index] = NUMBERED_MARKER
+            self.numbers[index] = number
+            if not match.group(0).isdigit():
+                self.continuations.setdefault(number, []).append(index)
+
+    def find_continuation(self, start, end, number):
+        """Tell whether a line between start and end has a marker continuing
+        a reference section: numbered ``number``, or without number."""
+        for indexes in (self.continuations.get(number, ()), self.unnumbered):
+            position = bisect.bisect_left(indexes, start)
+            if position < len(indexes) and indexes[position] < end:
+                return True
+        return False
+
+    def find_second(self, start, end):
+        """Tell whether a line between start and end is marked '2'."""
+        position = bisect.bisect_left(self.seconds, start)
+        return position < len(self.seconds) and self.seconds[position] < end
+
+
+class LineFeatures(object):
+    """The features of the lines of a document used to find its reference
+    section.
+
+    Each feature is computed once for all the lines, in one pass over the
+    document (the markers once for each list of marker patterns), and the
+    heuristics query them instead of matching their patterns against the
+    lines again.
+
+    @ivar title_indexes: (list) the indexes of the lines matching a title
+        pattern of the reference section.
+    @ivar post_titles: (array) 1 for the lines matching a title pattern of a
+        section following the reference section.
+    @ivar digit_classes: (array) the digit class of each line (OTHER_LINE,
+        DIGITS_LINE or BLANK_LINE).
+    """
+
+    def __init__(self, docbody):
+        self.lines = docbody
+        self.stripped_lines = [line.strip() for line in docbody]
+        title_match = re_reference_section_title.match
+        self.title_indexes = [index for index, line in enumerate(docbody)
+                              if title_match(line)]
+        post_title_match = re_post_reference_section_title.match
+        self.post_titles = array('b', [post_title_match(line) is not None
+                                       for line in self.stripped_lines])
+        self.digit_classes = array('b', map(get_digit_class, docbody))
+        self._markers = {}
+
+    def markers(self, patterns):
+        """Return the MarkerFeatures of the lines for the marker patterns."""
+        key = tuple((pattern.pattern, pattern.flags) for pattern in patterns)
+        try:
+            return self._markers[key]
+        except KeyError:
+            markers = MarkerFeatures(self.stripped_lines, patterns)
+            self._markers[key] = markers
+            return markers
+
+
+def find_reference_section(docbody, features=None):
     """Search in document body for its reference section.
 
     More precisely, find
@@ -55,6 +215,8 @@ def find_reference_section(docbody):
     the title of a reference section. It stops when (if) it finds something
     that it considers to be the first line of a reference section.
     @param docbody: (list) of strings - the full document body.
+    @param features: (LineFeatures) - the features of the lines of docbody,
+        computed if not given.
     @return: (dictionary) :
         { 'start_line' : (integer) - index in docbody of 1st reference line,
           'title_string' : (string) - title of the reference section.
@@ -70,17 +232,18 @@ def find_reference_section(docbody):
          -- OR --
                 (None) - when the reference section could not be found.
     """
+    if features is None:
+        features = LineFeatures(docbody)
     ref_details = None
     title_patterns = get_reference_section_title_patterns()
 
     # Try to find refs section title:
     for title_pattern in title_patterns:
-        # Look for title pattern in docbody
-        for reversed_index, line in enumerate(reversed(docbody)):
-            title_match = title_pattern.match(line)
+        # Look for title pattern in the lines matching one
+        for index in reversed(features.title_indexes):
+            title_match = title_pattern.match(docbody[index])
             if title_match:
                 title = title_match.group('title')
-                index = len(docbody) - 1 - reversed_index
                 temp_ref_details, found_title = find_numeration(docbody[index:index + 6], title)
                 if temp_ref_details:
                     if ref_details and 'title' in ref_details and ref_details['title'] and not temp_ref_details['title']:
@@ -207,7 +370,7 @@ def find_numeration(docbody, title):
     return ref_details, found_title
 
 
-def find_reference_section_no_title_via_brackets(docbody):
+def find_reference_section_no_title_via_brackets(docbody, features=None):
     """This function would generally be used when it was not possible to locate
        the start of a document's reference section by means of its title.
        Instead, this function will look for reference lines that have numeric
@@ -229,10 +392,11 @@ def find_reference_section_no_title_via_brackets(docbody):
                 (None) - when the reference section could not be found.
     """
     marker_patterns = [re_reference_line_bracket_markers]
-    return find_reference_section_no_title_generic(docbody, marker_patterns)
+    return find_reference_section_no_title_generic(docbody, marker_patterns,
+                                                   features)
 
 
-def find_reference_section_no_title_via_dots(docbody):
+def find_reference_section_no_title_via_dots(docbody, features=None):
     """This function would generally be used when it was not possible to locate
        the start of a document's reference section by means of its title.
        Instead, this function will look for reference lines that have numeric
@@ -254,10 +418,11 @@ def find_reference_section_no_title_via_dots(docbody):
                 (None) - when the reference section could not be found.
     """
     marker_patterns = [re_reference_line_dot_markers]
-    return find_reference_section_no_title_generic(docbody, marker_patterns)
+    return find_reference_section_no_title_generic(docbody, marker_patterns,
+                                                   features)
 
 
-def find_reference_section_no_title_via_numbers(docbody):
+def find_reference_section_no_title_via_numbers(docbody, features=None):
     """This function would generally be used when it was not possible to locate
        the start of a document's reference section by means of its title.
        Instead, this function will look for reference lines that have numeric
@@ -279,10 +444,12 @@ def find_reference_section_no_title_via_numbers(docbody):
                 (None) - when the reference section could not be found.
     """
     marker_patterns = [re_reference_line_number_markers]
-    return find_reference_section_no_title_generic(docbody, marker_patterns)
+    return find_reference_section_no_title_generic(docbody, marker_patterns,
+                                                   features)
 
 
-def find_reference_section_no_title_generic(docbody, marker_patterns):
+def find_reference_section_no_title_generic(docbody, marker_patterns,
+                                            features=None):
     """This function would generally be used when it was not possible to locate
        the start of a document's reference section by means of its title.
        Instead, this function will look for reference lines that have numeric
@@ -305,43 +472,37 @@ def find_reference_section_no_title_generic(docbody, marker_patterns):
     """
     if not docbody:
         return None
+    if features is None:
+        features = LineFeatures(docbody)
+    markers = features.markers(marker_patterns)
 
     ref_start_line = ref_line_marker = None
 
     # try to find first reference line in the reference section:
     found_ref_sect = False
 
-    for reversed_index, line in enumerate(reversed(docbody)):
-        mark_match = regex_match_list(line.strip(), marker_patterns)
-        if mark_match and mark_match.group('marknum') == '1':
-            # Get marker recognition pattern:
-            mark_pattern = mark_match.re.pattern
-
-            # Look for [2] in next 10 lines:
-            next_test_lines = 10
-
-            index = len(docbody) - reversed_index
-            zone_to_check = docbody[index:index + next_test_lines]
-            if len(zone_to_check) < 5:
-                # We found a 1 towards the end, we assume
-                # we only have one reference
-                found = True
-            else:
-                # Check for number 2
-                found = False
-                for l in zone_to_check:
-                    mark_match2 = regex_match_list(l.strip(), marker_patterns)
-                    if mark_match2 and mark_match2.group('marknum') == '2':
-                        found = True
-                        break
+    for line_index in reversed(markers.firsts):
+        # Look for [2] in next 10 lines:
+        next_test_lines = 10
 
-            if found:
-                # Found next reference line:
-                found_ref_sect = True
-                ref_start_line = len(docbody) - 1 - reversed_index
-                ref_line_marker = mark_match.group('mark')
-                ref_line_marker_pattern = mark_pattern
-                break
+        index = line_index + 1
+        if len(docbody) - index < 5:
+            # We found a 1 towards the end, we assume
+            # we only have one reference
+            found = True
+        else:
+            # Check for number 2
+            found = markers.find_second(index, index + next_test_lines)
+
+        if found:
+            # Found next reference line:
+            found_ref_sect = True
+            mark_match = regex_match_list(docbody[line_index].strip(),
+                                          marker_patterns)
+            ref_start_line = line_index
+            ref_line_marker = mark_match.group('mark')
+            ref_line_marker_pattern = mark_match.re.pattern
+            break
 
     if found_ref_sect:
         ref_sectn_details = {
@@ -358,10 +519,12 @@ def find_reference_section_no_title_generic(docbody, marker_patterns):
     return ref_sectn_details
 
 
+@traced
 def find_end_of_reference_section(docbody,
                                   ref_start_line,
                                   ref_line_marker,
-                                  ref_line_marker_ptn):
+                                  ref_line_marker_ptn,
+                                  features=None):
     """Given that the start of a document's reference section has already been
        recognised, this function is tasked with finding the line-number in the
        document of the last line of the reference section.
@@ -372,6 +535,8 @@ def find_end_of_reference_section(docbody,
         line.
        @param ref_line_marker_ptn: (string) - the pattern used to search for a
         reference line marker.
+       @param features: (LineFeatures) - the features of the lines of docbody,
+        computed if not given.
        @return: (integer) - index in docbody of the last reference line
          -- OR --
                 (None) - if ref_start_line was invalid.
@@ -385,83 +550,41 @@ def find_end_of_reference_section(docbody,
         # valid integer.
         # Can't safely find end of refs with this info - quit.
         return None
-    # Get patterns for testing line:
-    t_patterns = get_post_reference_section_title_patterns()
-    kw_patterns = get_post_reference_section_keyword_patterns()
+    if features is None:
+        features = LineFeatures(docbody)
 
     if None not in (ref_line_marker, ref_line_marker_ptn):
         mk_patterns = [re.compile(ref_line_marker_ptn, re.I | re.UNICODE)]
     else:
         mk_patterns = get_reference_line_numeration_marker_patterns()
+    markers = features.markers(mk_patterns)
 
     current_reference_count = 0
     while x < len(docbody) and not section_ended:
         # save the reference count
-        num_match = regex_match_list(docbody[x].strip(), mk_patterns)
-        if num_match:
-            try:
-                current_reference_count = int(num_match.group('marknum'))
-            except (ValueError, IndexError):
-                # non numerical references marking
-                pass
+        if markers.kinds[x] == NUMBERED_MARKER:
+            current_reference_count = markers.numbers[x]
         # look for a likely section title that would follow a reference
         # section:
-        end_match = regex_match_list(docbody[x].strip(), t_patterns)
-        if not end_match:
-            # didn't match a section title - try looking for keywords that
-            # suggest the end of a reference section:
-            end_match = regex_match_list(docbody[x].strip(), kw_patterns)
-        else:
-            # Is it really the end of the reference section? Check within the next
-            # 5 lines for other reference numeration markers:
-            y = x + 1
-            line_found = False
-            while y < x + 200 and y < len(docbody) and not line_found:
-                num_match = regex_match_list(docbody[y].strip(), mk_patterns)
-                if num_match and not num_match.group(0).isdigit():
-                    try:
-                        num = int(num_match.group('marknum'))
-                        if current_reference_count + 1 == num:
-                            line_found = True
-                    except ValueError:
-                        # We have the marknum index so it is
-                        # numeric pattern for references like
-                        # [1], [2] but this match is not a number
-                        pass
-                    except IndexError:
-                        # We have a non numerical references marking
-                        # we don't check for a number continuity
-                        line_found = True
-                y += 1
-            if not line_found:
+        if features.post_titles[x]:
+            # Is it really the end of the reference section? Check within the
+            # next 200 lines for the next reference numeration marker:
+            if not markers.find_continuation(x + 1, x + 200,
+                                             current_reference_count + 1):
                 # No ref line found-end section
                 section_ended = True
         if not section_ended:
             # Does this & the next 5 lines simply contain numbers? If yes, it's
             # probably the axis scale of a graph in a fig. End refs section
-            digit_test_str = docbody[x].replace(" ", "").\
-                replace(".", "").\
-                replace("-", "").\
-                replace("+", "").\
-                replace(u"\u00D7", "").\
-                replace(u"\u2212", "").\
-                strip()
-            if len(digit_test_str) > 10 and digit_test_str.isdigit():
+            if features.digit_classes[x] == DIGITS_LINE:
                 # The line contains only digits and is longer than 10 chars:
                 y = x + 1
                 digit_lines = 4
                 num_digit_lines = 1
                 while y < x + digit_lines and y < len(docbody):
-                    digit_test_str = docbody[y].replace(" ", "").\
-                        replace(".", "").\
-                        replace("-", "").\
-                        replace("+", "").\
-                        replace(u"\u00D7", "").\
-                        replace(u"\u2212", "").\
-                        strip()
-                    if len(digit_test_str) > 10 and digit_test_str.isdigit():
+                    if features.digit_classes[y] == DIGITS_LINE:
                         num_digit_lines += 1
-                    elif len(digit_test_str) == 0:
+                    elif features.digit_classes[y] == BLANK_LINE:
                         # This is a blank line. Don't count it, to accommodate
                         # documents that are double-line spaced:
                         digit_lines += 1
@@ -472,48 +595,33 @@ def find_end_of_reference_section(docbody,
     return x - 1
 
 
-def get_reference_section_beginning(fulltext):
+@traced
+def get_reference_section_beginning(fulltext, features=None):
+    """Find the first line of the reference section, trying the strategies of
+    SECTION_START_STRATEGIES (see locate_reference_section).
 
-    sect_start = {'start_line': None,
-                  'end_line': None,
-                  'title_string': None,
-                  'marker_pattern': None,
-                  'marker': None,
-                  'how_found_start': None,
-                  }
+    @return: (dictionary) the start of the reference section, as returned by
+        find_reference_section, or None.
+    """
+    sect_start, dummy = locate_reference_section(fulltext, features,
+                                                 SECTION_START_STRATEGIES)
+    return sect_start
 
-    # Find start of refs section:
-    sect_start = find_reference_section(fulltext)
-    if sect_start is not None:
-        sect_start['how_found_start'] = 1
-    else:
-        # No references found - try with no title option
-        sect_start = find_reference_section_no_title_via_brackets(fulltext)
-        if sect_start is not None:
-            sect_start['how_found_start'] = 2
-        # Try weaker set of patterns if needed
-        if sect_start is None:
-            # No references found - try with no title option (with weaker
-            # patterns..)
-            sect_start = find_reference_section_no_title_via_dots(fulltext)
-            if sect_start is not None:
-                sect_start['how_found_start'] = 3
-            if sect_start is None:
-                # No references found - try with no title option (with even
-                # weaker patterns..)
-                sect_start = find_reference_section_no_title_via_numbers(
-                    fulltext)
-                if sect_start is not None:
-                    sect_start['how_found_start'] = 4
-
-    if sect_start:
-        LOGGER.debug(u"title %r", sect_start['title_string'])
-        LOGGER.debug(u"marker %r", sect_start['marker'])
-        LOGGER.debug(u"title_marker_same_line %s", sect_start['title_marker_same_line'])
 
-    else:
-        LOGGER.debug(u"could not find references section")
-    return sect_start
+def get_pure_edit_distance(first, second):
+    """Return the Levenshtein distance of two strings (python-Levenshtein
+    computes it faster when it is installed)."""
+    if len(first) < len(second):
+        first, second = second, first
+    previous_row = list(range(len(second) + 1))
+    for index, char in enumerate(first):
+        row = [index + 1]
+        for position, other_char in enumerate(second):
+            row.append(min(previous_row[position + 1] + 1,
+                           row[position] + 1,
+                           previous_row[position] + (char != other_char)))
+        previous_row = row
+    return previous_row[-1]
 
 
 def identify_author_or_journal(line, kb, author_regex):
@@ -554,7 +662,10 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
     if not docbody:
         return []
 
-    import numpy
+    try:
+        from Levenshtein import distance as get_edit_distance
+    except ImportError:
+        get_edit_distance = get_pure_edit_distance
     from .regexs import re_year_num, re_year
     from ..authors.regexs import  get_author_regexps
     import re
@@ -587,9 +698,6 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
     uninteresting_beginning_lines=[]
     individual_refs=[]
 
-    import hist
-    rel_distances=[]
-
 
     for line_index, cur_line in enumerate(docbody):
     
@@ -599,7 +707,7 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
 
         if(matches is not None):
             #multi_match=comp_re_year_num.search(cur_line.strip())
-            print("CURLINE: ", stripped_line, "INDEX: ", line_index)
+            LOGGER.debug(u"year line %d: %r", line_index, stripped_line)
             #print(matches.start(), matches.end(), matches.span())
 
             if(line_index<15):
@@ -612,9 +720,8 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
                 cur_ref=[]
                 similar=False
                 for ul in uninteresting_beginning_lines:
-                    relative_levenshtein=float(Levenshtein.distance(ul, stripped_line))/(0.5*(float(len(ul)+len(stripped_line))))
-                    rel_distances.append(relative_levenshtein)
-                    
+                    relative_levenshtein=float(get_edit_distance(ul, stripped_line))/(0.5*(float(len(ul)+len(stripped_line))))
+
                     # relative distance < 0.1 is usually sufficient to identify similar string (single character errors due to digitization
                     # are taken into account here)
                     if(relative_levenshtein<0.1):
@@ -651,7 +758,7 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
                 journal_or_auth_found=False
                 ## go back 4 lines and check for authors / journals there
                 journal_auth_found_line_index=-1
-                for backwards_index in (numpy.arange(4)+1):
+                for backwards_index in range(1, 5):
                     
                     if(last_year_index==(line_index-backwards_index)):
                         ### ok we found the previous end line(assuming year always ends a ).. do not add it to current stack
@@ -678,7 +785,7 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
                                 #print("FOUND JOURAN ON ", bw_line)
                                 #print("prev_journal", prev_journal.keys())
                                 if(prev_auth is not None):
-                                    print("AUTHOR: ", prev_auth.group(0))
+                                    LOGGER.debug(u"author %r", prev_auth.group(0))
                                 journal_auth_found_line_index=backwards_index            
                 if(journal_or_auth_found):
                     #print("now extenidng ", line_index-backwards_index)
@@ -702,3 +809,203 @@ def find_reference_chunks_based_on_year_n_symbol_matching(docbody, marker_patter
     
     return individual_refs
 
+
+def find_reference_section_via_year_n_symbols(docbody, features=None):
+    """Find the reference lines of a document by their years and symbols,
+       for the documents without a reference section at their end (see
+       find_reference_chunks_based_on_year_n_symbol_matching).
+       @param docbody: (list) of strings - the full document body.
+       @param features: (LineFeatures) - unused.
+       @return: (dictionary) the reference section, whose 'reference_lines'
+        are the reference lines found, or None.
+    """
+    reference_lines = \
+        find_reference_chunks_based_on_year_n_symbol_matching(docbody, None)
+    if not reference_lines:
+        return None
+    return {
+        'start_line': None,
+        'title_string': None,
+        'marker': None,
+        'marker_pattern': None,
+        'title_marker_same_line': False,
+        'reference_lines': reference_lines,
+    }
+
+
+class SectionStrategy(object):
+    """A registered strategy locating the reference section of a document.
+
+    @param name: (string) name of the strategy.
+    @param func: (callable) called as func(docbody, features), returning the
+        reference section found (see find_reference_section) or None. A
+        section with 'reference_lines' gives the reference lines instead of
+        the first line of the section.
+    @param confidence: (float) confidence in the sections found, from 0 to 1.
+    @param cost: (float) relative cost of the strategy, the strategies being
+        tried cheapest first.
+    @param how_found_start: (int) value of 'how_found_start' in the sections
+        found, or None.
+    @param enabled: (bool) whether the strategy is tried.
+    """
+
+    def __init__(self, name, func, confidence, cost, how_found_start=None,
+                 enabled=True):
+        self.name = name
+        self.func = func
+        self.confidence = confidence
+        self.cost = cost
+        self.how_found_start = how_found_start
+        self.enabled = enabled
+
+    def __repr__(self):
+        return 'SectionStrategy(%r, confidence=%r, cost=%r, enabled=%r)' % (
+            self.name, self.confidence, self.cost, self.enabled)
+
+
+# Strategies locating the reference section. The costs are the mean times
+# of the strategies, relative to the title search, on the documents of the
+# benchmark corpus once their LineFeatures are computed. The search by
+# years and symbols, by far the costliest, has the lowest confidence.
+# The tuple is replaced, never modified (see register_section_strategy).
+SECTION_STRATEGIES = (
+    SectionStrategy('title', find_reference_section, 1.0, 1, 1),
+    SectionStrategy('brackets', find_reference_section_no_title_via_brackets,
+                    0.8, 1.4, 2),
+    SectionStrategy('dots', find_reference_section_no_title_via_dots, 0.6,
+                    1.7, 3),
+    SectionStrategy('numbers', find_reference_section_no_title_via_numbers,
+                    0.4, 1.7, 4),
+    SectionStrategy('year_n_symbols',
+                    find_reference_section_via_year_n_symbols, 0.2, 4300, 5),
+)
+
+# Strategies finding the first line of the reference section
+SECTION_START_STRATEGIES = ('title', 'brackets', 'dots', 'numbers')
+
+# Strategies which are only tried when named: the search by years and
+# symbols finds reference lines in most texts, so that it is only tried
+# once the other strategies failed on all the conversions of a document
+# (see refextract.references.api.get_reference_lines)
+SECTION_FALLBACK_STRATEGIES = ('year_n_symbols',)
+
+
+def get_section_strategy(name):
+    for strategy in SECTION_STRATEGIES:
+        if strategy.name == name:
+            return strategy
+    raise ValueError('Unknown section strategy: %s' % name)
+
+
+def register_section_strategy(name, func, confidence, cost):
+    """Register a strategy locating the reference section (see
+    SectionStrategy).
+
+    A strategy registered again under the same name is replaced.
+    """
+    global SECTION_STRATEGIES
+    SECTION_STRATEGIES = tuple(
+        strategy for strategy in SECTION_STRATEGIES
+        if strategy.name != name) + (
+            SectionStrategy(name, func, confidence, cost),)
+    return func
+
+
+def set_section_strategy_enabled(name, enabled):
+    """Enable or disable the registered strategy ``name``."""
+    global SECTION_STRATEGIES
+    strategy = get_section_strategy(name)
+    SECTION_STRATEGIES = tuple(
+        SectionStrategy(s.name, s.func, s.confidence, s.cost,
+                        s.how_found_start, enabled)
+        if s is strategy else s
+        for s in SECTION_STRATEGIES)
+
+
+def disable_section_strategy(name):
+    set_section_strategy_enabled(name, False)
+
+
+def enable_section_strategy(name):
+    set_section_strategy_enabled(name, True)
+
+
+def select_section_strategies(names=None, cache={}):
+    """Return the enabled strategies among ``names`` (or all of them but the
+    SECTION_FALLBACK_STRATEGIES), cheapest first."""
+    key = (SECTION_STRATEGIES, names)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    if len(cache) > 16:
+        # Forget the selections of the previous registries
+        cache.clear()
+    strategies = [strategy for strategy in SECTION_STRATEGIES
+                  if strategy.enabled and (
+                      strategy.name in names if names is not None else
+                      strategy.name not in SECTION_FALLBACK_STRATEGIES)]
+    cache[key] = tuple(sorted(strategies, key=lambda s: s.cost))
+    return cache[key]
+
+
+def locate_reference_section(docbody, features=None, names=None,
+                             threshold=CFG_REFEXTRACT_SECTION_CONFIDENCE_THRESHOLD):
+    """Locate the reference section of a document with the registered
+    strategies.
+
+    The strategies are tried cheapest first. The search stops at the first
+    section found with a confidence of at least ``threshold``; otherwise
+    the section of the highest confidence is kept, the strategies which
+    cannot find a section of a higher confidence being skipped.
+
+    @param docbody: (list) of strings - the full document body.
+    @param features: (LineFeatures) - the features of the lines of docbody,
+        computed if not given.
+    @param names: (tuple) names of the strategies to try, None for all but
+        the SECTION_FALLBACK_STRATEGIES.
+    @param threshold: (float) confidence of a section ending the search.
+    @return: (tuple) the reference section (see SectionStrategy) or None,
+        and the report of the search: a dictionary of the 'strategy' which
+        found the section, its 'confidence', and the 'seconds' spent by the
+        strategies 'tried' (a list of dictionaries of their 'strategy',
+        'seconds' and whether they 'found' a section).
+    """
+    if features is None:
+        features = LineFeatures(docbody)
+
+    section = winner = None
+    tried = []
+    for strategy in select_section_strategies(names):
+        if winner is not None and strategy.confidence <= winner.confidence:
+            continue
+        start = time.time()
+        found = strategy.func(docbody, features)
+        tried.append({'strategy': strategy.name,
+                      'seconds': time.time() - start,
+                      'found': found is not None})
+        if found is not None:
+            section, winner = found, strategy
+            if strategy.confidence >= threshold:
+                break
+
+    report = {
+        'strategy': None,
+        'confidence': None,
+        'seconds': sum(attempt['seconds'] for attempt in tried),
+        'tried': tried,
+    }
+    if winner is None:
+        LOGGER.debug(u"could not find references section")
+        return None, report
+
+    section['how_found_start'] = winner.how_found_start
+    report['strategy'] = winner.name
+    report['confidence'] = winner.confidence
+    REFERENCE_SECTION_STRATEGIES.inc(strategy=winner.name)
+    LOGGER.debug(u"strategy %s in %.3fs", winner.name, report['seconds'])
+    LOGGER.debug(u"title %r", section['title_string'])
+    LOGGER.debug(u"marker %r", section['marker'])
+    LOGGER.debug(u"title_marker_same_line %s",
+                 section['title_marker_same_line'])
+    return section, report
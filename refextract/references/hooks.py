@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Hooks called around the stages of the extraction.
+
+A hook is a callable installed with install_hook, called after each traced
+stage of the pipeline (conversion, finding the reference section, washing
+and tagging the lines, the transforms of the citation elements, building the
+references...) as::
+
+    hook(stage, duration, input_size, output_size)
+
+with the name of the stage (the name of its function), its duration in
+seconds and the sizes of its input and output (number of lines, characters
+or elements, or None if they have no size):
+
+>>> def trace(stage, duration, input_size, output_size):
+...     tracer.record(stage, duration, input_size=input_size)
+>>> with using_hook(trace):
+...     extract_references_from_file('paper.pdf')
+
+When no hook is installed, the stages are run directly. The exceptions
+raised by the hooks are logged and ignored.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import functools
+import logging
+import os
+import time
+
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+# Installed hooks; the tuple is replaced, never modified, so that it can be
+# iterated while another thread installs a hook
+HOOKS = ()
+
+
+def install_hook(hook):
+    """Install a hook, called after each traced stage."""
+    global HOOKS
+    HOOKS = HOOKS + (hook,)
+    return hook
+
+
+def remove_hook(hook):
+    """Remove a hook installed with install_hook."""
+    global HOOKS
+    hooks = list(HOOKS)
+    hooks.remove(hook)
+    HOOKS = tuple(hooks)
+
+
+@contextmanager
+def using_hook(hook):
+    """Install a hook for the duration of the context."""
+    install_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
+
+
+def get_size(value):
+    """Return the size of an input or output of a stage: its length, the
+    size of its first item for a tuple, else None."""
+    if isinstance(value, tuple):
+        return get_size(value[0]) if value else None
+    if isinstance(value, dict):
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def get_file_size(path):
+    """Return the size of a file in bytes, None if it does not exist."""
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
+
+
+def call_hooks(stage, duration, input_size, output_size):
+    for hook in HOOKS:
+        try:
+            hook(stage, duration, input_size, output_size)
+        except Exception:
+            LOGGER.exception(u"hook %r failed on stage %s", hook, stage)
+
+
+def traced(func=None, input_arg=0, input_size=get_size):
+    """Decorator of a stage of the extraction, calling the hooks after it.
+
+    @param input_arg: (int) position of the argument taken as the input.
+    @param input_size: (callable) returns the size of the input.
+    """
+    if func is None:
+        return functools.partial(traced, input_arg=input_arg,
+                                 input_size=input_size)
+    stage = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not HOOKS:
+            return func(*args, **kwargs)
+        stage_input = args[input_arg] if len(args) > input_arg else None
+        size = input_size(stage_input)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        duration = time.perf_counter() - start
+        if result is None:
+            # The input has been modified in place
+            output_size = get_size(stage_input)
+        else:
+            output_size = get_size(result)
+        call_hooks(stage, duration, size, output_size)
+        return result
+    return wrapper
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Scanner of the identifiers of a text.
+
+The arXiv identifiers, DOIs, handles, ISBNs and report numbers of any text
+(a reference line, a publication note or a whole document body) are found
+in one pass of a single pattern, without tagging the journals or the
+authors, and returned normalised with their offsets in the text:
+
+>>> extract_identifiers(u'Phys. Lett. B 716 (2012) 1, arXiv:1207.7214')
+[{'type': 'arxiv', 'value': u'arXiv:1207.7214', 'start': 28, 'end': 43}]
+
+iter_identifiers scans many texts, e.g. the lines of a file, sharing the
+setup between them.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import bisect
+import re
+
+from six import string_types
+from six.moves.urllib.parse import unquote
+
+from .kbs import get_kbs
+from .regexs import (
+    RE_ARXIV_CATCHUP,
+    RE_ATLAS_CONF_POST_2010,
+    RE_ATLAS_CONF_PRE_2010,
+    RE_OLD_ARXIV,
+    RE_OLD_ARXIV_ANY,
+    combine_patterns,
+    re_arxiv,
+    re_arxiv_5digits,
+    re_doi,
+    re_hdl,
+    re_isbn,
+    re_new_arxiv,
+    re_new_arxiv_5digits,
+    re_punctuation,
+)
+from .tag import identify_report_numbers
+from ..documents.text import remove_and_record_multiple_spaces_in_line
+
+# Characters stripped from the end of the identifiers of each kind, besides
+# the spaces
+TRAILING_CHARACTERS = {'handle': u'.,;'}
+
+# Kinds of identifiers. The report numbers are the ones of the ATLAS
+# conference notes and the ones of the knowledge base, the latter being by
+# far the slowest kind to look for.
+IDENTIFIER_KINDS = ('arxiv', 'doi', 'handle', 'isbn', 'report_number')
+
+
+def format_arxiv(match):
+    return u'arXiv:%s%s.%s' % (match.group('year'), match.group('month'),
+                               match.group('num'))
+
+
+def format_arxiv_catchup(match):
+    return u'%s/%s%s%s' % (match.group('suffix').lower(), match.group('year'),
+                           match.group('month'), match.group('num'))
+
+
+def format_old_arxiv(match):
+    # The first pattern matching gives the standard category, as in
+    # tag_arxiv_more
+    for report_re, report_number in RE_OLD_ARXIV:
+        report_match = report_re.match(match.string, match.start())
+        if report_match:
+            return report_match.expand(report_number + r'/\g<num>')
+    return u'%s/%s' % (match.group('name'), match.group('num'))
+
+
+def format_doi(match):
+    doi = match.group('doi')
+    if '%2f' in doi.lower():
+        doi = unquote(doi)
+    return doi
+
+
+def format_handle(match):
+    return match.group('hdl_id').rstrip(TRAILING_CHARACTERS['handle'])
+
+
+def format_isbn(match):
+    code = re.sub(u'[-–\\s]', u'', match.group('code'))
+    return code.upper()
+
+
+def make_format_atlas_conf(prefix):
+    def format_atlas_conf(match):
+        return prefix + match.group('code')
+    return format_atlas_conf
+
+
+def get_identifier_patterns():
+    """Return the list of (kind, pattern, formatter) of the identifiers, in
+    the order they are tried at a given position of the text."""
+    return [
+        ('doi', re_doi, format_doi),
+        ('handle', re_hdl, format_handle),
+        ('arxiv', re_arxiv_5digits, format_arxiv),
+        ('arxiv', re_arxiv, format_arxiv),
+        ('arxiv', re_new_arxiv_5digits, format_arxiv),
+        ('arxiv', re_new_arxiv, format_arxiv),
+        ('arxiv', RE_ARXIV_CATCHUP, format_arxiv_catchup),
+        ('arxiv', RE_OLD_ARXIV_ANY, format_old_arxiv),
+        ('report_number', RE_ATLAS_CONF_PRE_2010,
+         make_format_atlas_conf(u'ATL-CONF-')),
+        ('report_number', RE_ATLAS_CONF_POST_2010,
+         make_format_atlas_conf(u'ATLAS-CONF-')),
+        ('isbn', re_isbn, format_isbn),
+    ]
+
+
+def get_scanner(kinds, cache={}):
+    """Return the (pattern, alternatives) scanning the text for the kinds of
+    identifiers, alternatives being the list of (kind, pattern, formatter)
+    of the groups of the pattern, named g0, g1...
+
+    The pattern is the alternation of the patterns of the identifiers, so
+    that the text is scanned once and the identifiers found do not overlap.
+    """
+    try:
+        return cache[kinds]
+    except KeyError:
+        pass
+    alternatives = [alternative for alternative in get_identifier_patterns()
+                    if alternative[0] in kinds]
+    scanner = None
+    if alternatives:
+        scanner = combine_patterns([pattern for dummy, pattern, dummy
+                                    in alternatives])
+    cache[kinds] = scanner, alternatives
+    return cache[kinds]
+
+
+def check_kinds(kinds):
+    if kinds is None:
+        return IDENTIFIER_KINDS
+    kinds = tuple(sorted(set(kinds)))
+    unknown = set(kinds) - set(IDENTIFIER_KINDS)
+    if unknown:
+        raise ValueError('Unknown identifier kinds: %s' %
+                         ', '.join(sorted(unknown)))
+    return kinds
+
+
+def upper_same_length(text):
+    """Upper-case the text, keeping the characters which would change its
+    length (e.g. the German sharp s)."""
+    upper = text.upper()
+    if len(upper) == len(text):
+        return upper
+    return u''.join(char if len(char.upper()) != 1 else char.upper()
+                    for char in text)
+
+
+def scan_report_numbers(text, found, kb_reports):
+    """Return the identifiers of the report numbers of the knowledge base in
+    the text, outside of the ``found`` identifiers.
+
+    The report numbers are looked for as in tag_reference_line, in the text
+    upper-cased, without punctuation and multiple spaces, their offsets
+    being mapped back to the text.
+    """
+    for identifier in found:
+        text = u''.join((text[:identifier['start']],
+                         u'_' * (identifier['end'] - identifier['start']),
+                         text[identifier['end']:]))
+    line = re_punctuation.sub(u' ', upper_same_length(text))
+    removed_spaces, line = remove_and_record_multiple_spaces_in_line(line)
+    matches_len, matches_repl, dummy = identify_report_numbers(line,
+                                                               kb_reports)
+    if not matches_len:
+        return []
+
+    # Offsets of the line in the text: the characters after the i-th
+    # multiple space of the text are shifted by shifts[i]
+    starts = []
+    shifts = []
+    shift = 0
+    for start in sorted(removed_spaces):
+        shift += removed_spaces[start]
+        starts.append(start - shift + removed_spaces[start])
+        shifts.append(shift)
+
+    def text_offset(offset):
+        index = bisect.bisect_left(starts, offset)
+        return offset + (shifts[index - 1] if index else 0)
+
+    return [{'type': 'report_number',
+             'value': matches_repl[start],
+             'start': text_offset(start),
+             'end': text_offset(start + matches_len[start] - 1) + 1}
+            for start in sorted(matches_len)]
+
+
+def scan_identifiers(text, kinds=IDENTIFIER_KINDS, kbs=None):
+    """Return the identifiers of a text, sorted by offset.
+
+    @param text: (string) the text to scan.
+    @param kinds: (tuple) sorted kinds of identifiers to look for.
+    @param kbs: (dict) the knowledge bases, needed for the report numbers.
+    @return: (list) of dictionaries with the ``type`` and normalised
+        ``value`` of each identifier, and its ``start`` and ``end`` offsets
+        in the text.
+    """
+    scanner, alternatives = get_scanner(kinds)
+    identifiers = []
+    if scanner is not None:
+        for match in scanner.finditer(text):
+            kind, pattern, formatter = alternatives[int(match.lastgroup[1:])]
+            # The pattern of the identifier gives its groups
+            match = pattern.match(text, match.start())
+            matched = match.group().rstrip()
+            trailing = TRAILING_CHARACTERS.get(kind)
+            if trailing:
+                matched = matched.rstrip(trailing)
+            identifiers.append({'type': kind,
+                                'value': formatter(match),
+                                'start': match.start(),
+                                'end': match.start() + len(matched)})
+    if 'report_number' in kinds and kbs is not None:
+        report_numbers = scan_report_numbers(text, identifiers,
+                                             kbs['report-numbers'])
+        if report_numbers:
+            identifiers.extend(report_numbers)
+            identifiers.sort(key=lambda identifier: identifier['start'])
+    return identifiers
+
+
+def extract_identifiers(text, kinds=None, override_kbs_files=None):
+    """Extract the identifiers of a text.
+
+    @param text: (string) the text, or (list) the lines of a document body.
+    @param kinds: (iterable) kinds of identifiers to look for, among
+        IDENTIFIER_KINDS (all by default). Leaving out 'report_number'
+        makes the scan much faster.
+    @param override_kbs_files: (dict) the knowledge bases to use instead of
+        the default ones.
+    @return: (list) of dictionaries with the ``type`` and normalised
+        ``value`` of each identifier, and its ``start`` and ``end`` offsets
+        in the text (in the lines joined together for a document body).
+    """
+    return next(iter_identifiers([text], kinds, override_kbs_files))
+
+
+def iter_identifiers(texts, kinds=None, override_kbs_files=None):
+    """Extract the identifiers of many texts, one text at a time.
+
+    The patterns and the knowledge bases are set up once for all the
+    ``texts``, which can be any iterable, e.g. a file:
+
+    >>> with open('pubnotes.txt') as f:
+    ...     for identifiers in iter_identifiers(f, kinds=['arxiv', 'doi']):
+    ...         print([identifier['value'] for identifier in identifiers])
+
+    It yields the list of the identifiers of each text (see
+    extract_identifiers).
+    """
+    kinds = check_kinds(kinds)
+    kbs = None
+    if 'report_number' in kinds:
+        kbs = get_kbs(custom_kbs_files=override_kbs_files)
+    for text in texts:
+        if not isinstance(text, string_types):
+            text = u''.join(text)
+        yield scan_identifiers(text, kinds, kbs)
@@ -37,6 +37,7 @@ from hashlib import md5
 from six import iteritems
 
 from .config import CFG_REFEXTRACT_KBS
+from .metrics import KBS_CACHE
 from .regexs import (
     re_kb_line,
     re_regexp_character_class,
@@ -71,6 +72,7 @@ def get_kbs(custom_kbs_files=None, cache={}):  # noqa
     """
 
     cache_key = make_cache_key(custom_kbs_files)
+    KBS_CACHE.inc(result='hit' if cache_key in cache else 'miss')
     if cache_key not in cache:
         # Build paths from defaults and specified ones
         kbs_files = CFG_REFEXTRACT_KBS.copy()
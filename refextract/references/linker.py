@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Cache of the results of the linker callbacks.
+
+A LinkerCache memoises the recids returned by a linker for the citation
+elements, so that the same journal, DOI or report number found in several
+references (or documents) is only looked up once:
+
+>>> cache = LinkerCache(my_linker, maxsize=100000, ttl=3600)
+>>> for path in paths:
+...     extract_references_from_file(path, linker_callback=cache.link)
+>>> cache.stats()
+{'hits': 2041, 'misses': 613, 'hit_rate': 0.769..., 'size': 613}
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import re
+import threading
+import time
+
+from collections import OrderedDict
+
+from .config import CFG_REFEXTRACT_LINKABLE_ELEMENTS
+from .metrics import LINKER_CACHE
+
+re_doi_prefix = re.compile(r'^(doi:|https?://(dx\.)?doi\.org/)', re.I)
+re_non_alphanumeric = re.compile(r'[\W_]+', re.U)
+
+
+def normalize_identity_part(value):
+    """Normalise a part of the identity of an element, ignoring case,
+    spaces and punctuation."""
+    return re_non_alphanumeric.sub(u'', value or u'').upper()
+
+
+def element_cache_key(element):
+    """Return the key identifying an element in the cache.
+
+    @param element: (dict) a citation element
+    @return: (tuple) the normalised identity of the element, or None if
+        the element cannot be cached (it is not linkable).
+    """
+    element_type = element['type']
+    if element_type not in CFG_REFEXTRACT_LINKABLE_ELEMENTS:
+        return None
+    if element_type == 'JOURNAL':
+        return (element_type,
+                normalize_identity_part(element.get('title')),
+                normalize_identity_part(element.get('volume')),
+                normalize_identity_part(element.get('page')))
+    if element_type == 'DOI':
+        doi = re_doi_prefix.sub(u'', element.get('doi_string') or u'')
+        return (element_type, doi.strip().lower())
+    if element_type == 'REPORTNUMBER':
+        return (element_type,
+                normalize_identity_part(element.get('report_num')))
+    # BOOK
+    return (element_type,
+            normalize_identity_part(element.get('title')),
+            normalize_identity_part(element.get('year')))
+
+
+class LinkerCache(object):
+    """LRU cache of the recids of citation elements, with expiration.
+
+    @param linker_callback: (callable) the per-element linker.
+    @param bulk_linker_callback: (callable) the bulk linker.
+    @param maxsize: (int) maximum number of cached elements, the least
+        recently used ones being evicted first, or None for no limit.
+    @param ttl: (float) number of seconds a recid is kept, or None.
+    @param negative_ttl: (float) number of seconds an element which could not
+        be linked is kept. Defaults to ttl; 0 disables negative caching.
+    @param timer: (callable) returns the current time in seconds.
+    """
+
+    def __init__(self, linker_callback=None, bulk_linker_callback=None,
+                 maxsize=10000, ttl=None, negative_ttl=None,
+                 timer=time.time):
+        self.linker_callback = linker_callback
+        self.bulk_linker_callback = bulk_linker_callback
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, key):
+        """Return a tuple (found, recid) for the key, updating the stats."""
+        with self._lock:
+            try:
+                recid, expires = self._cache.pop(key)
+            except KeyError:
+                self.misses += 1
+                LINKER_CACHE.inc(result='miss')
+                return False, None
+            if expires is not None and self.timer() >= expires:
+                self.misses += 1
+                LINKER_CACHE.inc(result='miss')
+                return False, None
+            # Reinsert the element as the most recently used
+            self._cache[key] = (recid, expires)
+            self.hits += 1
+            LINKER_CACHE.inc(result='hit')
+            return True, recid
+
+    def set(self, key, recid):
+        """Cache the recid of the key."""
+        ttl = self.ttl if recid else self.negative_ttl
+        if ttl == 0:
+            return
+        expires = None if ttl is None else self.timer() + ttl
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = (recid, expires)
+            if self.maxsize is not None:
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+
+    def link(self, element):
+        """Per-element linker callback going through the cache."""
+        key = element_cache_key(element)
+        if key is None:
+            return self.linker_callback(element)
+        found, recid = self.get(key)
+        if not found:
+            recid = self.linker_callback(element)
+            self.set(key, recid)
+        return recid
+
+    def bulk_link(self, elements):
+        """Bulk linker callback going through the cache.
+
+        The bulk linker is only called with the elements which are not
+        cached, each distinct element being given once.
+        """
+        recids = [None] * len(elements)
+        missing = OrderedDict()
+        for index, element in enumerate(elements):
+            key = element_cache_key(element)
+            if key is None:
+                # Not cacheable: always given to the bulk linker
+                missing[(None, index)] = [index]
+                continue
+            found, recid = self.get(key)
+            if found:
+                recids[index] = recid
+            else:
+                missing.setdefault(key, []).append(index)
+
+        if missing:
+            missing_elements = [elements[indexes[0]]
+                                for indexes in missing.values()]
+            missing_recids = self.bulk_linker_callback(missing_elements)
+            for (key, indexes), recid in zip(missing.items(), missing_recids):
+                if key[0] is not None:
+                    self.set(key, recid)
+                for index in indexes:
+                    recids[index] = recid
+
+        return recids
+
+    def clear(self):
+        """Empty the cache and reset the stats."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hits, misses and hit rate of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._cache),
+        }
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Process-wide metrics of the extraction.
+
+The counters of the documents, reference lines and citations found (see
+engine.build_stats), of the fallbacks to the ``-layout`` mode of pdftotext
+and of the knowledge base and linker caches are kept in REGISTRY. The
+latency histograms of the stages of the extraction are recorded once
+enable_stage_metrics has been called, through a hook (see hooks).
+
+render_prometheus returns the registry in the Prometheus text format, e.g.
+to be served by a long-running worker:
+
+>>> enable_stage_metrics()
+>>> print(render_prometheus())
+# HELP refextract_documents_total Documents whose references were parsed.
+# TYPE refextract_documents_total counter
+refextract_documents_total 12
+...
+
+Each process has its own registry: the worker processes of the parallel
+parsing and of the daemon are not included in the one of their parent.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+from collections import OrderedDict
+
+from . import hooks
+
+# Upper bounds of the buckets of the latency histograms, in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Citation counts of engine.build_stats
+CITATION_TYPES = ('reportnum', 'title', 'author', 'url', 'doi', 'misc')
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n') \
+        .replace('"', r'\"')
+
+
+def format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, escape_label_value(value))
+                             for name, value in pairs)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return '%d' % value
+    return repr(float(value))
+
+
+class Metric(object):
+    """Base class of the metrics: values keyed by their label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def label_values(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('Expected the labels %s, got %s' % (
+                ', '.join(self.labelnames), ', '.join(sorted(labels))))
+        return tuple(labels[name] for name in self.labelnames)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation),
+                 '# TYPE %s %s' % (self.name, self.kind)]
+        with self.lock:
+            items = sorted(self.values.items())
+            lines.extend(self.render_samples(items))
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic counter."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self.label_values(labels), 0)
+
+    def render_samples(self, items):
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return ['%s%s %s' % (self.name,
+                             format_labels(self.labelnames, labelvalues),
+                             format_value(value))
+                for labelvalues, value in items]
+
+
+class Histogram(Metric):
+    """Histogram of observed values, e.g. latencies."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets),
+                                                  0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self.values[key] = (counts, total + value)
+
+    def get(self, **labels):
+        """Return the (count, sum) of the observations."""
+        counts, total = self.values.get(self.label_values(labels),
+                                        ([0], 0.0))
+        return sum(counts), total
+
+    def render_samples(self, items):
+        lines = []
+        for labelvalues, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (
+                    self.name,
+                    format_labels(self.labelnames, labelvalues,
+                                  [('le', format_value(bound))]),
+                    cumulative))
+            labels = format_labels(self.labelnames, labelvalues)
+            lines.append('%s_sum%s %s' % (self.name, labels,
+                                          format_value(total)))
+            lines.append('%s_count%s %d' % (self.name, labels, cumulative))
+        return lines
+
+
+class MetricsRegistry(object):
+    """Collection of metrics, rendered together."""
+
+    def __init__(self):
+        self.metrics = OrderedDict()
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError('Duplicated metric: %s' % metric.name)
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames,
+                                       buckets))
+
+    def clear(self):
+        """Reset all the metrics."""
+        for metric in list(self.metrics.values()):
+            metric.clear()
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+DOCUMENTS = REGISTRY.counter(
+    'refextract_documents_total',
+    'Documents whose references were parsed.')
+REFERENCE_LINES = REGISTRY.counter(
+    'refextract_reference_lines_total',
+    'Reference lines parsed.')
+DEGRADED_LINES = REGISTRY.counter(
+    'refextract_degraded_lines_total',
+    'Reference lines over budget, parsed in a degraded mode.')
+CITATIONS = REGISTRY.counter(
+    'refextract_citations_total',
+    'Citation elements found, by type.', ['type'])
+REFERENCE_SECTION_SEARCHES = REGISTRY.counter(
+    'refextract_reference_section_searches_total',
+    'Documents whose reference section was searched.')
+REFERENCE_SECTION_STRATEGIES = REGISTRY.counter(
+    'refextract_reference_section_strategies_total',
+    'Reference sections found, by strategy.', ['strategy'])
+LAYOUT_FALLBACKS = REGISTRY.counter(
+    'refextract_layout_fallbacks_total',
+    'Documents converted again with the layout kept, as no reference '
+    'section was found.')
+KBS_CACHE = REGISTRY.counter(
+    'refextract_kbs_cache_requests_total',
+    'Requests of the knowledge bases, by result (hit or miss).', ['result'])
+LINKER_CACHE = REGISTRY.counter(
+    'refextract_linker_cache_requests_total',
+    'Lookups in the linker caches, by result (hit or miss).', ['result'])
+STAGE_DURATION = REGISTRY.histogram(
+    'refextract_stage_duration_seconds',
+    'Duration of the stages of the extraction.', ['stage'])
+STAGE_INPUT_SIZE = REGISTRY.counter(
+    'refextract_stage_input_size_total',
+    'Total size (lines, characters or elements) of the inputs of the '
+    'stages.', ['stage'])
+
+
+def record_document(stats, lines):
+    """Record the stats (see engine.build_stats) of a parsed document of
+    ``lines`` reference lines."""
+    DOCUMENTS.inc()
+    REFERENCE_LINES.inc(lines)
+    DEGRADED_LINES.inc(stats.get('degraded', 0))
+    for citation_type in CITATION_TYPES:
+        CITATIONS.inc(stats.get(citation_type, 0), type=citation_type)
+
+
+def observe_stage(stage, duration, input_size, output_size):
+    """Hook recording the duration of the stages."""
+    STAGE_DURATION.observe(duration, stage=stage)
+    if input_size:
+        STAGE_INPUT_SIZE.inc(input_size, stage=stage)
+
+
+def enable_stage_metrics():
+    """Record the durations of the stages, through a hook."""
+    if observe_stage not in hooks.HOOKS:
+        hooks.install_hook(observe_stage)
+
+
+def disable_stage_metrics():
+    if observe_stage in hooks.HOOKS:
+        hooks.remove_hook(observe_stage)
+
+
+def render_prometheus(registry=REGISTRY):
+    """Return the metrics of the registry in the Prometheus text format."""
+    return registry.render()
@@ -25,8 +25,6 @@ from __future__ import absolute_import, division, print_function
 
 import logging
 
-from PyPDF2 import PdfFileReader
-
 from .regexs import re_reference_in_dest
 
 
@@ -51,37 +49,52 @@ def extract_texkeys_from_pdf(pdf_file):
     @return: list of all texkeys found in the PDF
     """
     with open(pdf_file, 'rb') as pdf_stream:
-        try:
-            pdf = PdfFileReader(pdf_stream, strict=False)
-            destinations = pdf.getNamedDestinations()
-        except Exception:
-            LOGGER.debug(u"PDF: Internal PyPDF2 error, no TeXkeys returned.")
-            return []
-        # not all named destinations point to references
-        refs = [dest for dest in destinations.items()
-                if re_reference_in_dest.match(dest[0])]
-        try:
-            if _destinations_in_two_columns(pdf, refs):
-                LOGGER.debug(u"PDF: Using two-column layout")
-
-                def sortfunc(dest_couple):
-                    return _destination_position(pdf, dest_couple[1])
-
-            else:
-                LOGGER.debug(u"PDF: Using single-column layout")
-
-                def sortfunc(dest_couple):
-                    (page, _, ypos, xpos) = _destination_position(
-                        pdf, dest_couple[1])
-                    return (page, ypos, xpos)
-
-            refs.sort(key=sortfunc)
-            # extract the TeXkey from the named destination name
-            return [re_reference_in_dest.match(destname).group(1)
-                    for (destname, _) in refs]
-        except Exception:
-            LOGGER.debug(u"PDF: Impossible to determine layout, no TeXkeys returned")
-            return []
+        return extract_texkeys_from_pdf_stream(pdf_stream)
+
+
+def extract_texkeys_from_pdf_stream(pdf_stream):
+    """
+    Extract the texkeys from the given PDF stream
+
+    @param pdf_stream: seekable binary file-like object of a PDF (e.g. a
+        BytesIO)
+
+    @return: list of all texkeys found in the PDF
+    """
+    # Imported here as it is slow to import
+    from PyPDF2 import PdfFileReader
+
+    try:
+        pdf = PdfFileReader(pdf_stream, strict=False)
+        destinations = pdf.getNamedDestinations()
+    except Exception:
+        LOGGER.debug(u"PDF: Internal PyPDF2 error, no TeXkeys returned.")
+        return []
+    # not all named destinations point to references
+    refs = [dest for dest in destinations.items()
+            if re_reference_in_dest.match(dest[0])]
+    try:
+        if _destinations_in_two_columns(pdf, refs):
+            LOGGER.debug(u"PDF: Using two-column layout")
+
+            def sortfunc(dest_couple):
+                return _destination_position(pdf, dest_couple[1])
+
+        else:
+            LOGGER.debug(u"PDF: Using single-column layout")
+
+            def sortfunc(dest_couple):
+                (page, _, ypos, xpos) = _destination_position(
+                    pdf, dest_couple[1])
+                return (page, ypos, xpos)
+
+        refs.sort(key=sortfunc)
+        # extract the TeXkey from the named destination name
+        return [re_reference_in_dest.match(destname).group(1)
+                for (destname, _) in refs]
+    except Exception:
+        LOGGER.debug(u"PDF: Impossible to determine layout, no TeXkeys returned")
+        return []
 
 
 def _destinations_in_two_columns(pdf, destinations, cutoff=3):
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Profiling of the extraction of the references of one document.
+
+profile_file and profile_string run a document through the stages of the
+extraction and return where the time went: the time of each stage, the
+slowest reference lines and the costliest regular expressions (journal,
+report-number and collaboration patterns of the knowledge bases, author
+patterns and URL repair patterns):
+
+>>> profile = profile_file('slow.pdf', top=10)
+>>> print(format_profile(profile))
+
+The same report is available from the command line with
+``refextract profile slow.pdf``. The benchmark suite of the repository
+(``benchmarks/suite.py``) runs the same stages.
+
+While the patterns are timed, the author and URL repair patterns of the
+library are replaced by timed proxies: profiling is not thread safe.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from contextlib import contextmanager
+
+from .engine import (
+    finalize_citations,
+    get_plaintext_document_body,
+    split_reference_elements,
+    tag_reference_elements,
+)
+from .find import (
+    LineFeatures,
+    find_end_of_reference_section,
+    get_reference_section_beginning,
+)
+from .kbs import get_kbs
+from .record import build_references
+from .text import get_reference_lines, wash_and_repair_reference_line
+from ..authors import regexs as authors_regexs
+from ..documents import text as documents_text
+from ..documents.text import remove_page_boundary_lines
+
+STAGES = (
+    'conversion',
+    'remove_page_boundary_lines',
+    'find_section',
+    'rebuild_reference_lines',
+    'wash',
+    'tagging',
+    'element_building',
+    'build_references',
+)
+
+# Stages run for each reference line
+LINE_STAGES = ('wash', 'tagging', 'element_building')
+
+
+class TimedPattern(object):
+    """Proxy of a compiled pattern adding the time spent in its methods to
+    ``costs[name]``, a list [calls, seconds]."""
+
+    def __init__(self, name, pattern, costs):
+        self.name = name
+        self.pattern_object = pattern
+        self.costs = costs
+
+    def __getattr__(self, name):
+        return getattr(self.pattern_object, name)
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        cost = self.costs.setdefault(self.name, [0, 0.0])
+        cost[0] += 1
+        cost[1] += seconds
+        return result
+
+    def search(self, *args, **kwargs):
+        return self._timed(self.pattern_object.search, *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._timed(self.pattern_object.match, *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self._timed(self.pattern_object.findall, *args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        # The matching happens while iterating
+        return iter(self._timed(
+            lambda: list(self.pattern_object.finditer(*args, **kwargs))))
+
+    def sub(self, *args, **kwargs):
+        return self._timed(self.pattern_object.sub, *args, **kwargs)
+
+    def subn(self, *args, **kwargs):
+        return self._timed(self.pattern_object.subn, *args, **kwargs)
+
+    def split(self, *args, **kwargs):
+        return self._timed(self.pattern_object.split, *args, **kwargs)
+
+
+def time_patterns(prefix, patterns, costs):
+    """Return a copy of a dictionary of patterns, the patterns being
+    timed."""
+    return dict((key, TimedPattern(u'%s: %s' % (prefix, key
+                                                if not isinstance(key, tuple)
+                                                else key[-1]),
+                                   pattern, costs))
+                for key, pattern in patterns.items())
+
+
+def get_timed_kbs(kbs, costs):
+    """Return a copy of the knowledge bases whose patterns are timed."""
+    journals = kbs['journals']
+    report_numbers = kbs['report-numbers']
+    return dict(
+        kbs,
+        journals=(time_patterns(u'journal', journals[0], costs),) +
+        tuple(journals[1:]),
+        collaborations=time_patterns(u'collaboration',
+                                     kbs['collaborations'], costs),
+        **{'report-numbers': (time_patterns(u'report number',
+                                            report_numbers[0], costs),) +
+           tuple(report_numbers[1:])})
+
+
+@contextmanager
+def timed_library_patterns(costs):
+    """Time the author and URL repair patterns while in the context."""
+    re_auth, re_auth_near_miss = authors_regexs.get_author_regexps()
+    url_repair_patterns = documents_text.re_list_url_repair_patterns
+    authors_regexs.RE_AUTH = TimedPattern(u'author: re_auth', re_auth, costs)
+    authors_regexs.RE_AUTH_NEAR_MISS = TimedPattern(
+        u'author: re_auth_near_miss', re_auth_near_miss, costs)
+    documents_text.re_list_url_repair_patterns = [
+        TimedPattern(u'url repair: %s' % pattern.pattern, pattern, costs)
+        for pattern in url_repair_patterns]
+    try:
+        yield
+    finally:
+        authors_regexs.RE_AUTH = re_auth
+        authors_regexs.RE_AUTH_NEAR_MISS = re_auth_near_miss
+        documents_text.re_list_url_repair_patterns = url_repair_patterns
+
+
+class StageTimer(object):
+    """Accumulates the time spent in each stage."""
+
+    def __init__(self):
+        self.seconds = dict((stage, 0.0) for stage in STAGES)
+
+    def run(self, stage, func, *args, **kwargs):
+        """Run func(*args, **kwargs) as (part of) the stage, returning its
+        result and its duration."""
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        self.seconds[stage] += seconds
+        return result, seconds
+
+
+def find_section(docbody):
+    """Return the beginning and end of the reference section."""
+    features = LineFeatures(docbody)
+    start = get_reference_section_beginning(docbody, features)
+    if start is None:
+        return None, None
+    end = find_end_of_reference_section(docbody, start['start_line'],
+                                        start['marker'],
+                                        start['marker_pattern'], features)
+    return start, end
+
+
+def get_section_lines(docbody, start, end):
+    """Return the reference lines of the section found by find_section."""
+    return get_reference_lines(docbody, start['start_line'], end,
+                               start['title_string'], start['marker_pattern'],
+                               start['title_marker_same_line'])
+
+
+def build_elements(elements, kbs):
+    """Return the citations of the tagged elements of a line."""
+    splitted_citations = split_reference_elements(elements, kbs)
+    finalize_citations(splitted_citations)
+    return splitted_citations
+
+
+def profile_docbody(get_docbody, top=10, patterns=True,
+                    override_kbs_files=None,
+                    reference_format=u"{title} {volume} ({year}) {page}"):
+    """Profile the extraction of the references of a document.
+
+    @param get_docbody: (callable) returns the lines of the document, its
+        time being the one of the conversion stage.
+    @param top: (int) number of slowest lines and costliest patterns kept.
+    @param patterns: (bool) time the patterns, which slows the tagging down.
+    @return: (dict) the profile, see format_profile.
+    """
+    kbs = get_kbs(custom_kbs_files=override_kbs_files)
+    costs = {}
+    if patterns:
+        kbs = get_timed_kbs(kbs, costs)
+    timer = StageTimer()
+    lines = []
+    references = []
+
+    with timed_library_patterns(costs) if patterns else _no_context():
+        docbody, dummy = timer.run('conversion', get_docbody)
+        docbody, dummy = timer.run('remove_page_boundary_lines',
+                                   remove_page_boundary_lines, docbody)
+        (start, end), dummy = timer.run('find_section', find_section,
+                                        docbody)
+        reflines = []
+        if start is not None and end is not None:
+            reflines, dummy = timer.run('rebuild_reference_lines',
+                                        get_section_lines, docbody, start,
+                                        end)
+
+        citations = []
+        bad_titles_count = {}
+        for index, ref_line in enumerate(reflines):
+            line_stages = {}
+            clean_line, line_stages['wash'] = timer.run(
+                'wash', wash_and_repair_reference_line, ref_line)
+            (elements, line_marker, dummy, bad_titles_count), \
+                line_stages['tagging'] = timer.run(
+                    'tagging', tag_reference_elements, clean_line, kbs,
+                    bad_titles_count)
+            splitted_citations, line_stages['element_building'] = \
+                timer.run('element_building', build_elements, elements, kbs)
+            citations.append({'elements': splitted_citations,
+                              'line_marker': line_marker,
+                              'raw_ref': ref_line})
+            lines.append({
+                'index': index,
+                'line': ref_line,
+                'length': len(ref_line),
+                'seconds': sum(line_stages.values()),
+                'stages': line_stages,
+            })
+
+        references, dummy = timer.run('build_references', build_references,
+                                      citations, reference_format)
+
+    total = sum(timer.seconds.values())
+    lines.sort(key=lambda line: line['seconds'], reverse=True)
+    pattern_groups = {}
+    for name, (calls, seconds) in costs.items():
+        group = name.split(u':', 1)[0]
+        pattern_groups[group] = pattern_groups.get(group, 0.0) + seconds
+    pattern_costs = sorted(
+        ({'pattern': name, 'calls': calls, 'seconds': seconds}
+         for name, (calls, seconds) in costs.items()),
+        key=lambda cost: cost['seconds'], reverse=True)
+
+    return {
+        'lines': len(reflines),
+        'references': len(references),
+        'total_seconds': total,
+        'stages': [{'stage': stage,
+                    'seconds': timer.seconds[stage],
+                    'share': timer.seconds[stage] / total if total else 0.0}
+                   for stage in STAGES],
+        'slowest_lines': lines[:top],
+        'patterns': pattern_costs[:top],
+        'pattern_groups': pattern_groups,
+    }
+
+
+@contextmanager
+def _no_context():
+    yield
+
+
+def profile_file(path, top=10, patterns=True, override_kbs_files=None,
+                 reference_format=u"{title} {volume} ({year}) {page}"):
+    """Profile the extraction of the references of a PDF or text file.
+
+    See profile_docbody for the arguments and format_profile for the
+    result.
+    """
+    profile = profile_docbody(lambda: get_plaintext_document_body(path),
+                              top, patterns, override_kbs_files,
+                              reference_format)
+    profile['document'] = path
+    return profile
+
+
+def profile_string(source, top=10, patterns=True, override_kbs_files=None,
+                   reference_format=u"{title} {volume} ({year}) {page}"):
+    """Profile the extraction of the references of a text."""
+    profile = profile_docbody(lambda: source.splitlines(True), top,
+                              patterns, override_kbs_files,
+                              reference_format)
+    profile['document'] = None
+    return profile
+
+
+def shorten(text, width):
+    text = u' '.join(text.split())
+    return text if len(text) <= width else text[:width - 3] + u'...'
+
+
+def format_profile(profile):
+    """Return the profile as plain text."""
+    output = [u'%s: %d reference lines, %d references in %.3fs' % (
+        profile.get('document') or u'<string>', profile['lines'],
+        profile['references'], profile['total_seconds'])]
+
+    output.extend([u'', u'Stages:'])
+    for stage in profile['stages']:
+        output.append(u'  %-28s %9.4fs %5.1f%%' % (
+            stage['stage'], stage['seconds'], 100 * stage['share']))
+
+    output.extend([u'', u'Slowest reference lines:'])
+    for line in profile['slowest_lines']:
+        output.append(u'  #%-4d %9.4fs %5d chars  %s' % (
+            line['index'], line['seconds'], line['length'],
+            u' '.join(u'%s=%.4f' % (stage, line['stages'][stage])
+                      for stage in LINE_STAGES)))
+        output.append(u'        %s' % shorten(line['line'], 100))
+
+    if profile['patterns']:
+        output.extend([u'', u'Patterns:'])
+        for group, seconds in sorted(profile['pattern_groups'].items(),
+                                     key=lambda item: item[1], reverse=True):
+            output.append(u'  %9.4fs  all %s patterns' % (seconds, group))
+        output.extend([u'', u'Costliest patterns:'])
+        for cost in profile['patterns']:
+            output.append(u'  %9.4fs %7d calls  %s' % (
+                cost['seconds'], cost['calls'], shorten(cost['pattern'], 80)))
+    return u'\n'.join(output)
@@ -23,11 +23,14 @@
 
 from __future__ import absolute_import, division, print_function
 
+from .hooks import traced
+
 
 def format_marker(line_marker):
     return line_marker.strip("[](){}. ")
 
 
+@traced
 def build_references(citations, reference_format=False):
     """Build list of reference dictionaries from a references list
     """
@@ -29,6 +29,53 @@ from datetime import datetime
 from six import iteritems
 from six.moves import xrange
 
+
+class LazyPattern(object):
+    """Regular expression compiled the first time it is used.
+
+    Compiling all the patterns when refextract is imported is expensive,
+    while many programs only use a few of them. The attributes of the
+    compiled pattern (match, search, sub...) are cached on the instance, so
+    that there is no overhead once the pattern has been used.
+    """
+
+    def __init__(self, pattern, flags=0):
+        self._args = (pattern, flags)
+        LAZY_PATTERNS.append(self)
+
+    def compile(self):
+        """Compile the pattern, if not done yet, and return it."""
+        compiled = self.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = self._compiled = re.compile(*self._args)
+        return compiled
+
+    def __getattr__(self, name):
+        # Only called for the attributes not set on the instance yet
+        if name.startswith('__') or name in ('_args', '_compiled'):
+            raise AttributeError(name)
+        value = getattr(self.compile(), name)
+        setattr(self, name, value)
+        return value
+
+    def __repr__(self):
+        return 'LazyPattern(%r, %r)' % self._args
+
+
+LAZY_PATTERNS = []
+
+
+def lazy_compile(pattern, flags=0):
+    """Same as re.compile, the pattern being compiled when first used."""
+    return LazyPattern(pattern, flags)
+
+
+def compile_lazy_patterns():
+    """Compile all the lazy patterns, e.g. in a long-running process."""
+    for pattern in LAZY_PATTERNS:
+        pattern.compile()
+
+
 # Sep
 re_sep = r"\s*[,\s:-]\s*"
 # Sep or no sep
@@ -65,34 +112,34 @@ re_opts = re.VERBOSE | re.UNICODE | re.IGNORECASE
 
 
 def compute_pos_patterns(patterns):
-    return [re.compile(p, re_opts) for p in patterns]
+    return [lazy_compile(p, re_opts) for p in patterns]
 
 
 re_pos = compute_pos_patterns(re_pos_patterns)
 
 # Pattern for arxiv numbers
 # arxiv 9910-1234v9 [physics.ins-det]
-re_arxiv = re.compile(r"""
+re_arxiv = lazy_compile(r"""
     ARXIV[\s:-]*(?P<year>\d{2})-?(?P<month>\d{2})
     [\s.-]*(?P<num>\d{4})(?!\d)(?:[\s-]*V(?P<version>\d))?
     \s*(?P<suffix>\[[A-Z.-]+\])? """, re.VERBOSE | re.UNICODE | re.IGNORECASE)
 
-re_arxiv_5digits = re.compile(r"""
+re_arxiv_5digits = lazy_compile(r"""
     ARXIV[\s:-]*(?P<year>(1[3-9]|[2-8][0-9]))-?(?P<month>(0[1-9]|1[0-2]))
     [\s.-]*(?P<num>\d{5})(?!\d)(?:[\s-]*V(?P<version>\d))?
     \s*(?P<suffix>\[[A-Z.-]+\])? """, re.VERBOSE | re.UNICODE | re.IGNORECASE)
 
 # Pattern for arxiv numbers catchup
 # arxiv:9910-123 [physics.ins-det]
-RE_ARXIV_CATCHUP = re.compile(r"""
+RE_ARXIV_CATCHUP = lazy_compile(r"""
     ARXIV[\s:-]*(?P<year>\d{2})-?(?P<month>\d{2})
     [\s.-]*(?P<num>\d{3})
     \s*\[(?P<suffix>[A-Z.-]+)\]""", re.VERBOSE | re.UNICODE | re.IGNORECASE)
 
 # Patterns for ATLAS CONF report numbers
-RE_ATLAS_CONF_PRE_2010 = re.compile(
+RE_ATLAS_CONF_PRE_2010 = lazy_compile(
     r'(?<!\w:)ATL(AS)?-CONF-(?P<code>(?:200\d|99)-\d{3})(?![\w\d])')
-RE_ATLAS_CONF_POST_2010 = re.compile(
+RE_ATLAS_CONF_POST_2010 = lazy_compile(
     r'(?<!\w:)ATL(AS)?-CONF-(?P<code>20[1-9]\d-\d{3})(?![\w\d])')
 
 
@@ -218,14 +265,19 @@ old_arxiv = {
 def compute_arxiv_re(report_pattern, report_number):
     if report_number is None:
         report_number = r"\g<name>"
-    report_re = re.compile(r"(?<!<cds\.REPORTNUMBER>)(?<!\w)" +
-                           "(?P<name>" + report_pattern + ")" +
-                           old_arxiv_numbers, re.U | re.I)
+    report_re = lazy_compile(r"(?<!<cds\.REPORTNUMBER>)(?<!\w)" +
+                             "(?P<name>" + report_pattern + ")" +
+                             old_arxiv_numbers, re.U | re.I)
     return report_re, report_number
 
 
 RE_OLD_ARXIV = [compute_arxiv_re(*i) for i in iteritems(old_arxiv)]
 
+# Any old arxiv number, to find them all in one search (see RE_OLD_ARXIV
+# for their standard category)
+RE_OLD_ARXIV_ANY = lazy_compile(r"(?<!\w)(?P<name>" + "|".join(old_arxiv) +
+                                ")" + old_arxiv_numbers, re.U | re.I)
+
 
 def compute_years(start_year=1991):
     current_year = datetime.now().year
@@ -242,14 +294,14 @@ def compute_months():
 
 arxiv_months = compute_months()
 
-re_new_arxiv = re.compile(r""" # 9910.1234v9 [physics.ins-det]
+re_new_arxiv = lazy_compile(r""" # 9910.1234v9 [physics.ins-det]
     (?<!ARXIV:)(?<!\d)
     (?P<year>%(arxiv_years)s)
     (?P<month>(0[1-9]|1[0-2]))
     \.(?P<num>\d{4})(?:[\s-]*V(?P<version>\d))?(?!\d)
     \s*(?P<suffix>\[[A-Z.-]+\])? """ % {'arxiv_years': arxiv_years}, re.VERBOSE | re.UNICODE | re.IGNORECASE)
 
-re_new_arxiv_5digits = re.compile(r""" # 9910.1234v9 [physics.ins-det]
+re_new_arxiv_5digits = lazy_compile(r""" # 9910.1234v9 [physics.ins-det]
     (?<!ARXIV:)(?<!\d)
     (?P<year>%(arxiv_years)s)
     (?P<month>(0[1-9]|1[0-2]))
@@ -257,24 +309,24 @@ re_new_arxiv_5digits = re.compile(r""" # 9910.1234v9 [physics.ins-det]
     \s*(?P<suffix>\[[A-Z.-]+\])? """ % {'arxiv_years': arxiv_years_5digits}, re.VERBOSE | re.UNICODE | re.IGNORECASE)
 
 # Pattern to recognize quoted text:
-re_quoted = re.compile(r'"(?P<title>[^"]+)"', re.UNICODE)
+re_quoted = lazy_compile(r'"(?P<title>[^"]+)"', re.UNICODE)
 
 # Pattern to recognise an ISBN for a book:
-re_isbn = re.compile(r"""
+re_isbn = lazy_compile(r"""
     (?:ISBN[-– ]*(?:|10|13)|International Standard Book Number)
     [:\s]*
     (?P<code>[-\-–0-9Xx]{10,25})""", re.VERBOSE | re.UNICODE)
 
 # Pattern to recognise a correct knowledge base line:
-re_kb_line = re.compile(r'^\s*(?P<seek>[^\s].*)\s*---\s*(?P<repl>[^\s].*)\s*$',
-                        re.UNICODE)
+re_kb_line = lazy_compile(r'^\s*(?P<seek>[^\s].*)\s*---\s*(?P<repl>[^\s].*)\s*$',
+                          re.UNICODE)
 
 # Pattern to recognise references in PDF named destinations
-re_reference_in_dest = re.compile(r'^cite\.(.*)$', re.UNICODE)
+re_reference_in_dest = lazy_compile(r'^cite\.(.*)$', re.UNICODE)
 
 # precompile some often-used regexp for speed reasons:
-re_regexp_character_class = re.compile(r'\[[^\]]+\]', re.UNICODE)
-re_multiple_hyphens = re.compile(r'-{2,}', re.UNICODE)
+re_regexp_character_class = lazy_compile(r'\[[^\]]+\]', re.UNICODE)
+re_multiple_hyphens = lazy_compile(r'-{2,}', re.UNICODE)
 
 
 # In certain papers, " bf " appears just before the volume of a
@@ -288,15 +340,15 @@ re_multiple_hyphens = re.compile(r'-{2,}', re.UNICODE)
 # The pattern below is used to identify this situation and remove the
 # " bf" component:
 re_identify_bf_before_vol = \
-    re.compile(r' bf ((\w )?: \<cds\.VOL\>)',
-               re.UNICODE)
+    lazy_compile(r' bf ((\w )?: \<cds\.VOL\>)',
+                 re.UNICODE)
 
 # Patterns used for creating institutional preprint report-number
 # recognition patterns (used by function "institute_num_pattern_to_regex"):
 # Replace "hello" with hello:
-re_extract_quoted_text = (re.compile(r'\"([^"]+)\"', re.UNICODE), r'\g<1>',)
+re_extract_quoted_text = (lazy_compile(r'\"([^"]+)\"', re.UNICODE), r'\g<1>',)
 # Replace / [abcd ]/ with /( [abcd])?/ :
-re_extract_char_class = (re.compile(r' \[([^\]]+) \]', re.UNICODE),
+re_extract_char_class = (lazy_compile(r' \[([^\]]+) \]', re.UNICODE),
                          r'( [\g<1>])?')
 
 
@@ -307,13 +359,13 @@ raw_url_pattern = r"""
 """
 # Stand-alone URL (e.g. http://invenio-software.org/ )
 re_raw_url = \
-    re.compile("['\"]?(?P<url>" + raw_url_pattern + ")['\"]?",
-               re.UNICODE | re.I | re.VERBOSE)
+    lazy_compile("['\"]?(?P<url>" + raw_url_pattern + ")['\"]?",
+                 re.UNICODE | re.I | re.VERBOSE)
 
 # HTML marked-up URL (e.g. <a href="http://invenio-software.org/">
 # CERN Document Server Software Consortium</a> )
 re_html_tagged_url = \
-    re.compile(r"""
+    lazy_compile(r"""
     # Opening a tag
     <a\s+
     # href attribute
@@ -334,7 +386,7 @@ vol_tag = r'<cds\.VOL\>(?P<vol>[^<]+)<\/cds\.VOL>'
 year_tag = r'\<cds\.YR\>\((?P<yr>[^<]+)\)\<\/cds\.YR\>'
 series_tag = r'(?P<series>(?:[A-H]|I{1,3}V?|VI{0,3}))?'
 page_tag = r'\<cds\.PG\>(?P<pg>[^<]+)\<\/cds\.PG\>'
-re_recognised_numeration_for_title_plus_series = re.compile(
+re_recognised_numeration_for_title_plus_series = lazy_compile(
     r'^\s*[\.,]?\s*(?:Ser\.\s*)?' + series_tag + r'\s*:?\s*' + vol_tag +
     u'\s*(?: ' + year_tag + u')?\s*(?: ' + page_tag + u')', re.UNICODE)
 
@@ -344,7 +396,7 @@ re_recognised_numeration_for_title_plus_series = re.compile(
 # <cds.YR>(1998)</cds.YR> <cds.PG>2391</cds.PG>; : <cds.VOL>32</cds.VOL>
 # <cds.YR>(1999)</cds.YR> <cds.PG>6119</cds.PG>.
 re_numeration_no_ibid_txt = \
-    re.compile(r"""
+    lazy_compile(r"""
           ^((\s*;\s*|\s+and\s+)(?P<series>(?:[A-H]|I{1,3}V?|VI{0,3}))?\s*:?\s   ## Leading ; : or " and :", and a possible series letter
           \<cds\.VOL\>(?P<vol>\d+|(?:\d+\-\d+))\<\/cds\.VOL>\s                  ## Volume
           \<cds\.YR\>\((?P<yr>[12]\d{3})\)\<\/cds\.YR\>\s                       ## year
@@ -352,19 +404,19 @@ re_numeration_no_ibid_txt = \
           """, re.UNICODE | re.VERBOSE)
 
 re_title_followed_by_series_markup_tags = \
-    re.compile(
+    lazy_compile(
         r'(\<cds.JOURNAL(?P<ibid>ibid)?\>([^\<]+)\<\/cds.JOURNAL(?:ibid)?\>\s*.?\s*\<cds\.SER\>([A-H]|(I{1,3}V?|VI{0,3}))\<\/cds\.SER\>)', re.UNICODE)
 
 re_title_followed_by_implied_series = \
-    re.compile(
+    lazy_compile(
         r'(\<cds.JOURNAL(?P<ibid>ibid)?\>([^\<]+)\<\/cds.JOURNAL(?:ibid)?\>\s*.?\s*([A-H]|(I{1,3}V?|VI{0,3}))\s+:)', re.UNICODE)
 
 
-re_punctuation = re.compile(r'[\.\,\;\'\(\)\-]', re.UNICODE)
+re_punctuation = lazy_compile(r'[\.\,\;\'\(\)\-]', re.UNICODE)
 
 # The following pattern is used to recognise "citation items" that have been
 # identified in the line, when building a MARC XML representation of the line:
-re_tagged_citation = re.compile(r"""
+re_tagged_citation = lazy_compile(r"""
           \<cds\.                ## open tag: <cds.
           ((?:JOURNAL(?P<ibid>ibid)?)  ## a JOURNAL tag
           |VOL                   ## or a VOL tag
@@ -387,28 +439,28 @@ re_tagged_citation = re.compile(r"""
 # is there pre-recognised numeration-tagging within a
 # few characters of the start if this part of the line?
 re_tagged_numeration_near_line_start = \
-    re.compile(r'^.{0,4}?<CDS (VOL|SER)>', re.UNICODE)
+    lazy_compile(r'^.{0,4}?<CDS (VOL|SER)>', re.UNICODE)
 
-re_ibid = re.compile(r'(-|\b)?IBID(EM)?\.?', re.UNICODE)
+re_ibid = lazy_compile(r'(-|\b)?IBID(EM)?\.?', re.UNICODE)
 
-re_series_from_numeration = re.compile(
+re_series_from_numeration = lazy_compile(
     r'^([A-Za-z])\s*[,\s:-]?\s*\d+', re.UNICODE)
-re_series_from_numeration_after_volume = re.compile(
+re_series_from_numeration_after_volume = lazy_compile(
     r'^\d+\s*[,\s:-]?\s*([A-Z])', re.UNICODE)
 
 # Obtain the series character from the standardised title text
 # Only used when no series letter is obtained from numeration matching
-re_series_from_title = re.compile(r"""
+re_series_from_title = lazy_compile(r"""
     ([^\s].*)
     (?:[\s\.]+(?:(?P<open_bracket>\()\s*[Ss][Ee][Rr]\.)?
             ([A-H]|(I{1,3}V?|VI{0,3}))
     )?
     (?(open_bracket)\s*\))$   ## Only match the ending bracket if the opening bracket was found""",
-                                  re.UNICODE | re.VERBOSE)
+                                    re.UNICODE | re.VERBOSE)
 
 
 re_wash_volume_tag = (
-    re.compile(r'<cds\.VOL>(\w) (\d+)</cds\.VOL>'),
+    lazy_compile(r'<cds\.VOL>(\w) (\d+)</cds\.VOL>'),
     r'<cds.VOL>\g<1>\g<2></cds.VOL>',
 )
 
@@ -490,7 +542,7 @@ re_sep_or_after_parentesis = u'(?:' + \
 # numeration with the aid of the recognised titles. The following 2 patterns
 # are used for this:
 
-re_correct_numeration_2nd_try_ptn1 = re.compile(
+re_correct_numeration_2nd_try_ptn1 = lazy_compile(
     re_year + re_sep +         # Year
     re_title_tag +             # Recognised, tagged title
     u'(?P<aftertitle>' +
@@ -499,7 +551,7 @@ re_correct_numeration_2nd_try_ptn1 = re.compile(
     re_page +                  # The page
     u')', re.UNICODE | re.VERBOSE)
 
-re_correct_numeration_2nd_try_ptn2 = re.compile(
+re_correct_numeration_2nd_try_ptn2 = lazy_compile(
     re_year + re_sep +
     re_title_tag +
     u'(?P<aftertitle>' +
@@ -509,7 +561,7 @@ re_correct_numeration_2nd_try_ptn2 = re.compile(
     re_page +
     u')', re.UNICODE | re.VERBOSE)
 
-re_correct_numeration_2nd_try_ptn3 = re.compile(
+re_correct_numeration_2nd_try_ptn3 = lazy_compile(
     re_title_tag +
     u'(?P<aftertitle>' +
     re_sep +                   # Recognised, tagged title
@@ -518,7 +570,7 @@ re_correct_numeration_2nd_try_ptn3 = re.compile(
     u')', re.UNICODE | re.VERBOSE)
 
 
-re_correct_numeration_2nd_try_ptn4 = re.compile(
+re_correct_numeration_2nd_try_ptn4 = lazy_compile(
     re_title_tag +
     u'(?P<aftertitle>' +
     re_sep +                       # Recognised, tagged title
@@ -533,7 +585,7 @@ re_correct_numeration_2nd_try_ptn4 = re.compile(
 
 # Delete the colon and expressions such as Serie, vol, V. inside the pattern
 # <serie : volume> E.g. Replace the string """Series A, Vol 4""" with """A 4"""
-re_strip_series_and_volume_labels = (re.compile(
+re_strip_series_and_volume_labels = (lazy_compile(
     r'(Serie\s|\bS\.?\s)?([A-H])\s?[:,]\s?(\b[Vv]o?l?\.?|\b[Nn]o\.?)?\s?(\d+)', re.UNICODE),
     r'\g<2> \g<4>')
 
@@ -551,14 +603,14 @@ re_nucphysb_subtitle_opt = \
 # Pattern 1: <vol, page, year>
 
 # <v, p, y>
-re_numeration_vol_page_yr = re.compile(
+re_numeration_vol_page_yr = lazy_compile(
     re_start +
     re_volume + re_volume_sub_number_opt + re_sep +
     re_page + re_sep_or_parentesis +
     re_year, re.UNICODE | re.VERBOSE)
 
 # <v, [FS], p, y>
-re_numeration_vol_nucphys_page_yr = re.compile(
+re_numeration_vol_nucphys_page_yr = lazy_compile(
     re_start +
     re_volume + re_volume_sub_number_opt + re_sep +
     re_nucphysb_subtitle + re_sep +
@@ -566,7 +618,7 @@ re_numeration_vol_nucphys_page_yr = re.compile(
     re_year, re.UNICODE | re.VERBOSE)
 
 # <[FS], v, p, y>
-re_numeration_nucphys_vol_page_yr = re.compile(
+re_numeration_nucphys_vol_page_yr = lazy_compile(
     re_start +
     re_nucphysb_subtitle + re_sep +
     re_volume + re_sep +
@@ -576,14 +628,14 @@ re_numeration_nucphys_vol_page_yr = re.compile(
 # Pattern 2: <vol, year, page>
 
 # <v, y, p>
-re_numeration_vol_yr_page = re.compile(
+re_numeration_vol_yr_page = lazy_compile(
     re_start +
     re_volume + re_sep_or_parentesis +
     re_year + re_sep_or_after_parentesis +
     re_page, re.UNICODE | re.VERBOSE)
 
 # <v, sv, [FS]?, y, p>
-re_numeration_vol_subvol_nucphys_yr_page = re.compile(
+re_numeration_vol_subvol_nucphys_yr_page = lazy_compile(
     re_start +
     re_volume + re_volume_sub_number_opt +
     re_nucphysb_subtitle_opt + re_sep_or_parentesis +
@@ -591,7 +643,7 @@ re_numeration_vol_subvol_nucphys_yr_page = re.compile(
     re_page, re.UNICODE | re.VERBOSE)
 
 # <v, [FS]?, y, sv, p>
-re_numeration_vol_nucphys_yr_subvol_page = re.compile(
+re_numeration_vol_nucphys_yr_subvol_page = lazy_compile(
     re_start +
     re_volume + re_nucphysb_subtitle_opt +
     re_sep_or_parentesis +
@@ -599,7 +651,7 @@ re_numeration_vol_nucphys_yr_subvol_page = re.compile(
     re_page, re.UNICODE | re.VERBOSE)
 
 # <[FS]?, v, y, p>
-re_numeration_nucphys_vol_yr_page = re.compile(
+re_numeration_nucphys_vol_yr_page = lazy_compile(
     re_start +
     re_nucphysb_subtitle + re_sep +
     # The volume (optional "vol"/"no")
@@ -610,7 +662,7 @@ re_numeration_nucphys_vol_yr_page = re.compile(
 # Pattern 3: <vol, serie, year, page>
 
 # <v, s, [FS]?, y, p>
-# re_numeration_vol_series_nucphys_yr_page = (re.compile(
+# re_numeration_vol_series_nucphys_yr_page = (lazy_compile(
 #   re_volume + re_sep +
 #   re_series + re_sep +
 #   _sre_non_compiled_pattern_nucphysb_subtitle + re_sep_or_parentesis +
@@ -621,7 +673,7 @@ re_numeration_nucphys_vol_yr_page = re.compile(
 #                                       r'<cds.PG>\g<page></cds.PG> ')
 
 # <v, [FS]?, s, y, p
-re_numeration_vol_nucphys_series_yr_page = re.compile(
+re_numeration_vol_nucphys_series_yr_page = lazy_compile(
     re_start +
     re_volume + re_nucphysb_subtitle_opt + re_sep +
     re_series + re_sep_or_parentesis +
@@ -630,7 +682,7 @@ re_numeration_vol_nucphys_series_yr_page = re.compile(
 
 # Pattern 4: <vol, serie, page, year>
 # <v, s, [FS]?, p, y>
-re_numeration_vol_series_nucphys_page_yr = re.compile(
+re_numeration_vol_series_nucphys_page_yr = lazy_compile(
     re_start +
     re_volume + re_sep +
     re_series + re_nucphysb_subtitle_opt + re_sep +
@@ -638,7 +690,7 @@ re_numeration_vol_series_nucphys_page_yr = re.compile(
     re_year, re.UNICODE | re.VERBOSE)
 
 # <v, [FS]?, s, p, y>
-re_numeration_vol_nucphys_series_page_yr = re.compile(
+re_numeration_vol_nucphys_series_page_yr = lazy_compile(
     re_start +
     re_volume + re_nucphysb_subtitle_opt + re_sep +
     re_series + re_sep +
@@ -646,7 +698,7 @@ re_numeration_vol_nucphys_series_page_yr = re.compile(
     re_year, re.UNICODE | re.VERBOSE)
 
 # Pattern 5: <year, vol, page>
-re_numeration_yr_vol_page = re.compile(
+re_numeration_yr_vol_page = lazy_compile(
     re_start +
     re_year + re_sep_or_after_parentesis +
     re_volume + re_sep +
@@ -655,7 +707,7 @@ re_numeration_yr_vol_page = re.compile(
 
 # Pattern used to locate references of a doi inside a citation
 # This pattern matches both url (http) and 'doi:' or 'DOI' formats
-re_doi = (re.compile(r"""
+re_doi = (lazy_compile(r"""
     ((\(?[Dd][Oo][Ii](\s)*\)?:?(\s)*)       # 'doi:' or 'doi' or '(doi)' (upper or lower case)
     |(https?://(dx\.)?doi\.org\/))?         # or 'http://(dx.)doi.org/'  (neither has to be present)
     (?P<doi>10\.                            # 10.                        (mandatory for DOI's)
@@ -666,10 +718,18 @@ re_doi = (re.compile(r"""
     """, re.VERBOSE + re.IGNORECASE))
 
 # Pattern used to locate HDL (handle identifiers)
-re_hdl = re.compile(r"""([hH][dD][lL]:
+re_hdl = lazy_compile(r"""([hH][dD][lL]:
                           |https?://hdl\.handle\.net/)
                          (?P<hdl_id>\S+/\S+)""", re.UNICODE | re.VERBOSE)
 
+# Patterns used by the transforms of the citation elements
+re_roman_volume = lazy_compile(re_roman_numbers + u'$', re.UNICODE)
+re_short_volume = lazy_compile(r'\d{1,2}$')
+re_year_as_page = lazy_compile(r'(19|20)\d{2}$')
+re_report_number_without_dash = lazy_compile(
+    r'^(?P<name>[A-Z-]+)(?P<nums>[\d-]+)$', re.UNICODE)
+re_volume_number_then_letter = lazy_compile(r"(\d+)([A-Z])", re.U | re.I)
+
 
 def _create_regex_pattern_add_optional_spaces_to_word_characters(word):
     """Add the regex special characters (\s*) to allow optional spaces between
@@ -687,13 +747,9 @@ def _create_regex_pattern_add_optional_spaces_to_word_characters(word):
     return new_word
 
 
-def get_reference_section_title_patterns():
-    """Return a list of compiled regex patterns used to search for the title of
-       a reference section in a full-text document.
-       @return: (list) of compiled regex patterns.
-    """
-    patterns = []
-    titles = [u'references',
+reference_section_titles = [
+    _create_regex_pattern_add_optional_spaces_to_word_characters(t)
+    for t in [u'references',
               u'r\u00C9f\u00E9rences',
               u'r\u00C9f\u00C9rences',
               u'r\xb4ef\xb4erences',
@@ -707,25 +763,38 @@ def get_reference_section_title_patterns():
               u'r\u00C9fs',
               u'reference',
               u'r\u00E9f\u00E9rence',
-              u'r\u00C9f\u00C9rence']
-    sect_marker = u'^\s*([\[\-\{\(])?\s*' \
-                  u'((\w|\d){1,5}([\.\-\,](\w|\d){1,5})?\s*' \
-                  u'[\.\-\}\)\]]\s*)?' \
-                  u'(?P<title>'
-    sect_marker1 = u'^(\d){1,3}\s*(?P<title>'
-    line_end = r'(\s*s\s*e\s*c\s*t\s*i\s*o\s*n\s*)?)\.?([\)\}\]])?' \
-        r'($|\s*[\[\{\(\<]\s*[1a-z]\s*[\}\)\>\]]|\:$)'
-
-    for t in titles:
-        t_ptn = re.compile(sect_marker +
-                           _create_regex_pattern_add_optional_spaces_to_word_characters(t) +
-                           line_end, re.I | re.UNICODE)
-        patterns.append(t_ptn)
-        # allow e.g.  'N References' to be found where N is an integer
-        t_ptn = re.compile(sect_marker1 +
-                           _create_regex_pattern_add_optional_spaces_to_word_characters(t) +
-                           line_end, re.I | re.UNICODE)
-        patterns.append(t_ptn)
+              u'r\u00C9f\u00C9rence']]
+reference_section_title_markers = [
+    u'^\s*([\[\-\{\(])?\s*'
+    u'((\w|\d){1,5}([\.\-\,](\w|\d){1,5})?\s*'
+    u'[\.\-\}\)\]]\s*)?',
+    # allow e.g.  'N References' to be found where N is an integer
+    u'^(\d){1,3}\s*',
+]
+reference_section_title_end = \
+    r'(\s*s\s*e\s*c\s*t\s*i\s*o\s*n\s*)?)\.?([\)\}\]])?' \
+    r'($|\s*[\[\{\(\<]\s*[1a-z]\s*[\}\)\>\]]|\:$)'
+
+# Matches the lines matched by one of the reference section title patterns,
+# trying the title markers once for all the titles
+re_reference_section_title = lazy_compile(
+    u'(?:' + u'|'.join(reference_section_title_markers) + u')' +
+    u'(?P<title>(?:' + u'|'.join(reference_section_titles) + u')' +
+    reference_section_title_end, re.I | re.UNICODE)
+
+
+def get_reference_section_title_patterns():
+    """Return a list of compiled regex patterns used to search for the title of
+       a reference section in a full-text document.
+       @return: (list) of compiled regex patterns.
+    """
+    patterns = []
+    for t in reference_section_titles:
+        for sect_marker in reference_section_title_markers:
+            t_ptn = re.compile(sect_marker + u'(?P<title>' + t +
+                               reference_section_title_end,
+                               re.I | re.UNICODE)
+            patterns.append(t_ptn)
 
     return patterns
 
@@ -780,7 +849,7 @@ def get_reference_line_marker_pattern(pattern):
        The line is considered to start with : 1 or 2 etc (just a number)
        @return: (list) of compiled regex patterns.
     """
-    return re.compile(u'(?P<mark>' + pattern + u')', re.I | re.UNICODE)
+    return lazy_compile(u'(?P<mark>' + pattern + u')', re.I | re.UNICODE)
 
 
 re_reference_line_bracket_markers = get_reference_line_marker_pattern(
@@ -797,49 +866,47 @@ re_reference_line_number_markers = get_reference_line_marker_pattern(
 )
 
 
-def get_post_reference_section_title_patterns():
-    """Return a list of compiled regex patterns used to search for the title
-       of the section after the reference section in a full-text document.
-       @return: (list) of compiled regex patterns.
+post_reference_section_title_head = \
+    r'^\s*([\{\(\<\[]?\s*(\w|\d)\s*[\)\}\>\.\-\]]?\s*)?'
+post_reference_section_title_tail = r'(\s*\:\s*)?'
+# Section titles
+post_reference_section_titles = [
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'appendix'),
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'appendices'),
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'acknowledgement') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'acknowledgment') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'table') + r'\w?s?\d?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'figure') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'list of figure') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'annex') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'discussion') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'remercie') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'index') + r's?',
+    _create_regex_pattern_add_optional_spaces_to_word_characters(
+        u'summary') + r's?',
+]
+
+
+def get_other_post_reference_section_title_patterns():
+    """Return the regex patterns (strings) of the titles of the section
+       after the reference section which are not section titles: figure and
+       table numbers, conclusions...
+       @return: (list) of regex patterns.
     """
-    compiled_patterns = []
-    thead = r'^\s*([\{\(\<\[]?\s*(\w|\d)\s*[\)\}\>\.\-\]]?\s*)?'
-    ttail = r'(\s*\:\s*)?'
     numatn = r'(\d+|\w\b|i{1,3}v?|vi{0,3})[\.\,]{0,2}\b'
     roman_numbers = r'[LVIX]'
-    patterns = [
-        # Section titles
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'appendix') + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'appendices') + ttail,
-        thead + _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'acknowledgement') + r's?' + ttail,
-        thead + _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'acknowledgment') + r's?' + ttail,
-        thead + _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'table') + r'\w?s?\d?' + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'figure') + r's?' + ttail,
-        thead + _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'list of figure') + r's?' + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'annex') + r's?' + ttail,
-        thead + _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'discussion') + r's?' + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'remercie') + r's?' + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'index') + r's?' + ttail,
-        thead +
-        _create_regex_pattern_add_optional_spaces_to_word_characters(
-            u'summary') + r's?' + ttail,
+    return [
         # Figure nums
         r'^\s*' +
         _create_regex_pattern_add_optional_spaces_to_word_characters(
@@ -865,10 +932,28 @@ def get_post_reference_section_title_patterns():
         r'^\s*Appendix\s[A-Z]\s*\:\s*[a-zA-Z]+\s*',
     ]
 
-    for p in patterns:
-        compiled_patterns.append(re.compile(p, re.I | re.UNICODE))
 
-    return compiled_patterns
+# Matches the lines matched by one of the post reference section title
+# patterns, trying the head of the section titles once for all of them
+re_post_reference_section_title = lazy_compile(
+    post_reference_section_title_head +
+    u'(?:' + u'|'.join(post_reference_section_titles) + u')' +
+    post_reference_section_title_tail + u'|' +
+    u'|'.join(u'(?:%s)' % p
+              for p in get_other_post_reference_section_title_patterns()),
+    re.I | re.UNICODE)
+
+
+def get_post_reference_section_title_patterns():
+    """Return a list of compiled regex patterns used to search for the title
+       of the section after the reference section in a full-text document.
+       @return: (list) of compiled regex patterns.
+    """
+    patterns = [post_reference_section_title_head + title +
+                post_reference_section_title_tail
+                for title in post_reference_section_titles]
+    patterns.extend(get_other_post_reference_section_title_patterns())
+    return [re.compile(p, re.I | re.UNICODE) for p in patterns]
 
 
 def get_post_reference_section_keyword_patterns():
@@ -894,6 +979,40 @@ def get_post_reference_section_keyword_patterns():
     return compiled_patterns
 
 
+re_named_group = re.compile(r'\(\?P<\w+>')
+
+
+def scoped_pattern(pattern):
+    """Return the source of a compiled pattern, with its flags scoped to it
+    and without its named groups, to be part of a larger pattern."""
+    if isinstance(pattern, LazyPattern):
+        pattern = pattern.compile()
+    flags = u''.join(letter for flag, letter in ((re.IGNORECASE, u'i'),
+                                                 (re.MULTILINE, u'm'),
+                                                 (re.DOTALL, u's'),
+                                                 (re.VERBOSE, u'x'))
+                     if pattern.flags & flag)
+    source = re_named_group.sub(u'(?:', pattern.pattern)
+    if pattern.flags & re.VERBOSE:
+        # A newline ends a trailing comment of the pattern
+        source += u'\n'
+    return u'(?%s:%s)' % (flags, source)
+
+
+def combine_patterns(patterns):
+    """Combine compiled patterns in one, which matches where the first of
+    them matching does: the index of that pattern is in the name of the
+    group matched (match.lastgroup), g0, g1...
+
+    The named groups of the patterns are dropped: run the pattern of the
+    index again to get them.
+    """
+    return re.compile(u'|'.join(u'(?P<g%d>%s)' % (index,
+                                                  scoped_pattern(pattern))
+                                for index, pattern in enumerate(patterns)),
+                      re.UNICODE)
+
+
 def regex_match_list(line, patterns):
     """Given a list of COMPILED regex patters, perform the "re.match" operation
        on the line for every pattern.
@@ -914,16 +1033,16 @@ def regex_match_list(line, patterns):
 
 
 # The different forms of arXiv notation
-re_arxiv_notation = re.compile(r"""
+re_arxiv_notation = lazy_compile(r"""
     (arxiv)|(e[\-\s]?print:?\s*arxiv)
     """, re.VERBOSE)
 
 # et. al. before J. /// means J is a journal
 
-re_num = re.compile(r'(\d+)')
+re_num = lazy_compile(r'(\d+)')
 
 
-re_year_in_misc_txt = re.compile(r"(?:^|(?<!\d))(?:19|20)\d{2}(?:(?!\d)|$)")
+re_year_in_misc_txt = lazy_compile(r"(?:^|(?<!\d))(?:19|20)\d{2}(?:(?!\d)|$)")
 
 
 def remove_year(s, year=None):
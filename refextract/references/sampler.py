@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Sampler of the slowest reference lines of the process.
+
+Once enabled, the time of each phase of the parsing of every reference line
+is measured, and the ``size`` slowest lines seen by the process are kept
+with their duration, the identifier of their document (its recid, path or
+URL), their length and the time of each phase:
+
+>>> enable_slow_line_sampler(size=100, dump_signal=signal.SIGUSR1,
+...                          dump_path='/tmp/slow-lines.json')
+
+``kill -USR1 <pid>`` then writes the slowest lines to the dump path, as
+does dump_slow_lines on demand. The lines parsed in worker processes (see
+parse_references) are only sampled if the sampler is enabled in the
+workers.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import heapq
+import itertools
+import json
+import signal
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+
+# The sampler of the process, None when disabled
+SAMPLER = None
+
+_context = threading.local()
+
+
+class SlowLineSampler(object):
+    """Bounded heap of the slowest reference lines.
+
+    @param size: (int) number of lines kept.
+    """
+
+    def __init__(self, size=100):
+        self.size = size
+        self.heap = []
+        self.lines = 0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def record(self, line, timings, document=None):
+        """Record a parsed line, with the time of each of its phases."""
+        duration = sum(timings.values())
+        with self.lock:
+            self.lines += 1
+            if len(self.heap) >= self.size and duration <= self.heap[0][0]:
+                return
+            entry = {
+                'duration': duration,
+                'document': document,
+                'length': len(line),
+                'line': line,
+                'stages': dict(timings),
+                'time': time.time(),
+            }
+            item = (duration, next(self.counter), entry)
+            if len(self.heap) < self.size:
+                heapq.heappush(self.heap, item)
+            else:
+                heapq.heapreplace(self.heap, item)
+
+    def slowest(self):
+        """Return the entries of the lines kept, the slowest first."""
+        with self.lock:
+            items = sorted(self.heap, reverse=True)
+        return [entry for dummy, dummy, entry in items]
+
+    def clear(self):
+        with self.lock:
+            del self.heap[:]
+            self.lines = 0
+
+
+def enable_slow_line_sampler(size=100, dump_signal=None, dump_path=None):
+    """Start sampling the slowest lines of the process.
+
+    @param size: (int) number of lines kept.
+    @param dump_signal: (int) signal on which the lines are dumped (e.g.
+        signal.SIGUSR1); it can only be set from the main thread.
+    @param dump_path: (string) file the lines are dumped to on the signal,
+        else the standard error.
+    @return: (SlowLineSampler) the sampler.
+    """
+    global SAMPLER
+    SAMPLER = SlowLineSampler(size)
+    if dump_signal is not None:
+        def dump():
+            if dump_path:
+                with open(dump_path, 'w') as output:
+                    dump_slow_lines(output)
+            else:
+                dump_slow_lines(sys.stderr)
+
+        def dump_on_signal(signum, frame):
+            # The signal can interrupt the main thread while it holds the
+            # lock of the sampler: the lines are dumped by another thread
+            thread = threading.Thread(target=dump, name='slow-line-dump')
+            thread.daemon = True
+            thread.start()
+        signal.signal(dump_signal, dump_on_signal)
+    return SAMPLER
+
+
+def disable_slow_line_sampler():
+    global SAMPLER
+    SAMPLER = None
+
+
+def is_sampling():
+    return SAMPLER is not None
+
+
+def get_slow_lines():
+    """Return the slowest lines sampled, the slowest first."""
+    if SAMPLER is None:
+        return []
+    return SAMPLER.slowest()
+
+
+def dump_slow_lines(output):
+    """Write the slowest lines sampled to a file object, as JSON."""
+    json.dump({
+        'lines': SAMPLER.lines if SAMPLER is not None else 0,
+        'slowest': get_slow_lines(),
+    }, output, indent=2)
+    output.write('\n')
+    output.flush()
+
+
+def new_timings():
+    """Return the dictionary the phases of a line are timed in, or None
+    when the sampler is disabled."""
+    return {} if SAMPLER is not None else None
+
+
+def run_timed(timings, phase, func, *args, **kwargs):
+    """Run func(*args, **kwargs), adding its duration to timings[phase]
+    unless timings is None."""
+    if timings is None:
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + \
+            time.perf_counter() - start
+
+
+def record_line(line, timings):
+    """Record a line timed by run_timed, in the current document."""
+    sampler = SAMPLER
+    if sampler is not None and timings is not None:
+        sampler.record(line, timings, getattr(_context, 'document', None))
+
+
+@contextmanager
+def sampled_document(identifier):
+    """Attribute the lines sampled in the context to a document, unless an
+    enclosing context has already set one."""
+    if identifier is None or getattr(_context, 'document', None) is not None:
+        yield
+        return
+    _context.document = identifier
+    try:
+        yield
+    finally:
+        _context.document = None
@@ -24,10 +24,10 @@
 from __future__ import absolute_import, division, print_function
 
 import re
+import time
 
 from urllib.parse import unquote
 
-from unidecode import unidecode
 
 #python2 to python3
 from functools import cmp_to_key
@@ -43,6 +43,9 @@ from .config import \
 
 from ..documents.text import remove_and_record_multiple_spaces_in_line
 
+from .errors import BudgetExceededError
+from .hooks import traced
+
 from .regexs import \
     re_ibid, \
     re_doi, \
@@ -89,7 +92,18 @@ from ..authors.regexs import (
 from ..documents.text import wash_line
 
 
-def tag_reference_line(line, kbs, record_titles_count):
+def check_deadline(deadline):
+    """Raise BudgetExceededError if the given deadline has been reached.
+
+    @param deadline: (float) a time.time() value, or None for no deadline
+    """
+    if deadline is not None and time.time() >= deadline:
+        raise BudgetExceededError(deadline)
+
+
+@traced
+def tag_reference_line(line, kbs, record_titles_count, deadline=None,
+                       unidecode_authors=True, collaborations=True):
     # take a copy of the line as a first working line, clean it of bad
     # accents, and correct puncutation, etc:
     working_line1 = wash_line(line)
@@ -127,6 +141,7 @@ def tag_reference_line(line, kbs, record_titles_count):
     standardised_titles = kbs['journals'][1]
     standardised_titles.update(kbs['journals_re'])
     journals_matches = identifiy_journals_re(working_line1, kbs['journals_re'])
+    check_deadline(deadline)
 
     # Remove identified tags
     working_line2 = strip_tags(working_line1)
@@ -145,11 +160,13 @@ def tag_reference_line(line, kbs, record_titles_count):
     # Identify and record coordinates of institute preprint report numbers:
     found_pprint_repnum_matchlens, found_pprint_repnum_replstr, working_line2 =\
         identify_report_numbers(working_line2, kbs['report-numbers'])
+    check_deadline(deadline)
 
     # Identify and record coordinates of non-standard journal titles:
     journals_matches_more, working_line2, line_titles_count = \
         identify_journals(working_line2, kbs['journals'])
     journals_matches.update(journals_matches_more)
+    check_deadline(deadline)
 
     # Add the count of 'bad titles' found in this line to the total
     # for the reference section:
@@ -167,6 +184,7 @@ def tag_reference_line(line, kbs, record_titles_count):
         journals_matches.update(found_ibids_matchtext)
 
     publishers_matches = identify_publishers(working_line2, kbs['publishers'])
+    check_deadline(deadline)
 
     tagged_line = process_reference_line(
         working_line=working_line1,
@@ -177,11 +195,57 @@ def tag_reference_line(line, kbs, record_titles_count):
         removed_spaces=removed_spaces,
         standardised_titles=standardised_titles,
         kbs=kbs,
+        deadline=deadline,
+        unidecode_authors=unidecode_authors,
+        collaborations=collaborations,
     )
 
     return tagged_line, record_titles_count
 
 
+def tag_journal_line(line, kbs):
+    """Tag the journal titles of a line and their numeration, and the
+    authors and collaborations.
+
+    This is the journal-only version of tag_reference_line, for lines known
+    to hold a journal reference (e.g. publication notes): the report
+    numbers and publishers are not looked for. The authors and
+    collaborations are tagged so that their text is not left in the misc
+    text of the journal, as with tag_reference_line.
+    """
+    working_line1 = wash_line(line)
+    working_line1 = tag_pos_volume(working_line1)
+    working_line1 = wash_line(working_line1)
+    working_line1 = tag_pos_volume(working_line1)
+
+    standardised_titles = kbs['journals'][1]
+    standardised_titles.update(kbs['journals_re'])
+    journals_matches = identifiy_journals_re(working_line1, kbs['journals_re'])
+
+    working_line2 = strip_tags(working_line1).upper()
+    working_line2 = re_punctuation.sub(u' ', working_line2)
+    removed_spaces, working_line2 = \
+        remove_and_record_multiple_spaces_in_line(working_line2)
+
+    journals_matches_more, working_line2, dummy = \
+        identify_journals(working_line2, kbs['journals'])
+    journals_matches.update(journals_matches_more)
+    if working_line2.find(u"IBID") != -1:
+        found_ibids_matchtext, working_line2 = identify_ibids(working_line2)
+        journals_matches.update(found_ibids_matchtext)
+
+    return process_reference_line(
+        working_line=working_line1,
+        journals_matches=journals_matches,
+        pprint_repnum_len={},
+        pprint_repnum_matchtext={},
+        publishers_matches={},
+        removed_spaces=removed_spaces,
+        standardised_titles=standardised_titles,
+        kbs=kbs,
+    )
+
+
 def process_reference_line(working_line,
                            journals_matches,
                            pprint_repnum_len,
@@ -189,7 +253,11 @@ def process_reference_line(working_line,
                            publishers_matches,
                            removed_spaces,
                            standardised_titles,
-                           kbs):
+                           kbs,
+                           deadline=None,
+                           unidecode_authors=True,
+                           collaborations=True,
+                           authors=True):
     """After the phase of identifying and tagging citation instances
        in a reference line, this function is called to go through the
        line and the collected information about the recognised citations,
@@ -228,6 +296,13 @@ def process_reference_line(working_line,
         within the line at which the spaces were removed.
        @param standardised_titles: (dictionary) - The standardised journal
         titles, keyed by the non-standard version of those titles.
+       @param deadline: (float) - time.time() value after which tagging is
+        aborted with a BudgetExceededError (None for no deadline).
+       @param unidecode_authors: (boolean) - whether the authors are also
+        looked for in the line stripped of its accents.
+       @param collaborations: (boolean) - whether the collaborations are
+        tagged.
+       @param authors: (boolean) - whether the authors are tagged.
        @return: (tuple) of 5 components:
                   ( string  -> a MARC XML-ized reference line.
                     integer -> number of fields of miscellaneous text marked-up
@@ -332,11 +407,16 @@ def process_reference_line(working_line,
         # e.g. B 20 -> B20
         tagged_line = wash_volume_tag(tagged_line)
 
-    # Try to find any authors in the line
-    tagged_line = identify_and_tag_authors(tagged_line, kbs['authors'])
-    # Try to find any collaboration in the line
-    tagged_line = identify_and_tag_collaborations(tagged_line,
-                                                  kbs['collaborations'])
+    check_deadline(deadline)
+    if authors:
+        # Try to find any authors in the line
+        tagged_line = identify_and_tag_authors(tagged_line, kbs['authors'],
+                                               unidecode_authors)
+        check_deadline(deadline)
+    if collaborations:
+        # Try to find any collaboration in the line
+        tagged_line = identify_and_tag_collaborations(tagged_line,
+                                                      kbs['collaborations'])
 
     return tagged_line.replace('\n', '')
 
@@ -884,9 +964,11 @@ def identify_and_tag_collaborations(line, collaborations_kb):
     return line
 
 
-def identify_and_tag_authors(line, authors_kb):
+def identify_and_tag_authors(line, authors_kb, unidecode_authors=True):
     """Given a reference, look for a group of author names,
        place tags around the author group, return the newly tagged line.
+       If unidecode_authors is True, the authors are also looked for in the
+       line stripped of its accents, keeping the version matching the most.
     """
     re_auth, re_auth_near_miss = get_author_regexps()
 
@@ -899,13 +981,16 @@ def identify_and_tag_authors(line, authors_kb):
     # We matched authors here
     line = strip_tags(output_line)
     matched_authors = list(re_auth.finditer(line))
-    # We try to have better results by unidecoding
-    unidecoded_line = strip_tags(unidecode(output_line))
-    matched_authors_unidecode = list(re_auth.finditer(unidecoded_line))
+    if unidecode_authors:
+        # We try to have better results by unidecoding
+        # Imported here as it is slow to import
+        from unidecode import unidecode
+        unidecoded_line = strip_tags(unidecode(output_line))
+        matched_authors_unidecode = list(re_auth.finditer(unidecoded_line))
 
-    if len(matched_authors_unidecode) > len(matched_authors):
-        output_line = unidecode(output_line)
-        matched_authors = matched_authors_unidecode
+        if len(matched_authors_unidecode) > len(matched_authors):
+            output_line = unidecode(output_line)
+            matched_authors = matched_authors_unidecode
 
     # If there is at least one matched author group
     if matched_authors:
@@ -1043,7 +1128,7 @@ def sum_2_dictionaries(dicta, dictb):
     """
     dict_out = dicta.copy()
     for key in dictb.keys():
-        if 'key' in dict_out:
+        if key in dict_out:
             # Add the sum for key in dictb to that of dict_out:
             dict_out[key] += dictb[key]
         else:
@@ -1166,6 +1251,10 @@ def identify_journals(line, kb_journals):
 
     # Begin searching:
     for title in periodical_title_search_keys:
+        # The patterns of the titles match the title itself: skip the
+        # titles absent from the line without running their pattern
+        if title not in line:
+            continue
         # search for all instances of the current periodical title
         # in the line:
         # for each matched periodical title:
@@ -35,12 +35,23 @@ from ..documents.text import (
 )
 
 from .config import CFG_REFEXTRACT_MAX_LINES
-from .find import find_end_of_reference_section, get_reference_section_beginning, find_reference_chunks_based_on_year_n_symbol_matching
+from .hooks import traced
+from .find import LineFeatures, find_end_of_reference_section, locate_reference_section
 
 LOGGER = logging.getLogger(__name__)
 
 
-def extract_references_from_fulltext(fulltext, reference_search_mode="standard"):
+# Names of the strategies locating the reference section (see
+# SECTION_STRATEGIES) of the search modes, None for all of them but the
+# fallback ones (see SECTION_FALLBACK_STRATEGIES)
+REFERENCE_SEARCH_MODES = {
+    'standard': None,
+    'year_n_symbols': ('year_n_symbols',),
+}
+
+
+def extract_references_from_fulltext(fulltext, reference_search_mode="standard",
+                                     report=None):
     """Locate and extract the reference section from a fulltext document.
        Return the extracted reference section as a list of strings, whereby each
        string in the list is considered to be a single reference line.
@@ -48,56 +59,67 @@ def extract_references_from_fulltext(fulltext, reference_search_mode="standard")
         '[19] Wilson, A. Unpublished (1986).
        @param fulltext: (list) of strings, whereby each string is a line of the
         document.
+       @param reference_search_mode: (string) one of REFERENCE_SEARCH_MODES:
+        'standard' tries the strategies locating the reference section but
+        the fallback search by years and symbols, 'year_n_symbols' only finds
+        the references by their years and symbols.
+       @param report: (dictionary) if given, updated with the report of the
+        search for the reference section (see locate_reference_section).
        @return: (list) of strings, where each string is an extracted reference
         line.
     """
-
-    if(reference_search_mode=="standard"):
-        # Try to remove pagebreaks, headers, footers
-        fulltext = remove_page_boundary_lines(fulltext)
-        status = 0
-        # How ref section found flag
-        how_found_start = 0
-        # Find start of refs section
-        ref_sect_start = get_reference_section_beginning(fulltext)
-
-        if ref_sect_start is None:
-            # No References
+    if reference_search_mode not in REFERENCE_SEARCH_MODES:
+        raise ValueError('Unknown reference search mode: %s (known modes: %s)'
+                         % (reference_search_mode,
+                            ', '.join(sorted(REFERENCE_SEARCH_MODES))))
+
+    # Try to remove pagebreaks, headers, footers
+    fulltext = remove_page_boundary_lines(fulltext)
+    status = 0
+    # How ref section found flag
+    how_found_start = 0
+    # The features of the lines are shared by the strategies and the search
+    # for the end of the section
+    features = LineFeatures(fulltext)
+    # Find start of refs section
+    ref_sect_start, section_report = locate_reference_section(
+        fulltext, features, REFERENCE_SEARCH_MODES[reference_search_mode])
+    if report is not None:
+        report.update(section_report)
+
+    if ref_sect_start is None:
+        # No References
+        refs = []
+        status = 4
+        LOGGER.debug(u"extract_references_from_fulltext: ref_sect_start is None")
+    elif 'reference_lines' in ref_sect_start:
+        # The strategy found the reference lines themselves
+        refs = ref_sect_start['reference_lines']
+        how_found_start = ref_sect_start['how_found_start']
+    else:
+        how_found_start = ref_sect_start['how_found_start']
+        # If a reference section was found, however weak
+        ref_sect_end = \
+            find_end_of_reference_section(fulltext,
+                                          ref_sect_start["start_line"],
+                                          ref_sect_start["marker"],
+                                          ref_sect_start["marker_pattern"],
+                                          features)
+        if ref_sect_end is None:
+            # No End to refs? Not safe to extract
             refs = []
-            status = 4
-            LOGGER.debug(u"extract_references_from_fulltext: ref_sect_start is None")
+            status = 5
+            LOGGER.debug(u"extract_references_from_fulltext: no end to refs!")
         else:
-            # If a reference section was found, however weak
-            ref_sect_end = \
-                find_end_of_reference_section(fulltext,
-                                              ref_sect_start["start_line"],
-                                              ref_sect_start["marker"],
-                                              ref_sect_start["marker_pattern"])
-            if ref_sect_end is None:
-                # No End to refs? Not safe to extract
-                refs = []
-                status = 5
-                LOGGER.debug(u"extract_references_from_fulltext: no end to refs!")
-            else:
-                # If the end of the reference section was found.. start extraction
-                refs = get_reference_lines(fulltext,
-                                           ref_sect_start["start_line"],
-                                           ref_sect_end,
-                                           ref_sect_start["title_string"],
-                                           ref_sect_start["marker_pattern"],
-                                           ref_sect_start["title_marker_same_line"])
-
-        return refs, status, how_found_start
-    elif(reference_search_mode=="year_n_symbols"):
-        ## extraction based on year and symbol information
-        refs=find_reference_chunks_based_on_year_n_symbol_matching(fulltext, None)
-
-        ## combine individual ref chuncs into one reference chunk
-        return refs, 0, 0
-    else:
-        print("unknown search_ref_section_type of references: ", search_ref_section_type)
-        print("please specific a known type: 'standard', 'year_n_symbols'")
-        exit(-1)
+            # If the end of the reference section was found.. start extraction
+            refs = get_reference_lines(fulltext,
+                                       ref_sect_start["start_line"],
+                                       ref_sect_end,
+                                       ref_sect_start["title_string"],
+                                       ref_sect_start["marker_pattern"],
+                                       ref_sect_start["title_marker_same_line"])
+
+    return refs, status, how_found_start
 
 
 def get_reference_lines(docbody,
@@ -171,6 +193,7 @@ def strip_footer(ref_lines, section_title):
     return [l for l in ref_lines if not re_footer.match(l)]
 
 
+@traced
 def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
     """Given a reference section, rebuild the reference lines. After translation
        from PDF to text, reference lines are often broken. This is because
@@ -308,6 +331,7 @@ def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
     return rebuilt_references
 
 
+@traced
 def wash_and_repair_reference_line(line):
     """Wash a reference line of undesirable characters (such as poorly-encoded
        letters, etc), and repair any errors (such as broken URLs) if possible.
@@ -328,6 +352,18 @@ def wash_and_repair_reference_line(line):
     return line
 
 
+def wash_reference_line(line):
+    """Wash a reference line of undesirable characters without trying to
+       repair it. This is the cheap version of
+       wash_and_repair_reference_line, used for lines which are too costly
+       to be fully parsed.
+       @param line: (string) the reference line to be washed.
+       @return: (string) the washed reference line.
+    """
+    line = replace_undesirable_characters(line)
+    return re_multiple_space.sub(u' ', line)
+
+
 def test_for_blank_lines_separating_reference_lines(ref_sect):
     """Test to see if reference lines are separated by blank lines so that
        these can be used to rebuild reference lines.
@@ -45,6 +45,10 @@ install_requires = [
     'unidecode~=1.0,>=1.0.22',
 ]
 
+async_require = [
+    'aiohttp~=3.0,>=3.0.1',
+]
+
 docs_require = [
     'Sphinx~=1.0,>=1.7.1',
 ]
@@ -58,19 +62,17 @@ tests_require = [
 ]
 
 extras_require = {
+    'async': async_require,
     'docs': docs_require,
     'tests': tests_require,
-    'tests:python_version=="2.7"': [
-        'unicode-string-literal~=1.0,>=1.1',
-    ],
 }
 
 extras_require['all'] = []
 for name, reqs in extras_require.items():
-    if name not in ['all', 'tests:python_version=="2.7"']:
+    if name != 'all':
         extras_require['all'].extend(reqs)
 
-packages = find_packages(exclude=['docs'])
+packages = find_packages(exclude=['benchmarks', 'docs'])
 
 setup(
     name='refextract',
@@ -85,12 +87,20 @@ setup(
     include_package_data=True,
     zip_safe=False,
     platforms='any',
+    python_requires='>=3.7',
     description=__doc__,
     long_description=readme,
     setup_requires=setup_requires,
     install_requires=install_requires,
     tests_require=tests_require,
     extras_require=extras_require,
+    entry_points={
+        'console_scripts': [
+            'refextract = refextract.cli:main',
+            'refextract-client = refextract.client:main',
+            'refextract-daemon = refextract.daemon:main',
+        ],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Environment :: Console',
@@ -99,8 +109,8 @@ setup(
         'License :: OSI Approved :: GNU General Public License v2 (GPLv2)',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Scientific/Engineering :: Information Analysis',
         'Topic :: Software Development :: Libraries',
         'Topic :: Software Development :: Libraries :: Python Modules',
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import sys
+
+import pytest
+
+from refextract.references import aio
+from refextract.references.aio import (
+    convert_PDF_to_plaintext_async,
+    extract_references_from_file_async,
+    extract_references_from_url_async,
+)
+from refextract.references.errors import FullTextNotAvailableError
+
+DOCUMENT = u"""Some title
+
+Some introduction text.
+
+References
+
+[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264.
+[2] CMS Collaboration, CMS-PAS-HIG-12-002.
+[3] J. Smith, doi:10.1103/PhysRevLett.19.1264.
+"""
+
+
+@pytest.fixture
+def text_file(tmpdir):
+    f = tmpdir.join("document.txt")
+    f.write(DOCUMENT)
+    return str(f)
+
+
+def test_extract_references_from_file_async(text_file):
+    stats = {}
+    r = asyncio.run(extract_references_from_file_async(text_file,
+                                                       stats=stats))
+    assert len(r) == 3
+    assert r[1]['reportnumber'] == [u'CMS-PAS-HIG-12-002']
+    assert 'status' in stats
+    assert stats['reference_section']['strategy'] == 'title'
+    with pytest.raises(FullTextNotAvailableError):
+        asyncio.run(extract_references_from_file_async(text_file + "error"))
+
+
+def test_convert_PDF_to_plaintext_async(monkeypatch):
+    output = b'Title\n\x0cReferences\n[1] J. Smith,\rPhys. Rev. D 12 (1975) 22'
+    commands = []
+
+    def get_pdftotext_command(fpath, keep_layout=False):
+        commands.append((fpath, keep_layout))
+        return [sys.executable, '-c',
+                'import sys; sys.stdout.buffer.write(%r)' % output]
+
+    monkeypatch.setattr(aio, 'get_pdftotext_command', get_pdftotext_command)
+    lines = asyncio.run(convert_PDF_to_plaintext_async('document.pdf',
+                                                       keep_layout=True))
+    assert lines == [u'Title\n', u'\f', u'References',
+                     u'[1] J. Smith,\rPhys. Rev. D 12 (1975) 22']
+    assert commands == [('document.pdf', True)]
+
+
+def test_extract_references_from_url_async():
+    web = pytest.importorskip('aiohttp.web')
+
+    async def document(request):
+        return web.Response(text=DOCUMENT)
+
+    async def extract():
+        app = web.Application()
+        app.router.add_get('/document.txt', document)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        url = 'http://127.0.0.1:%d/' % port
+        try:
+            references = await extract_references_from_url_async(
+                url + 'document.txt')
+            with pytest.raises(FullTextNotAvailableError):
+                await extract_references_from_url_async(url + 'missing')
+        finally:
+            await runner.cleanup()
+        return references
+
+    assert len(asyncio.run(extract())) == 3
@@ -23,17 +23,33 @@
 
 from __future__ import absolute_import, division, print_function
 
+import io
+import os
+
 import pytest
 import responses
 
+from refextract.references import api
 from refextract.references.api import (
     extract_journal_reference,
+    extract_journal_references,
+    extract_references_from_bytes,
+    extract_references_from_stream,
     extract_references_from_string,
     extract_references_from_url,
+    extract_references_from_urls,
     extract_references_from_file,
+    get_reference_lines,
+    iter_references_from_string,
 )
 
 from refextract.references.errors import FullTextNotAvailableError
+from refextract.references.sampler import (
+    disable_slow_line_sampler,
+    enable_slow_line_sampler,
+    get_slow_lines,
+    record_line,
+)
 
 
 @pytest.fixture
@@ -119,12 +135,148 @@ def test_journal_extract():
     assert r['title'] == u'Science'
 
 
+def test_journal_extract_keeps_the_text_of_the_authors_out():
+    lines = [u'J. Smith, Phys. Rev. D 12 (1975) 22',
+             u'ATLAS Collaboration, JHEP 1210 (2012) 130']
+    references = extract_journal_references(lines)
+    assert references == [extract_journal_reference(line)
+                          for line in lines]
+    assert [r['misc_txt'] for r in references] == [u', ', u', ']
+    assert references[0]['title'] == u'Phys. Rev. D'
+
+
+def test_extract_journal_references():
+    lines = [u'Science Vol. 338 no. 6108 (2012) pp. 773-775',
+             u'hep-th/9906022',
+             u'J.Phys.,A39,13445']
+    references = extract_journal_references(iter(lines))
+    assert references == [extract_journal_reference(line)
+                          for line in lines]
+    assert references[1] is None
+    assert references[2]['title'] == u'J. Phys.'
+
+
 def test_extract_references_from_string(kbs_override):
     ref_lines = """[9] R. Bousso, JHEP 9906:028 (1999); hep-th/9906022."""
     r = extract_references_from_string(ref_lines, override_kbs_files=kbs_override)
     assert len(r) == 2
 
 
+def test_extract_references_from_string_profile(kbs_override):
+    ref_lines = u'[9] R. Bousso, JHEP 9906:028 (1999); hep-th/9906022.'
+    full = extract_references_from_string(ref_lines,
+                                          override_kbs_files=kbs_override)
+    fast = extract_references_from_string(ref_lines,
+                                          override_kbs_files=kbs_override,
+                                          profile='fast')
+    assert fast == full
+
+
+def test_fast_profile_does_not_look_for_books(kbs_override):
+    ref_lines = u'[1] D. Griffiths, "Introduction to elementary particles", Wiley'
+    full = extract_references_from_string(ref_lines,
+                                          override_kbs_files=kbs_override)
+    fast = extract_references_from_string(ref_lines,
+                                          override_kbs_files=kbs_override,
+                                          profile='fast')
+    assert full[0]['year'] == [u'2008']
+    assert fast[0]['title'] == [u'Introduction to elementary particles']
+    assert 'year' not in fast[0]
+
+
+def test_iter_references_from_string(kbs_override):
+    ref_lines = """[9] R. Bousso, JHEP 9906:028 (1999); hep-th/9906022."""
+    stats = {}
+    r = iter_references_from_string(ref_lines, override_kbs_files=kbs_override,
+                                    stats=stats)
+    assert next(r)['linemarker'] == [u'9']
+    assert not stats
+    assert list(r)
+    assert stats['reportnum'] == 1
+    assert extract_references_from_string(
+        ref_lines, override_kbs_files=kbs_override) == list(
+            iter_references_from_string(ref_lines,
+                                        override_kbs_files=kbs_override))
+
+
+def test_extract_references_from_bytes():
+    document = u"""References
+
+[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264.
+[2] CMS Collaboration, CMS-PAS-HIG-12-002.
+""".encode('utf-8')
+    stats = {}
+    r = extract_references_from_bytes(document, stats=stats)
+    assert len(r) == 2
+    assert r[1]['reportnumber'] == [u'CMS-PAS-HIG-12-002']
+    assert stats['reference_section']['strategy'] == 'title'
+    assert extract_references_from_stream(io.BytesIO(document)) == r
+
+
+def test_extract_references_from_bytes_splits_lines_like_file(tmpdir):
+    document = u"""Introduction
+Some text\fwith a page break
+
+References
+[1] S. Weinberg, A Model of Leptons,\rPhys. Rev. Lett. 19 (1967) 1264.
+[2] P. Higgs, Phys. Lett. 12 (1964) 132.\f
+""".encode('utf-8')
+    path = tmpdir.join('document.txt')
+    path.write_binary(document)
+    r = extract_references_from_file(str(path))
+    assert len(r) == 2
+    assert extract_references_from_bytes(path.read_binary()) == r
+
+
+PROSE = [u'A sentence of the introduction, number %d.\n' % number
+         for number in range(20)] + \
+    [u'J. Smith in Phys. Rev. D 12 (1975) and later in 1998\n']
+
+SECTION = [u'References\n',
+           u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.\n',
+           u'[2] P. Higgs, Phys. Lett. 12 (1964) 132.\n']
+
+
+def test_get_reference_lines_tries_the_layout_first():
+    def get_document_body(keep_layout=False):
+        return PROSE + SECTION if keep_layout else PROSE
+
+    reflines, budgets, report = get_reference_lines(get_document_body)
+    assert len(reflines) == 2
+    assert report['strategy'] == 'title'
+    assert report['tried'][-1] == dict(report['tried'][-1], strategy='title',
+                                       found=True, layout=True)
+    assert 'year_n_symbols' not in [attempt['strategy']
+                                    for attempt in report['tried']]
+
+
+def test_document_without_reference_section():
+    document = u''.join(
+        [u'This is sentence number %d of the introduction.\n' % number
+         for number in range(20)] + PROSE[-1:]).encode('utf-8')
+    stats = {}
+    assert extract_references_from_bytes(document, stats=stats) == []
+    assert stats['reference_section']['strategy'] is None
+    assert extract_references_from_bytes(
+        document, profile={'year_n_symbols_fallback': True}) != []
+
+
+def test_get_reference_lines_year_n_symbols_fallback():
+    def get_document_body(keep_layout=False):
+        return PROSE
+
+    reflines, budgets, report = get_reference_lines(
+        get_document_body, profile={'year_n_symbols_fallback': True})
+    assert report['strategy'] == 'year_n_symbols'
+    assert report['confidence'] == 0.2
+
+    reflines, budgets, report = get_reference_lines(get_document_body)
+    assert reflines == []
+    assert report['strategy'] is None
+    assert 'year_n_symbols' not in [attempt['strategy']
+                                    for attempt in report['tried']]
+
+
 def test_extract_references_from_file(pdf_files):
     r = extract_references_from_file(pdf_files[0])
     assert 'texkey' in r[0]
@@ -158,3 +310,77 @@ def test_extract_references_from_url(pdf_files):
             content_type='text/plain',
         )
         extract_references_from_url(url)
+
+
+@responses.activate
+def test_extract_references_from_urls(monkeypatch):
+    for number in range(5):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/%d.pdf" % number,
+            body="document %d" % number,
+        )
+    responses.add(
+        responses.GET,
+        "http://www.example.com/missing.pdf",
+        body="File not found!",
+        status=404,
+    )
+
+    def extract_references_from_file(path, **kwargs):
+        with open(path) as f:
+            line = f.read()
+        record_line(line, {'tagging': 0.1})
+        return [{'raw_ref': [line]}]
+
+    monkeypatch.setattr(api, 'extract_references_from_file',
+                        extract_references_from_file)
+
+    urls = ["http://www.example.com/%d.pdf" % number for number in range(5)]
+    enable_slow_line_sampler(size=5)
+    try:
+        r = extract_references_from_urls(urls, concurrency=2)
+        documents = {entry['line']: entry['document']
+                     for entry in get_slow_lines()}
+    finally:
+        disable_slow_line_sampler()
+    assert r == [[{'raw_ref': ['document %d' % number]}]
+                 for number in range(5)]
+    assert documents == {'document %d' % number: url
+                         for number, url in enumerate(urls)}
+
+    urls.insert(1, "http://www.example.com/missing.pdf")
+    with pytest.raises(FullTextNotAvailableError):
+        extract_references_from_urls(urls, concurrency=2)
+    r = extract_references_from_urls(urls, return_exceptions=True)
+    assert isinstance(r[1], FullTextNotAvailableError)
+    assert len(r) == 6
+
+
+@responses.activate
+def test_extract_references_from_urls_bounds_downloads(monkeypatch):
+    urls = ["http://www.example.com/%d.pdf" % number for number in range(20)]
+    for url in urls:
+        responses.add(responses.GET, url, body="document")
+
+    filepaths = []
+
+    def download_url(*args):
+        filepath = api_download_url(*args)
+        filepaths.append(filepath)
+        return filepath
+
+    def extract_references_from_file(path, **kwargs):
+        # The downloads do not run ahead of the extraction
+        assert len(filepaths) <= 2 * 2
+        raise KeyboardInterrupt
+
+    api_download_url = api.download_url
+    monkeypatch.setattr(api, 'download_url', download_url)
+    monkeypatch.setattr(api, 'extract_references_from_file',
+                        extract_references_from_file)
+
+    with pytest.raises(KeyboardInterrupt):
+        extract_references_from_urls(urls, concurrency=2)
+    assert filepaths
+    assert not [path for path in filepaths if os.path.exists(path)]
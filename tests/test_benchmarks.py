@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import random
+
+from benchmarks.corpus import (
+    generate_document,
+    generate_reference_lines,
+    load_kb_entries,
+    make_numeration,
+)
+from benchmarks.kb_scaling import (
+    generate_journal_kb,
+    generate_reportnum_kb,
+    run as run_kb_scaling,
+)
+from benchmarks.suite import STAGES, compare, get_documents, run
+
+
+def test_run_records_all_stages(tmpdir):
+    tmpdir.join('document.txt').write_text(
+        u'References\n\n'
+        u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.\n'
+        u'[2] CMS Collaboration, CMS-PAS-HIG-12-002.\n', 'utf-8')
+
+    results = run(get_documents(pdf_dir='', text_dir=str(tmpdir)), repeat=1)
+
+    assert results['documents']['document.txt'] >= 2
+    assert set(results['stages']) == set(STAGES)
+    assert results['stages']['tagging']['lines'] == \
+        results['stages']['element_building']['lines'] >= 2
+    assert results['stages']['tagging']['lines_per_second'] > 0
+    assert results['stages']['build_references']['peak_memory'] > 0
+
+
+def test_compare_reports_regressions():
+    def results(seconds, peak_memory):
+        return {'stages': {'tagging': {'seconds': seconds, 'lines': 10,
+                                       'peak_memory': peak_memory}}}
+
+    assert compare(results(1.0, 1000), results(1.05, 1000)) == []
+    assert compare(results(1.0, 1000), results(2.0, 1000)) == [
+        ('tagging', 'seconds_per_line', 0.1, 0.2)]
+    assert compare(results(0.001, 1000), results(0.002, 2000)) == [
+        ('tagging', 'peak_memory', 1000, 2000)]
+
+
+def test_generate_reference_lines():
+    lines = generate_reference_lines(50, style='numbered', seed=1)
+
+    assert len(lines) == 50
+    assert lines[0].startswith(u'1. ')
+    assert lines[49].startswith(u'50. ')
+    assert lines == generate_reference_lines(50, style='numbered', seed=1)
+    assert lines != generate_reference_lines(50, style='numbered', seed=2)
+
+    journals = load_kb_entries()['journals']
+    assert any(journal in line for line in lines for journal in journals)
+
+
+def test_generate_noisy_document():
+    docbody = generate_document(20, style='bracketed', broken_urls=1.0,
+                                long_misc=1.0)
+
+    assert u'References\n' in docbody
+    assert all(len(line) <= 81 or u' ' not in line.strip()
+               for line in docbody)
+    assert sum(line.startswith(u'[') for line in docbody) >= 20
+
+
+def test_make_numeration():
+    rand = random.Random(0)
+
+    assert make_numeration(u's/syymm999', rand)[0] == u'/'
+    assert len(make_numeration(u'syyyys9?9?9', rand)) == 9
+
+
+def test_generate_kbs():
+    assert len(generate_journal_kb(10)) == 10
+    assert len(set(generate_journal_kb(20000))) == 20000
+    assert generate_reportnum_kb(1000).count(u'---') == 1000
+
+
+def test_kb_scaling():
+    results = run_kb_scaling([50, 100], lines=2)
+
+    assert [result['size'] for result in results] == [50, 100]
+    assert results[0]['journals']['seconds_per_line'] > 0
+    assert results[1]['report_numbers']['retained_memory'] > 0
+    assert 'build_seconds' in results[1]['journals']['growth']
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+from refextract.cli import main
+
+DOCUMENT = u"""References
+
+[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264.
+[2] CMS Collaboration, CMS-PAS-HIG-12-002.
+"""
+
+
+def read_output(output):
+    return [json.loads(line) for line in output.read().splitlines()]
+
+
+def test_batch_resumes(tmpdir):
+    documents = tmpdir.mkdir('documents')
+    for number in range(3):
+        documents.join('%d.txt' % number).write(DOCUMENT)
+    documents.join('ignored.html').write(u'<html></html>')
+    missing = str(tmpdir.join('missing.pdf'))
+    sources = tmpdir.join('sources.txt')
+    sources.write(missing + '\n')
+    output = tmpdir.join('references.jsonl')
+
+    args = ['batch', str(documents), '--list', str(sources),
+            '--output', str(output), '--workers', '2',
+            '--progress-interval', '0']
+    assert main(args) == 0
+    records = read_output(output)
+    assert len(records) == 4
+    records = {record['source']: record for record in records}
+    assert records[str(documents.join('0.txt'))]['stats']['reportnum'] == 1
+    assert len(records[str(documents.join('1.txt'))]['references']) == 2
+    assert records[missing]['error_type'] == 'FullTextNotAvailableError'
+
+    # Simulate an interruption while writing the last document
+    lines = output.read().splitlines(True)
+    output.write(''.join(lines[:-1]) + lines[-1][:10])
+    documents.join('3.txt').write(DOCUMENT)
+    assert main(args) == 0
+    records = read_output(output)
+    assert len(records) == 5
+    assert len(set(record['source'] for record in records)) == 5
+
+
+def test_profile(tmpdir, capsys):
+    document = tmpdir.join('document.txt')
+    document.write(DOCUMENT)
+
+    assert main(['profile', '--json', '--top', '1', str(document)]) == 0
+    profile = json.loads(capsys.readouterr().out)
+    assert profile['document'] == str(document)
+    assert profile['lines'] >= 2
+    assert len(profile['slowest_lines']) == 1
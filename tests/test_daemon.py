@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import pytest
+
+from refextract.client import DaemonError, extract, request
+from refextract.daemon import is_loopback, make_server
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def daemon(request, tmpdir):
+    if request.param == 'unix':
+        address = str(tmpdir.join('refextract.sock'))
+        server = make_server(socket_path=address, workers=1, queue_size=0)
+    else:
+        server = make_server(port=0, workers=1, queue_size=0)
+        address = '127.0.0.1:%d' % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server, address
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon(daemon):
+    server, address = daemon
+    assert request('health', address=address)['workers'] == 1
+
+    result = request('string', {'source': u'[1] Phys. Rev. Lett. 19 (1967) 1264'},
+                     address=address)
+    assert result['references'][0]['journal_volume'] == [u'19']
+    assert 'misc' in result['stats']
+
+    result = request('journal', {'line': u'J.Phys.,A39,13445'},
+                     address=address)
+    assert result['reference']['volume'] == u'A39'
+
+    with pytest.raises(DaemonError) as excinfo:
+        request('file', {'path': '/does/not/exist'}, address=address)
+    assert excinfo.value.status == 404
+
+    with pytest.raises(DaemonError) as excinfo:
+        request('journal', {'title': u'J.Phys.'}, address=address)
+    assert excinfo.value.status == 400
+
+    with pytest.raises(DaemonError) as excinfo:
+        request('journal', {'line': u'J.Phys.,A39,13445',
+                            'override_kbs_files': {'journals': '/etc/passwd'}},
+                address=address)
+    assert excinfo.value.status == 400
+
+
+def test_daemon_backpressure(daemon):
+    server, address = daemon
+    assert server.acquire_slot()
+    try:
+        assert request('health', address=address)['in_flight'] == 1
+        with pytest.raises(DaemonError) as excinfo:
+            request('journal', {'line': u'J.Phys.,A39,13445'},
+                    address=address)
+        assert excinfo.value.status == 503
+    finally:
+        server.release_slot()
+    assert request('health', address=address)['in_flight'] == 0
+
+
+def test_daemon_files(daemon, tmpdir):
+    server, address = daemon
+    server.local = False
+    with pytest.raises(DaemonError) as excinfo:
+        request('file', {'path': '/does/not/exist'}, address=address)
+    assert excinfo.value.status == 403
+
+    server.files_root = str(tmpdir.realpath())
+    with pytest.raises(DaemonError) as excinfo:
+        request('file', {'path': str(tmpdir.join('..', 'document.txt'))},
+                address=address)
+    assert excinfo.value.status == 403
+    with pytest.raises(DaemonError) as excinfo:
+        request('file', {'path': str(tmpdir.join('document.txt'))},
+                address=address)
+    assert excinfo.value.status == 404
+
+
+def test_make_server_keeps_other_files(tmpdir):
+    path = tmpdir.join('refextract.sock')
+    path.write('not a socket')
+    with pytest.raises(ValueError):
+        make_server(socket_path=str(path), workers=1, queue_size=0)
+    assert path.read() == 'not a socket'
+
+
+def test_is_loopback():
+    assert is_loopback('127.0.0.1')
+    assert is_loopback('::1')
+    assert is_loopback('localhost')
+    assert not is_loopback('0.0.0.0')
+    assert not is_loopback('192.168.1.1')
+
+
+def test_client_fallback(tmpdir):
+    address = str(tmpdir.join('missing.sock'))
+    result = extract('journal', {'line': u'J.Phys.,A39,13445'},
+                     address=address)
+    assert result['reference']['volume'] == u'A39'
+    with pytest.raises(OSError):
+        extract('journal', {'line': u'J.Phys.,A39,13445'}, address=address,
+                fallback=False)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pickle
+
+import pytest
+
+from refextract.references.elements import (
+    CitationElement,
+    JournalElement,
+    UrlElement,
+    new_element,
+)
+
+
+def test_element_behaves_like_a_dict():
+    el = new_element('JOURNAL', misc_txt=u'', title=u'Phys.Rev.',
+                     volume=u'D12', year=u'1975', page=u'22')
+    assert isinstance(el, JournalElement)
+    assert el['volume'] == u'D12'
+    assert el.get('recid') is None
+    assert 'recid' not in el
+    el['recid'] = 1
+    assert el == {'type': 'JOURNAL', 'misc_txt': u'', 'title': u'Phys.Rev.',
+                  'volume': u'D12', 'year': u'1975', 'page': u'22',
+                  'recid': 1}
+    assert u'{title} {volume} ({year}) {page}'.format(**el) == \
+        u'Phys.Rev. D12 (1975) 22'
+    with pytest.raises(KeyError):
+        el['report_num']
+
+
+def test_element_to_dict():
+    ibid = new_element('JOURNAL', misc_txt=u'', title=u'Phys.Rev.',
+                       volume=u'D13', year=u'1976', page=u'3')
+    el = new_element('JOURNAL', misc_txt=u'', title=u'Phys.Rev.',
+                     volume=u'D12', year=u'1975', page=u'22',
+                     extra_ibids=[ibid])
+    as_dict = el.to_dict()
+    assert type(as_dict) is dict
+    assert type(as_dict['extra_ibids'][0]) is dict
+    assert as_dict['extra_ibids'][0]['volume'] == u'D13'
+
+
+def test_element_changing_type():
+    el = new_element('URL', misc_txt=u'', url_string=u'hdl:1/2',
+                     url_desc=u'hdl:1/2')
+    el['type'] = 'HDL'
+    el['hdl_id'] = u'1/2'
+    del el['url_desc']
+    del el['url_string']
+    assert isinstance(el, UrlElement)
+    assert dict(el) == {'type': 'HDL', 'misc_txt': u'', 'hdl_id': u'1/2'}
+    with pytest.raises(KeyError):
+        del el['url_desc']
+
+
+def test_element_extra_keys():
+    el = new_element('MISC', misc_txt=u'see')
+    assert type(el) is CitationElement
+    el['note'] = u'extra'
+    assert list(el) == ['type', 'misc_txt', 'note']
+    assert len(el) == 3
+    assert el.pop('note') == u'extra'
+    assert 'note' not in el
+
+
+def test_element_copy_and_pickle():
+    el = new_element('REPORTNUMBER', misc_txt=u'', report_num=u'hep-th/9711200')
+    el['linked'] = True
+    copied = el.copy()
+    copied['report_num'] = u'arXiv:1205.0701'
+    assert el['report_num'] == u'hep-th/9711200'
+    assert pickle.loads(pickle.dumps(el)) == el
@@ -23,14 +23,27 @@
 
 from __future__ import absolute_import, division, print_function
 
+import copy
+import json
+
 import pytest
 
+from refextract.references import engine
 from refextract.references.engine import (
+    get_kbs,
     get_plaintext_document_body,
+    get_profile,
+    parse_journal_reference,
+    parse_reference_line,
     parse_references,
+    tag_reference_elements,
+    transform_citation_elements,
 )
 
-from refextract.references.errors import UnknownDocumentTypeError
+from refextract.references.errors import (
+    BudgetExceededError,
+    UnknownDocumentTypeError,
+)
 
 
 def get_references(ref_line, override_kbs_files=None):
@@ -130,3 +143,216 @@ def test_get_plaintext_document_body(tmpdir):
         f.write(html)
         get_plaintext_document_body(str(f))
     assert 'text/html' in excinfo.value
+
+
+def test_line_length_budget_keeps_identifiers():
+    ref_line = u'[1] J. Smith, Phys. Rev. Lett. 19 (1967) 1264, doi:10.1103/PhysRevLett.19.1264, arXiv:1205.0701'
+    references, stats = parse_references(
+        [ref_line], budgets={'line_length': 20})
+    assert len(references) == 1
+    assert references[0]['doi'] == [u'doi:10.1103/PhysRevLett.19.1264']
+    assert references[0]['reportnumber'] == [u'arXiv:1205.0701']
+    assert references[0]['linemarker'] == [u'1']
+    assert 'journal_title' not in references[0]
+    assert stats['degraded'] == 1
+
+
+def test_document_time_budget_keeps_misc():
+    ref_lines = [
+        u'[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264',
+        u'[2] CMS Collaboration, CMS-PAS-HIG-12-002',
+    ]
+    references, stats = parse_references(
+        ref_lines, budgets={'document_time': 0})
+    assert [ref['misc'] for ref in references] == [
+        [u'S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264'],
+        [u'CMS Collaboration, CMS-PAS-HIG-12-002'],
+    ]
+    assert stats['degraded'] == 2
+
+
+def test_parse_reference_line_deadline():
+    kbs = get_kbs()
+    with pytest.raises(BudgetExceededError):
+        parse_reference_line(u'[1] Phys. Rev. Lett. 19 (1967) 1264', kbs,
+                             deadline=0)
+
+
+def test_unknown_budget():
+    with pytest.raises(ValueError):
+        parse_references([u'[1] Phys. Rev. Lett. 19 (1967) 1264'],
+                         budgets={'lines': 1})
+
+
+def test_get_profile():
+    assert get_profile() == get_profile('full')
+    assert get_profile('fast')['books'] is False
+    assert get_profile({'books': False}) == dict(get_profile('full'),
+                                                 books=False)
+    with pytest.raises(ValueError):
+        get_profile('slow')
+    with pytest.raises(ValueError):
+        get_profile({'authors': False})
+
+
+def test_identifiers_profile():
+    ref_line = u'[1] J. Smith, Phys. Rev. Lett. 19 (1967) 1264, doi:10.1103/PhysRevLett.19.1264, arXiv:1205.0701'
+    references, stats = parse_references([ref_line], profile='identifiers')
+    assert len(references) == 1
+    assert references[0]['doi'] == [u'doi:10.1103/PhysRevLett.19.1264']
+    assert references[0]['reportnumber'] == [u'arXiv:1205.0701']
+    assert 'journal_title' not in references[0]
+    assert stats['degraded'] == 0
+
+
+def test_parse_references_in_parallel(monkeypatch):
+    ref_lines = [
+        u'[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264',
+        u'[2] CMS Collaboration, CMS-PAS-HIG-12-002',
+        u'[3] J. Smith, doi:10.1103/PhysRevLett.19.1264',
+        u'[4] ATLAS Collaboration, arXiv:1205.0701',
+        u'[5] Nucl. Phys. B 360 (1991) 145',
+    ]
+    serial, serial_stats = parse_references(ref_lines)
+
+    monkeypatch.setattr(engine, 'CFG_REFEXTRACT_PARALLEL_THRESHOLD', 1)
+    parallel, parallel_stats = parse_references(ref_lines, processes=2)
+
+    assert parallel == serial
+    del serial_stats['date'], parallel_stats['date']
+    assert parallel_stats == serial_stats
+
+
+def test_bulk_linker_callback():
+    ref_lines = [
+        u'[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264',
+        u'[2] CMS Collaboration, CMS-PAS-HIG-12-002',
+        u'[3] J. Smith, doi:10.1103/PhysRevLett.19.1264',
+    ]
+    recids = {'JOURNAL': 1, 'REPORTNUMBER': 2, 'DOI': 3}
+
+    def linker(element):
+        return recids.get(element['type'])
+
+    batches = []
+
+    def bulk_linker(elements):
+        batches.append(elements)
+        return [linker(el) for el in elements]
+
+    references, dummy = parse_references(ref_lines,
+                                         bulk_linker_callback=bulk_linker)
+    assert len(batches) == 1
+    assert [el['type'] for el in batches[0]] == [
+        'JOURNAL', 'REPORTNUMBER', 'DOI']
+    assert [ref['recid'] for ref in references] == [[u'1'], [u'2'], [u'3']]
+    assert references == parse_references(ref_lines,
+                                          linker_callback=linker)[0]
+
+
+def test_linker_callbacks_get_json_serialisable_elements():
+    ref_lines = [
+        u'[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264',
+        u'[2] CMS Collaboration, CMS-PAS-HIG-12-002',
+    ]
+    sent = []
+
+    def linker(element):
+        # e.g. sent to a remote linker
+        assert type(element) is dict
+        sent.append(json.loads(json.dumps(element)))
+        return None
+
+    def bulk_linker(elements):
+        sent.append(json.loads(json.dumps(elements)))
+        return [None] * len(elements)
+
+    parse_references(ref_lines, linker_callback=linker)
+    journal = [el for el in sent if el['type'] == 'JOURNAL'][0]
+    assert (journal['title'], journal['volume'], journal['page']) == (
+        u'Phys. Rev. Lett.', u'19', u'1264')
+    del sent[:]
+    parse_references(ref_lines, bulk_linker_callback=bulk_linker)
+    assert [el['type'] for el in sent[0]] == ['JOURNAL', 'REPORTNUMBER']
+
+
+# Order of the transforms before they were run in a single pass
+SEQUENTIAL_TRANSFORMS = (
+    'split_volume_from_journal', 'format_volume', 'handle_special_journals',
+    'format_report_number', 'format_author_ed', 'look_for_books',
+    'format_hep', 'remove_b_for_nucl_phys', 'mangle_volume',
+    'arxiv_urls_to_report_numbers', 'look_for_hdl', 'look_for_hdl_urls',
+)
+
+
+def transform_sequentially(citation_elements, kbs):
+    for name in SEQUENTIAL_TRANSFORMS:
+        transform = engine.get_element_transform(name)
+        if transform.types is None:
+            transform.func(citation_elements, kbs)
+            continue
+        for el in citation_elements:
+            if el['type'] in transform.types:
+                transform.func(el, kbs)
+    return citation_elements
+
+
+@pytest.mark.parametrize('ref_line', [
+    u'[1] JHEP 03 (2005) 12; JHEP 5 2004; Phys. Lett. 100B (1981) 1',
+    u'[2] hep-th-9711200, CERN-LHCC2003-01, http://arxiv.org/abs/1205.0701',
+    u'[3] hdl:1234/5678 and http://hdl.handle.net/10/20',
+    u'[4] Nucl. Phys. Proc. Suppl. B12 (1990) 3; Phys. Rev. D XII (1975) 22',
+    u'[5] J. Smith (ed. ), "Quantum Field Theory", Cambridge, 1995',
+])
+def test_transform_citation_elements_is_sequential(ref_line, monkeypatch):
+    kbs = get_kbs()
+    monkeypatch.setattr(engine, 'transform_citation_elements',
+                        lambda citation_elements, kbs, transforms=None:
+                        citation_elements)
+    citation_elements = tag_reference_elements(ref_line, kbs)[0]
+    monkeypatch.undo()
+
+    expected = transform_sequentially(copy.deepcopy(citation_elements), kbs)
+    assert transform_citation_elements(citation_elements, kbs) == expected
+
+
+def test_register_element_transform(monkeypatch):
+    monkeypatch.setattr(engine, 'ELEMENT_TRANSFORMS',
+                        engine.ELEMENT_TRANSFORMS)
+
+    def upper_misc(el, kbs):
+        el['misc_txt'] = el['misc_txt'].upper()
+
+    engine.register_element_transform('upper_misc', upper_misc, ('MISC',))
+    engine.disable_element_transform('mangle_volume')
+    elements = transform_citation_elements([
+        {'type': 'MISC', 'misc_txt': u'see'},
+        {'type': 'JOURNAL', 'misc_txt': u'', 'title': u'Phys.Lett.',
+         'volume': u'100B', 'page': u'1', 'year': u'1981'},
+    ], get_kbs())
+    assert elements[0]['misc_txt'] == u'SEE'
+    assert elements[1]['volume'] == u'100B'
+
+    engine.enable_element_transform('mangle_volume')
+    with pytest.raises(ValueError):
+        engine.disable_element_transform('unknown')
+
+
+@pytest.mark.parametrize('ref_line', [
+    u'Science Vol. 338 no. 6108 (2012) pp. 773-775',
+    u'[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264',
+    u'Phys.Lett. B716 (2012) 1-29',
+    u'Nucl. Phys. Proc. Suppl. B12 (1990) 3',
+    u'JHEP 1206 (2012) 012',
+    u'PoS LATTICE2013 (2014) 012',
+    u'ATLAS Collaboration, JHEP 1210 (2012) 130',
+])
+def test_parse_journal_reference(ref_line):
+    kbs = get_kbs()
+    expected = [el for citation in parse_reference_line(ref_line, kbs)[0]
+                for el in citation if el['type'] == 'JOURNAL'][0]
+    assert parse_journal_reference(ref_line, kbs) == expected
+
+
+def test_parse_journal_reference_without_journal():
+    assert parse_journal_reference(u'hep-th/9906022', get_kbs()) is None
@@ -23,7 +23,13 @@
 
 from __future__ import absolute_import, division, print_function
 
-from refextract.references.find import get_reference_section_beginning
+from refextract.references.find import (
+    DIGITS_LINE,
+    LineFeatures,
+    find_end_of_reference_section,
+    get_reference_section_beginning,
+    locate_reference_section,
+)
 
 
 def test_simple():
@@ -112,3 +118,74 @@ def test_no_title_via_numbers2():
         'title_marker_same_line': False,
         'how_found_start': 4,
     }
+
+
+def test_line_features():
+    features = LineFeatures([
+        "Intro",
+        "References",
+        "[1] Ref1",
+        "Table 1",
+        "0.1 0.2 0.3 0.4 0.5 0.6",
+    ])
+    assert features.title_indexes == [1]
+    assert list(features.post_titles) == [0, 0, 0, 1, 0]
+    assert features.digit_classes[4] == DIGITS_LINE
+
+
+def test_end_of_reference_section():
+    docbody = [
+        "References",
+        "[1] Ref1",
+        "[2] Ref2",
+        "Table 1",
+        "[3] Ref3",
+        "Appendix A",
+        "Text of the appendix",
+    ]
+    features = LineFeatures(docbody)
+    sect = get_reference_section_beginning(docbody, features)
+    # The reference after the table continues the section
+    assert find_end_of_reference_section(docbody, sect['start_line'],
+                                         sect['marker'],
+                                         sect['marker_pattern'],
+                                         features) == 4
+
+
+def test_locate_reference_section():
+    section, report = locate_reference_section([
+        "Hello",
+        "[1] Ref1",
+        "[2] Ref2",
+    ])
+    assert section['start_line'] == 1
+    assert section['how_found_start'] == 2
+    assert report['strategy'] == 'brackets'
+    assert report['confidence'] == 0.8
+    assert [attempt['strategy'] for attempt in report['tried']] == [
+        'title', 'brackets']
+
+
+def test_locate_reference_section_skips_less_confident_strategies():
+    section, report = locate_reference_section([
+        "Hello",
+        "1. Ref1",
+        "2. Ref2",
+    ], names=('dots', 'numbers'))
+    assert section['marker'] == '1.'
+    # The numbers cannot find a section of a higher confidence
+    assert [attempt['strategy'] for attempt in report['tried']] == ['dots']
+
+
+def test_locate_reference_section_does_not_try_the_fallbacks():
+    docbody = [u'A sentence of the introduction, number %d.' % number
+               for number in range(20)] + \
+        [u'J. Smith in Phys. Rev. D 12 (1975) and later in 1998']
+    section, report = locate_reference_section(docbody)
+    assert section is None
+    assert 'year_n_symbols' not in [attempt['strategy']
+                                    for attempt in report['tried']]
+
+    section, report = locate_reference_section(docbody,
+                                               names=('year_n_symbols',))
+    assert report['strategy'] == 'year_n_symbols'
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from refextract.references import hooks
+from refextract.references.api import extract_references_from_string
+from refextract.references.hooks import (
+    install_hook,
+    remove_hook,
+    traced,
+    using_hook,
+)
+
+
+def test_hooks_receive_the_stages():
+    events = []
+
+    def hook(stage, duration, input_size, output_size):
+        events.append((stage, duration, input_size, output_size))
+
+    with using_hook(hook):
+        extract_references_from_string(
+            u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.')
+    assert not hooks.HOOKS
+
+    stages = [event[0] for event in events]
+    for stage in ('wash_and_repair_reference_line', 'tag_reference_line',
+                  'parse_tagged_reference_line', 'transform_citation_elements',
+                  'split_citations', 'build_references'):
+        assert stage in stages
+    assert all(event[1] >= 0 for event in events)
+    wash = events[stages.index('wash_and_repair_reference_line')]
+    assert wash[2] == len(u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.')
+    assert events[stages.index('build_references')][3] == 1
+
+
+def test_traced_without_hooks_calls_the_function():
+    @traced
+    def stage(lines):
+        return lines[:1]
+
+    assert stage.__name__ == 'stage'
+    assert stage([1, 2]) == [1]
+
+
+def test_failing_hook_is_ignored():
+    events = []
+
+    @traced(input_arg=1)
+    def stage(marker, line):
+        line.append(marker)
+
+    def failing_hook(*args):
+        raise RuntimeError
+
+    install_hook(failing_hook)
+    install_hook(lambda *args: events.append(args))
+    try:
+        line = []
+        stage('a', line)
+    finally:
+        hooks.HOOKS = ()
+
+    assert line == ['a']
+    assert events[0][0] == 'stage'
+    # Modified in place: the output is the input after the stage
+    assert events[0][2:] == (0, 1)
+
+
+def test_remove_hook():
+    def hook(*args):
+        pass
+
+    install_hook(hook)
+    remove_hook(hook)
+    assert hook not in hooks.HOOKS
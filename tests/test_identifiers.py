@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from refextract.references.identifiers import (
+    extract_identifiers,
+    iter_identifiers,
+)
+
+LINE = (u'[1] J. Smith, doi:10.1103/PhysRevLett.19.1264, arXiv:1205.0701 '
+        u'[hep-ph], hep-th/9906022, hdl:1234/5678. ISBN 978-0-521-67053-1, '
+        u'CERN   LHCC  98-013')
+
+
+def test_extract_identifiers():
+    identifiers = extract_identifiers(LINE)
+    assert [(identifier['type'], identifier['value'])
+            for identifier in identifiers] == [
+        ('doi', u'10.1103/PhysRevLett.19.1264'),
+        ('arxiv', u'arXiv:1205.0701'),
+        ('arxiv', u'hep-th/9906022'),
+        ('handle', u'1234/5678'),
+        ('isbn', u'9780521670531'),
+        ('report_number', u'CERN-LHCC-98-013'),
+    ]
+    assert [LINE[identifier['start']:identifier['end']]
+            for identifier in identifiers] == [
+        u'doi:10.1103/PhysRevLett.19.1264',
+        u'arXiv:1205.0701 [hep-ph]',
+        u'hep-th/9906022',
+        u'hdl:1234/5678',
+        u'ISBN 978-0-521-67053-1',
+        u'CERN   LHCC  98-013',
+    ]
+
+
+def test_extract_identifiers_kinds():
+    assert [identifier['value']
+            for identifier in extract_identifiers(LINE, ['doi', 'handle'])] \
+        == [u'10.1103/PhysRevLett.19.1264', u'1234/5678']
+    with pytest.raises(ValueError):
+        extract_identifiers(LINE, ['journal'])
+
+
+def test_extract_identifiers_from_document_body():
+    docbody = [u'References\n', u'[1] astro-phy 9912345\n',
+               u'[2] ATLAS-CONF-2012-093\n']
+    identifiers = extract_identifiers(docbody)
+    assert [identifier['value'] for identifier in identifiers] == [
+        u'astro-ph/9912345', u'ATLAS-CONF-2012-093']
+    assert identifiers[0]['start'] == len(u'References\n[1] ')
+
+
+def test_iter_identifiers():
+    texts = [LINE, u'no identifier', u'arXiv:1022111 [hep-ph]']
+    results = list(iter_identifiers(iter(texts)))
+    assert results[0] == extract_identifiers(LINE)
+    assert results[1] == []
+    assert results[2][0]['value'] == u'hep-ph/1022111'
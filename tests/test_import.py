@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ('requests', 'magic', 'PyPDF2', 'unidecode', 'pkg_resources',
+                 'Levenshtein', 'autosemver')
+
+
+def imported_modules(statement):
+    code = '%s; import sys, json; print(json.dumps(sorted(sys.modules)))' % (
+        statement)
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return set(json.loads(output.decode('utf-8')))
+
+
+def test_import_does_not_load_heavy_modules():
+    modules = imported_modules('import refextract')
+
+    assert not modules.intersection(HEAVY_MODULES)
+    assert 'refextract.references.api' not in modules
+
+
+def test_journal_reference_does_not_load_heavy_modules():
+    modules = imported_modules(
+        'from refextract import extract_journal_reference; '
+        'extract_journal_reference("J.Phys.,A39,13445")')
+
+    # unidecode is needed to tag the authors
+    assert not modules.intersection(HEAVY_MODULES) - {'unidecode'}
+
+
+def test_lazy_attributes():
+    import refextract
+    from refextract.references import api
+
+    assert refextract.extract_references_from_string is \
+        api.extract_references_from_string
+    assert 'extract_journal_reference' in dir(refextract)
+    assert refextract.re_new_arxiv.search(u'see 1710.0123 for')
+
+
+def test_exported_patterns_are_compiled():
+    import re
+    import refextract
+
+    assert isinstance(refextract.re_new_arxiv, re.Pattern)
+    assert isinstance(refextract.re_new_arxiv_5digits, re.Pattern)
+    assert re.compile(refextract.re_new_arxiv) is refextract.re_new_arxiv
+    pattern, report_number = refextract.RE_OLD_ARXIV[0]
+    assert isinstance(pattern, re.Pattern)
+
+
+def test_lazy_patterns_behave_like_compiled_patterns():
+    from refextract.references.regexs import lazy_compile
+
+    pattern = lazy_compile(r'(?P<year>\d{4})')
+
+    assert pattern.search(u'in 1967.').group('year') == u'1967'
+    assert pattern.pattern == r'(?P<year>\d{4})'
+    assert pattern.compile() is pattern.compile()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pickle
+
+from refextract.references.engine import parse_references
+from refextract.references.linker import LinkerCache, element_cache_key
+
+
+def test_element_cache_key_is_normalised():
+    assert element_cache_key(
+        {'type': 'JOURNAL', 'title': u'Phys. Rev. Lett.', 'volume': u'19',
+         'page': u'1264'}) == element_cache_key(
+        {'type': 'JOURNAL', 'title': u'Phys.Rev.Lett.', 'volume': u'19',
+         'page': u'1264', 'year': u'1967'})
+    assert element_cache_key(
+        {'type': 'DOI', 'doi_string': u'doi:10.1103/PhysRevLett.19.1264'}) == \
+        element_cache_key({'type': 'DOI',
+                           'doi_string': u'10.1103/physrevlett.19.1264'})
+    assert element_cache_key({'type': 'AUTH', 'auth_txt': u'S. Weinberg'}) \
+        is None
+
+
+def test_link_through_cache():
+    calls = []
+
+    def linker(element):
+        calls.append(element)
+        return 1 if element['type'] == 'DOI' else None
+
+    cache = LinkerCache(linker)
+    doi = {'type': 'DOI', 'doi_string': u'10.1103/PhysRevLett.19.1264'}
+    report = {'type': 'REPORTNUMBER', 'report_num': u'CMS-PAS-HIG-12-002'}
+    for dummy in range(3):
+        assert cache.link(doi) == 1
+        assert cache.link(report) is None
+    assert len(calls) == 2
+    assert cache.stats()['hits'] == 4
+    assert cache.stats()['misses'] == 2
+
+
+def test_lru_and_ttl_eviction():
+    now = [0]
+    cache = LinkerCache(lambda element: 1, maxsize=2, ttl=10, negative_ttl=0,
+                        timer=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 1)
+    cache.get('a')
+    cache.set('c', 1)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    cache.set('d', None)
+    assert cache.get('d') == (False, None)
+    now[0] = 10
+    assert cache.get('a') == (False, None)
+
+
+def test_bulk_link_through_cache():
+    batches = []
+
+    def bulk_linker(elements):
+        batches.append(elements)
+        return [len(batches)] * len(elements)
+
+    cache = LinkerCache(bulk_linker_callback=bulk_linker)
+    ref_lines = [
+        u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264',
+        u'[2] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264',
+    ]
+    parse_references(ref_lines, bulk_linker_callback=cache.bulk_link)
+    parse_references(ref_lines, bulk_linker_callback=cache.bulk_link)
+    assert len(batches) == 1
+    assert len(batches[0]) == 1
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+
+
+def test_cache_is_picklable():
+    cache = LinkerCache(maxsize=5)
+    cache.set('a', 1)
+    cache = pickle.loads(pickle.dumps(cache))
+    assert cache.get('a') == (True, 1)
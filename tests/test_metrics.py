@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from refextract.references import hooks
+from refextract.references.api import extract_references_from_string
+from refextract.references.metrics import (
+    CITATIONS,
+    DOCUMENTS,
+    REFERENCE_LINES,
+    STAGE_DURATION,
+    MetricsRegistry,
+    disable_stage_metrics,
+    enable_stage_metrics,
+    render_prometheus,
+)
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    documents = registry.counter('documents_total', 'Documents.')
+    requests = registry.counter('requests_total', 'Requests.', ['result'])
+    latency = registry.histogram('latency_seconds', 'Latency.', ['stage'],
+                                 buckets=(0.1, 1))
+    documents.inc()
+    documents.inc(2)
+    requests.inc(result='a "quoted"\\value')
+    latency.observe(0.05, stage='tag')
+    latency.observe(0.5, stage='tag')
+    latency.observe(5, stage='tag')
+
+    assert render_prometheus(registry) == '''\
+# HELP documents_total Documents.
+# TYPE documents_total counter
+documents_total 3
+# HELP requests_total Requests.
+# TYPE requests_total counter
+requests_total{result="a \\"quoted\\"\\\\value"} 1
+# HELP latency_seconds Latency.
+# TYPE latency_seconds histogram
+latency_seconds_bucket{stage="tag",le="0.1"} 1
+latency_seconds_bucket{stage="tag",le="1"} 2
+latency_seconds_bucket{stage="tag",le="+Inf"} 3
+latency_seconds_sum{stage="tag"} 5.55
+latency_seconds_count{stage="tag"} 3
+'''
+    assert latency.get(stage='tag') == (3, 5.55)
+    with pytest.raises(ValueError):
+        requests.inc(status='ok')
+    with pytest.raises(ValueError):
+        registry.counter('documents_total', 'Documents.')
+
+
+def test_extraction_is_recorded():
+    documents = DOCUMENTS.get()
+    lines = REFERENCE_LINES.get()
+    titles = CITATIONS.get(type='title')
+
+    enable_stage_metrics()
+    enable_stage_metrics()
+    try:
+        assert hooks.HOOKS.count(hooks.HOOKS[0]) == 1
+        extract_references_from_string(
+            u'[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.\n'
+            u'[2] G. Veneziano, Nuovo Cim. A 57 (1968) 190.\n'
+            u'[3] P. Higgs, Phys. Lett. 12 (1964) 132.')
+    finally:
+        disable_stage_metrics()
+    assert not hooks.HOOKS
+
+    assert DOCUMENTS.get() == documents + 1
+    assert REFERENCE_LINES.get() == lines + 3
+    assert CITATIONS.get(type='title') == titles + 3
+    assert STAGE_DURATION.get(stage='tag_reference_line')[0] >= 1
+    assert 'refextract_stage_duration_seconds_bucket{stage=' \
+        '"tag_reference_line",le="+Inf"}' in render_prometheus()
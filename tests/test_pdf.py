@@ -23,8 +23,11 @@
 
 from __future__ import absolute_import, division, print_function
 
+import io
+
 from refextract.references.pdf import (
-    extract_texkeys_from_pdf
+    extract_texkeys_from_pdf,
+    extract_texkeys_from_pdf_stream,
 )
 
 
@@ -149,3 +152,10 @@ def test_extract_texkeys_from_pdf_no_crash_on_other_exceptions(pdf_files):
     result = extract_texkeys_from_pdf(pdf_files[5])
 
     assert result == expected
+
+
+def test_extract_texkeys_from_pdf_stream(pdf_files):
+    with open(pdf_files[0], 'rb') as f:
+        stream = io.BytesIO(f.read())
+    assert extract_texkeys_from_pdf_stream(stream) == \
+        extract_texkeys_from_pdf(pdf_files[0])
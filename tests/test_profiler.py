@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from refextract.authors import regexs as authors_regexs
+from refextract.documents import text as documents_text
+from refextract.references.profiler import (
+    STAGES,
+    format_profile,
+    profile_string,
+)
+
+DOCUMENT = u"""References
+
+[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264.
+[2] CMS Collaboration, CMS-PAS-HIG-12-002.
+[3] See http://www.example.org/foo bar.html
+"""
+
+
+def test_profile_string():
+    url_repair_patterns = documents_text.re_list_url_repair_patterns
+
+    profile = profile_string(DOCUMENT, top=2)
+
+    assert profile['lines'] >= 3
+    assert [stage['stage'] for stage in profile['stages']] == list(STAGES)
+    assert len(profile['slowest_lines']) == 2
+    assert profile['slowest_lines'][0]['seconds'] >= \
+        profile['slowest_lines'][1]['seconds']
+    assert len(profile['patterns']) == 2
+    assert set(profile['pattern_groups']) == {
+        'journal', 'report number', 'collaboration', 'author', 'url repair'}
+    # The patterns of the library are restored
+    assert documents_text.re_list_url_repair_patterns is url_repair_patterns
+    assert not hasattr(authors_regexs.RE_AUTH, 'costs')
+    assert u'Slowest reference lines' in format_profile(profile)
+
+
+def test_profile_string_without_patterns():
+    profile = profile_string(DOCUMENT, patterns=False)
+
+    assert profile['patterns'] == []
+    assert profile['references'] >= 3
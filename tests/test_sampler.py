@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2018 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+import signal
+import threading
+
+import pytest
+
+from refextract.references.api import extract_references_from_string
+from refextract.references.engine import parse_reference_line
+from refextract.references.kbs import get_kbs
+from refextract.references.sampler import (
+    SlowLineSampler,
+    disable_slow_line_sampler,
+    dump_slow_lines,
+    enable_slow_line_sampler,
+    get_slow_lines,
+    new_timings,
+    sampled_document,
+)
+
+REFERENCES = u"""References
+[1] J. Maldacena, Adv. Theor. Math. Phys. 2 (1998) 231, hep-th/9711200.
+[2] E. Witten, Adv. Theor. Math. Phys. 2 (1998) 253, arXiv:hep-th/9802150.
+[3] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264.
+"""
+
+
+@pytest.fixture
+def sampler():
+    yield enable_slow_line_sampler(size=2)
+    disable_slow_line_sampler()
+
+
+def test_sampler_keeps_the_slowest_lines():
+    sampler = SlowLineSampler(size=2)
+    for line, duration in (('a', 0.1), ('bb', 0.3), ('c', 0.2), ('d', 0.05)):
+        sampler.record(line, {'tagging': duration}, 'doc')
+
+    assert sampler.lines == 4
+    assert [entry['line'] for entry in sampler.slowest()] == ['bb', 'c']
+    assert sampler.slowest()[0]['length'] == 2
+
+
+def test_no_timings_when_disabled():
+    disable_slow_line_sampler()
+    assert new_timings() is None
+    assert get_slow_lines() == []
+
+
+def test_sampled_extraction(sampler):
+    extract_references_from_string(REFERENCES, recid=42)
+
+    lines = get_slow_lines()
+    assert sampler.lines >= 3
+    assert len(lines) == 2
+    assert lines[0]['duration'] >= lines[1]['duration']
+    assert lines[0]['document'] == 42
+    assert 'tagging' in lines[0]['stages']
+    assert lines[0]['duration'] == pytest.approx(
+        sum(lines[0]['stages'].values()))
+
+
+def test_sampled_document_outer_context_wins(sampler):
+    kbs = get_kbs()
+    with sampled_document('outer.pdf'):
+        with sampled_document('inner'):
+            parse_reference_line(u'Phys. Rev. Lett. 19 (1967) 1264', kbs)
+
+    assert get_slow_lines()[0]['document'] == 'outer.pdf'
+
+
+def test_dump_slow_lines(sampler):
+    sampler.record(u'Phys. Rev. Lett. 19 (1967) 1264', {'tagging': 0.1})
+    output = io.StringIO()
+    dump_slow_lines(output)
+
+    dump = json.loads(output.getvalue())
+    assert dump['lines'] == 1
+    assert dump['slowest'][0]['stages'] == {'tagging': 0.1}
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1')
+def test_dump_on_signal_while_recording(tmpdir):
+    dump_path = str(tmpdir.join('slow-lines.json'))
+    previous_handler = signal.getsignal(signal.SIGUSR1)
+    sampler = enable_slow_line_sampler(size=2, dump_signal=signal.SIGUSR1,
+                                       dump_path=dump_path)
+    try:
+        # The signal arrives while the main thread is recording a line
+        with sampler.lock:
+            signal.raise_signal(signal.SIGUSR1)
+        for thread in threading.enumerate():
+            if thread.name == 'slow-line-dump':
+                thread.join(10)
+        with open(dump_path) as f:
+            assert json.load(f)['lines'] == 0
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
+        disable_slow_line_sampler()
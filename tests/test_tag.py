@@ -28,6 +28,7 @@ from refextract.references.tag import (
     identify_ibids,
     find_numeration,
     find_numeration_more,
+    sum_2_dictionaries,
 )
 
 
@@ -175,3 +176,8 @@ def test_5_digits_suffix_version_new_2012():
     ref_line = u"""{any prefix}1210.12345v9 [physics.ins-det]{any postfix}"""
     r = tag_arxiv(ref_line)
     assert r.strip(': ') == u"{any prefix}1210.12345v9 [physics.ins-det]{any postfix}"
+
+
+def test_sum_2_dictionaries():
+    assert sum_2_dictionaries({'a': 3, 'b': 1}, {'a': 1, 'c': 5}) == \
+        {'a': 4, 'b': 1, 'c': 5}